@@ -0,0 +1,199 @@
+"""
+Out-of-core A/B analysis of recommendation impressions and likes.
+
+Impressions (the service's Parquet impression log, or a legacy views.csv) and likes
+are read in time windows through pyarrow datasets, so only one window of events is
+in memory at a time. For each window:
+
+- recommended posts are flattened into (impression, user, post, view time) arrays;
+- likes from the window plus the hit interval are sorted by (user, post, time);
+- a post is a hit if the same user liked it within `hit_seconds` after the view,
+  found with one `searchsorted` over a composite (user-post key, time) ordering;
+- impressions and hits are summed per (user, exp_group) into a running total.
+
+Likes are counted per user in a separate streaming pass. All tests then run on these
+per-user aggregates (bounded by the number of users, not the number of events):
+SRM chi-square, z-test on the share of users with likes, Mann-Whitney on likes per
+user, and a Welch t-test on per-bucket hit rates, with buckets from the shared
+experiment bucketing (`app.core.experiments.bucket`).
+
+The hit rate is the share of impressions with at least one liked recommended post
+within the hit interval.
+
+Functions:
+
+- open_events(path) -> EventSource: time-windowed reader over a Parquet/CSV file or directory.
+- window_hits(views, likes, hit_seconds) -> np.ndarray: hit flag per impression of a window.
+- aggregate(views_path, likes_path, window_seconds, hit_seconds) -> (pd.DataFrame, pd.Series):
+    impressions and hits per (user_id, exp_group), and like counts per user.
+- analyze(views_path, likes_path, ...) -> dict: test statistics and p-values.
+"""
+
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from scipy.stats import chi2_contingency, mannwhitneyu, ttest_ind
+from statsmodels.stats.proportion import proportions_ztest
+
+from app.core.experiments import bucket
+
+HOUR = 3600
+DAY = 24 * HOUR
+# user_id << POST_BITS | post_id identifies a (user, post) pair
+POST_BITS = 32
+
+
+class EventSource:
+    """Events with a `timestamp` column (timestamp type or unix seconds), read by time window."""
+
+    def __init__(self, path: str):
+        fmt = 'csv' if str(path).endswith('.csv') else 'parquet'
+        partitioning = 'hive' if fmt == 'parquet' and Path(path).is_dir() else None
+        self.dataset = ds.dataset(path, format=fmt, partitioning=partitioning)
+        self.time_type = self.dataset.schema.field('timestamp').type
+
+    def _bound(self, seconds: int):
+        if pa.types.is_timestamp(self.time_type):
+            return pa.scalar(seconds * 10**9, type=pa.timestamp('ns')).cast(self.time_type)
+        return pa.scalar(seconds, type=self.time_type)
+
+    def _seconds(self, column: pa.ChunkedArray) -> np.ndarray:
+        if pa.types.is_timestamp(column.type):
+            return pc.cast(column, pa.timestamp('s'), safe=False).to_numpy().astype(np.int64)
+        return column.to_numpy().astype(np.int64)
+
+    def time_range(self) -> Tuple[int, int]:
+        low, high = None, None
+        for batch in self.dataset.to_batches(columns=['timestamp']):
+            if batch.num_rows == 0:
+                continue
+            seconds = self._seconds(pa.chunked_array([batch.column(0)]))
+            low = seconds.min() if low is None else min(low, seconds.min())
+            high = seconds.max() if high is None else max(high, seconds.max())
+        if low is None:
+            raise ValueError("No events")
+        return int(low), int(high)
+
+    def read(self, start: int, end: int, columns: list) -> pa.Table:
+        """Events with start <= timestamp < end, timestamp converted to unix seconds."""
+        time = ds.field('timestamp')
+        table = self.dataset.to_table(
+            columns=columns, filter=(time >= self._bound(start)) & (time < self._bound(end))
+        )
+        return table.set_column(
+            table.schema.get_field_index('timestamp'), 'timestamp', pa.array(self._seconds(table['timestamp']))
+        )
+
+    def batches(self, columns: list) -> Iterator[pa.RecordBatch]:
+        return self.dataset.to_batches(columns=columns)
+
+
+def open_events(path: str) -> EventSource:
+    return EventSource(path)
+
+
+def _post_lists(views: pa.Table) -> Tuple[np.ndarray, np.ndarray]:
+    """Lengths and flattened post ids of the recommendation lists of a window."""
+    if 'post_ids' in views.column_names:
+        lists = views['post_ids'].combine_chunks()
+        return pc.list_value_length(lists).to_numpy().astype(np.int64), lists.flatten().to_numpy()
+    # legacy views.csv: "[123 456 789]"
+    parsed = views['recommendations'].to_pandas().str.strip('[]').str.split()
+    return parsed.str.len().to_numpy().astype(np.int64), np.array(parsed.explode().to_numpy(), dtype=np.int64)
+
+
+def window_hits(views: pa.Table, likes: pa.Table, hit_seconds: int = HOUR) -> np.ndarray:
+    lengths, post_ids = _post_lists(views)
+    impression = np.repeat(np.arange(views.num_rows), lengths)
+    user_ids = views['user_id'].to_numpy().astype(np.int64)
+    view_keys = (np.repeat(user_ids, lengths) << POST_BITS) | post_ids.astype(np.int64)
+    view_times = np.repeat(views['timestamp'].to_numpy(), lengths)
+    if likes.num_rows == 0 or len(view_keys) == 0:
+        return np.zeros(views.num_rows, dtype=bool)
+
+    like_keys = (likes['user_id'].to_numpy().astype(np.int64) << POST_BITS) | likes['post_id'].to_numpy()
+    like_times = likes['timestamp'].to_numpy()
+    keys, key_rank = np.unique(like_keys, return_inverse=True)
+
+    # composite ordering: (pair rank, time), so one searchsorted finds the first like at/after a view
+    base = min(like_times.min(), view_times.min())
+    span = max(like_times.max(), view_times.max()) - base + hit_seconds + 1
+    like_order = np.sort(key_rank * span + (like_times - base))
+
+    rank = np.minimum(np.searchsorted(keys, view_keys), len(keys) - 1)
+    known = keys[rank] == view_keys
+    view_order = rank * span + (view_times - base)
+    first = np.searchsorted(like_order, view_order, side='left')
+    hit = known & (first < len(like_order))
+    hit[hit] = like_order[first[hit]] < view_order[hit] + hit_seconds
+    return np.bincount(impression, weights=hit, minlength=views.num_rows) > 0
+
+
+def aggregate(views_path: str, likes_path: str, window_seconds: int = DAY,
+              hit_seconds: int = HOUR) -> Tuple[pd.DataFrame, pd.Series]:
+    views, likes = open_events(views_path), open_events(likes_path)
+    list_column = 'post_ids' if 'post_ids' in views.dataset.schema.names else 'recommendations'
+    start, end = views.time_range()
+
+    totals: Optional[pd.DataFrame] = None
+    for window_start in range(start, end + 1, window_seconds):
+        window_end = window_start + window_seconds
+        window_views = views.read(window_start, window_end, ['user_id', 'exp_group', 'timestamp', list_column])
+        if window_views.num_rows == 0:
+            continue
+        window_likes = likes.read(window_start, window_end + hit_seconds, ['user_id', 'post_id', 'timestamp'])
+        hits = window_hits(window_views, window_likes, hit_seconds)
+        window_totals = pd.DataFrame({
+            'user_id': window_views['user_id'].to_numpy(),
+            'exp_group': window_views['exp_group'].to_pandas().astype(str).to_numpy(),
+            'impressions': 1,
+            'hits': hits.astype(np.int64),
+        }).groupby(['user_id', 'exp_group']).sum()
+        totals = window_totals if totals is None else totals.add(window_totals, fill_value=0)
+
+    like_counts = pd.Series(dtype=np.int64)
+    for batch in likes.batches(['user_id']):
+        counts = pd.Series(batch.column(0).to_numpy()).value_counts()
+        like_counts = like_counts.add(counts, fill_value=0)
+    return totals.astype(np.int64), like_counts.astype(np.int64)
+
+
+def analyze(views_path: str, likes_path: str, window_seconds: int = DAY, hit_seconds: int = HOUR,
+            n_buckets: int = 100, salt: str = "my_salt", control: str = 'control', test: str = 'test') -> dict:
+    totals, like_counts = aggregate(views_path, likes_path, window_seconds, hit_seconds)
+    per_user = totals.reset_index()
+
+    # users seen in more than one group are dropped
+    groups_per_user = per_user.groupby('user_id')['exp_group'].nunique()
+    per_user = per_user[per_user['user_id'].isin(groups_per_user.index[groups_per_user == 1])]
+
+    users = {g: per_user.loc[per_user['exp_group'] == g, 'user_id'].to_numpy() for g in (test, control)}
+    observed = [len(users[test]), len(users[control])]
+    _, p_srm, _, _ = chi2_contingency([observed, [sum(observed) / 2] * 2])
+
+    likes_of = {g: like_counts.reindex(users[g]).dropna() for g in (test, control)}
+    with_likes = [len(likes_of[test]), len(likes_of[control])]
+    _, p_share = proportions_ztest(count=with_likes, nobs=observed)
+    _, p_mw = mannwhitneyu(likes_of[test], likes_of[control], alternative='two-sided')
+
+    per_user = per_user.assign(bucket=bucket(per_user['user_id'].to_numpy(), salt=salt, n_buckets=n_buckets))
+    buckets = per_user.groupby(['exp_group', 'bucket'])[['hits', 'impressions']].sum()
+    buckets['hitrate'] = buckets['hits'] / buckets['impressions']
+    hitrate = {g: buckets.loc[g, 'hitrate'] for g in (test, control)}
+    _, p_hitrate = ttest_ind(hitrate[test], hitrate[control], equal_var=False)
+
+    return {
+        'p_srm': p_srm,
+        'share_test': with_likes[0] / observed[0],
+        'share_control': with_likes[1] / observed[1],
+        'p_share': p_share,
+        'p_mw': p_mw,
+        'hitrate_test': hitrate[test].mean(),
+        'hitrate_control': hitrate[control].mean(),
+        'p_hitrate': p_hitrate,
+    }
@@ -0,0 +1,91 @@
+"""
+Operational endpoints for inspecting the running service.
+
+Endpoints:
+- GET /admin/stats: Scoring executor counters (CPU side), DB pool status, pool checkout
+  wait times and query times (I/O side) for the async and sync engines, and
+  recommendation cache hit/miss counters, per-phase startup timings.
+- POST /admin/post-cache/invalidate: Drop posts from the post cache (all posts if no IDs given).
+- GET /admin/models: Resident model versions with their aliases, load time and memory.
+- POST /admin/models/{alias}: Load a .cbm file (once per content) and atomically point `alias` at it.
+  `path` is resolved inside MODEL_DIR (default: the directory of the served models);
+  paths outside it are rejected.
+
+Every endpoint requires the `X-Admin-Token` header to equal ADMIN_TOKEN. Without
+ADMIN_TOKEN set the admin endpoints are disabled (403).
+"""
+
+import os
+import secrets
+from typing import List, Optional
+
+from catboost import CatBoostError
+from fastapi import APIRouter, Body, Depends, Header, HTTPException
+
+from app.core import state
+
+from app.core.executor import scoring_executor
+from app.core.model_loader import get_model_path
+from app.db.async_database import async_engine, async_pool_metrics
+from app.db.database import engine, pool_metrics
+
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+MODEL_DIR = os.environ.get('MODEL_DIR') or os.path.dirname(get_model_path()[0])
+
+
+def require_admin_token(x_admin_token: str = Header('')):
+    if not ADMIN_TOKEN or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def resolve_model_path(path: str) -> str:
+    model_dir = os.path.realpath(MODEL_DIR)
+    resolved = os.path.realpath(os.path.join(model_dir, path))
+    if os.path.commonpath([model_dir, resolved]) != model_dir:
+        raise HTTPException(status_code=400, detail=f"Model path must be inside {MODEL_DIR}: {path}")
+    return resolved
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/stats")
+def get_stats():
+    """Scoring executor and DB pool statistics."""
+    return {
+        "scoring_executor": scoring_executor.stats(),
+        "recommendation_cache": state.rec_cache.stats() if state.rec_cache is not None else None,
+        "startup_timings": state.startup_timings,
+        "impressions": state.impressions.stats() if state.impressions is not None else None,
+        "models": state.models.stats() if state.models is not None else None,
+        "db": {
+            "async": {"pool": async_engine.pool.status(), **async_pool_metrics.stats()},
+            "sync": {"pool": engine.pool.status(), **pool_metrics.stats()},
+        },
+    }
+
+
+@router.post("/post-cache/invalidate")
+def invalidate_post_cache(post_ids: Optional[List[int]] = Body(None)):
+    """Drop posts from the post cache; they are reloaded from the DB on next request."""
+    state.post_cache.invalidate(post_ids)
+    return {"cached_posts": len(state.post_cache)}
+
+
+@router.get("/models")
+def get_models():
+    """Resident model versions by content hash."""
+    return {"aliases": state.models.aliases(), "versions": state.models.stats()}
+
+
+@router.post("/models/{alias}")
+def reload_model(alias: str, path: str = Body(..., embed=True)):
+    """Load the model at `path` (inside MODEL_DIR) and switch `alias` to it once it is ready."""
+    resolved = resolve_model_path(path)
+    try:
+        version = state.models.assign(alias, resolved)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model file not found: {path}")
+    except (CatBoostError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Cannot serve model {path}: {e}")
+    return {"alias": alias, "version": version, "aliases": state.models.aliases()}
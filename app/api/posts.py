@@ -5,58 +5,56 @@ This module defines routes under the "/post" prefix for accessing individual pos
 their associated feed actions, and a list of top liked posts.
 
 Endpoints:
-- GET /post/{id}: Retrieve a post by its ID.
+- GET /post/{id}: Retrieve a post by its ID (served from `state.post_cache`).
 - GET /post/{id}/feed: Retrieve feed actions related to a specific post.
-- GET /post/top-liked: Retrieve the top liked posts.
+- GET /post/top-liked: Retrieve the top liked posts (served from `state.popularity`
+  and `state.post_cache`).
 
 Dependencies:
-- SQLAlchemy Session from `get_db`
+- SQLAlchemy AsyncSession from `get_async_db`
 """
 
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.core.features_loader import select_top_liked_posts_ids
-from app.db.database import get_db
-from app.db.table_post import Post
+from app.core import state
+from app.core.popularity import TOP_POSTS_N
+from app.db.async_database import get_async_db
 from app.db.table_feed import Feed
 from app.schema import PostGet, FeedGet
 
 router = APIRouter(prefix="/post", tags=["posts"])
 
 
+# declared before "/{id}", which would otherwise capture "top-liked" as an id
+@router.get("/top-liked", response_model=List[PostGet])
+async def get_top_liked_posts(limit: int = Query(10, ge=1, le=TOP_POSTS_N), db: AsyncSession = Depends(get_async_db)):
+    """Retrieve the top liked posts."""
+    return await state.post_cache.get_or_load(state.popularity.top(limit), db)
+
+
 @router.get("/{id}", response_model=PostGet)
-def get_post(id:int, db: Session = Depends(get_db)):
+async def get_post(id:int, db: AsyncSession = Depends(get_async_db)):
     """ Retrieve a post by its ID."""
-    result = db.query(Post).filter(Post.id == id).first()
+    result = await state.post_cache.get_or_load([id], db)
     if not result:
         raise HTTPException(404, "post is not found")
     else:
-        return result
+        return result[0]
 
 
 @router.get("/{id}/feed", response_model=List[FeedGet])
-def get_feed_post(id:int, limit:int=10, db: Session = Depends(get_db)):
+async def get_feed_post(id:int, limit:int=10, db: AsyncSession = Depends(get_async_db)):
     """Retrieve feed actions related to a specific post."""
-    result = (
-        db.query(Feed)
+    result = await db.execute(
+        select(Feed)
+        .options(selectinload(Feed.user), selectinload(Feed.post))
         .filter(Feed.post_id == id)
         .order_by(Feed.time.desc())
         .limit(limit)
-        .all()
     )
-    return result
-
-
-@router.get("/top-liked", response_model=List[PostGet])
-def get_top_liked_posts(limit: int = 10, db: Session = Depends(get_db)):
-    """Retrieve the top liked posts."""
-    top_posts = select_top_liked_posts_ids(limit)
-    posts = db.query(Post).filter(Post.id.in_(top_posts)).all()
-
-    post_dict = {post.id: post for post in posts}
-    ordered_posts = [post_dict[pid] for pid in top_posts if pid in post_dict]
-
-    return ordered_posts
+    return result.scalars().all()
@@ -1,36 +1,42 @@
 """
 This module defines the recommendation endpoint for users.
 
-Endpoint:
+Endpoints:
 - GET /post/recommendations/: Returns a list of recommended posts for a user based on their experiment group.
+- POST /post/recommendations/batch: Returns recommended post IDs for many (user_id, time) pairs,
+  scoring the users of each model with one stacked model call.
 
 Functionality:
-- Determines the user's experimental group (test or control).
-- Selects the appropriate recommendation model.
-- Logs the recommendation process for transparency and debugging.
-- Falls back to a default list of top 5 posts if no personalized recommendations are found.
-- Returns post objects in the order of recommended post IDs.
+- Assigns the user to an experiment arm (`state.experiments`, see `app.core.experiments`).
+- Selects the arm's current model from `state.models` (a reload never affects a running request).
+- Records every served recommendation in the impression log (`state.impressions`, see
+  `app.core.impressions`) without blocking the request.
+- Falls back to the most liked posts (`state.popularity`) if no personalized recommendations are found.
+- Returns post objects (from `state.post_cache`) in the order of recommended post IDs.
 
 Dependencies:
 - FastAPI for routing and dependency injection.
-- SQLAlchemy ORM for database interaction.
-- `state` module for model instances and default post list.
+- SQLAlchemy async ORM for database interaction.
+- `scoring_executor` to run CatBoost scoring off the event loop.
+- `state` module for the experiment router, the model registry and the most liked posts.
 - `get_recommend_ids` for fetching recommendations.
-- `get_exp_group` for experimental group assignment.
 """
 
 import logging
+import time as clock
+from collections import defaultdict
 from datetime import datetime
 
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import state
-from app.db.database import get_db
-from app.db.table_post import Post
-from app.schema import Response
-from app.core.recommender import get_recommend_ids
-from app.core.ab_groups import get_exp_group
+from app.core.executor import scoring_executor
+from app.db.async_database import get_async_db
+from app.schema import (
+    Response, BatchRecommendationRequest, BatchRecommendationResponse, UserRecommendations, MAX_RECOMMENDATIONS
+)
+from app.core.recommender import get_recommend_ids, get_recommend_ids_batch
 
 router = APIRouter(prefix="/post", tags=["recommendations"])
 
@@ -39,32 +45,62 @@ logger = logging.getLogger(__name__)
 
 
 @router.get("/recommendations/", response_model=Response)
-def recommended_posts(
+async def recommended_posts(
         user_id: int,
         time: datetime,
-        limit: int = 5,
-        db: Session = Depends(get_db)
+        limit: int = Query(5, ge=1, le=MAX_RECOMMENDATIONS),
+        db: AsyncSession = Depends(get_async_db)
 ) -> Response:
     """Recommended posts for user {id}"""
-    exp_group = get_exp_group(user_id)
+    started = clock.perf_counter()
+    assignment = state.experiments.assign(user_id)
+    if assignment.model not in state.models:
+        raise ValueError(f'no model for arm {assignment.arm}')
 
-    if exp_group == 'test':
-        post_ids = get_recommend_ids(user_id, time, state.model_test, limit)
-        logger.info(f"user_id={user_id} | exp_group=test | model=model_test | posts={post_ids}")
-    elif exp_group == 'control':
-        post_ids = get_recommend_ids(user_id, time, state.model_control, limit)
-        logger.info(f"user_id={user_id} | exp_group=control | model=model_control | posts={post_ids}")
-    else:
-        raise ValueError('unknown group')
+    engine = state.models.engine(assignment.model)
+    post_ids = await scoring_executor.run(get_recommend_ids, user_id, time, engine, limit)
 
     if not post_ids:
-        post_ids = state.top_5_posts_list
-
-    posts = db.query(Post).filter(Post.id.in_(post_ids)).all()
-
-    post_dict = {post.id: post for post in posts}
-    ordered_posts = [post_dict[pid] for pid in post_ids if pid in post_dict]
-
-    return Response(exp_group=exp_group, recommendations=ordered_posts)
-
-
+        post_ids = state.popularity.top(limit)
+
+    ordered_posts = await state.post_cache.get_or_load(post_ids, db)
+
+    if state.impressions is not None:
+        state.impressions.log(user_id, assignment.experiment, assignment.arm, engine.version,
+                              [post.id for post in ordered_posts], time,
+                              (clock.perf_counter() - started) * 1000)
+    return Response(exp_group=assignment.arm, recommendations=ordered_posts)
+
+
+@router.post("/recommendations/batch", response_model=BatchRecommendationResponse)
+async def recommended_posts_batch(request: BatchRecommendationRequest) -> BatchRecommendationResponse:
+    """Recommended post IDs for a batch of (user_id, time) pairs"""
+    started = clock.perf_counter()
+    assignments = state.experiments.assign_many(item.user_id for item in request.requests)
+    groups = defaultdict(list)
+    for i, assignment in enumerate(assignments):
+        groups[assignment.model].append(i)
+
+    post_ids = [None] * len(request.requests)
+    versions = {}
+    for model, positions in groups.items():
+        if model not in state.models:
+            raise ValueError(f'no model {model}')
+        pairs = [(request.requests[i].user_id, request.requests[i].time) for i in positions]
+        engine = state.models.engine(model)
+        versions[model] = engine.version
+        group_ids = await scoring_executor.run(get_recommend_ids_batch, pairs, engine, request.limit)
+        for i, ids in zip(positions, group_ids):
+            post_ids[i] = ids or state.popularity.top(request.limit)
+        logger.info(f"batch | model={model} | users={len(positions)}")
+
+    if state.impressions is not None:
+        latency_ms = (clock.perf_counter() - started) * 1000
+        for item, assignment, ids in zip(request.requests, assignments, post_ids):
+            state.impressions.log(item.user_id, assignment.experiment, assignment.arm,
+                                  versions[assignment.model], ids, item.time, latency_ms)
+
+    return BatchRecommendationResponse(results=[
+        UserRecommendations(user_id=item.user_id, exp_group=assignment.arm, post_ids=ids)
+        for item, assignment, ids in zip(request.requests, assignments, post_ids)
+    ])
@@ -7,15 +7,17 @@ Endpoints:
 
 Dependencies:
 - FastAPI for routing and dependency injection.
-- SQLAlchemy ORM for database interaction.
+- SQLAlchemy async ORM for database interaction.
 - Schemas: `UserGet`, `FeedGet` for response models.
 """
 
 from typing import List
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.db.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.db.async_database import get_async_db
 from app.db.table_feed import Feed
 from app.db.table_user import User
 from app.schema import UserGet, FeedGet
@@ -24,9 +26,9 @@ router = APIRouter(prefix="/user", tags=["users"])
 
 
 @router.get("/{id}", response_model=UserGet)
-def get_user(id:int, db: Session = Depends(get_db)):
+async def get_user(id:int, db: AsyncSession = Depends(get_async_db)):
     """Retrieve user data by user ID"""
-    result = db.query(User).filter(User.id == id).first()
+    result = await db.get(User, id)
     if not result:
         raise HTTPException(404, "user is not found")
     else:
@@ -34,13 +36,13 @@ def get_user(id:int, db: Session = Depends(get_db)):
 
 
 @router.get("/{id}/feed", response_model=List[FeedGet])
-def get_feed_user(id:int, limit:int=10, db: Session = Depends(get_db)):
+async def get_feed_user(id:int, limit:int=10, db: AsyncSession = Depends(get_async_db)):
     """Retrieve a list of recent feed actions by the specified user"""
-    result = (
-        db.query(Feed)
+    result = await db.execute(
+        select(Feed)
+        .options(selectinload(Feed.user), selectinload(Feed.post))
         .filter(Feed.user_id == id)
         .order_by(Feed.time.desc())
         .limit(limit)
-        .all()
     )
-    return result
+    return result.scalars().all()
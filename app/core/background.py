@@ -0,0 +1,34 @@
+"""
+Background refresh loops for in-memory indexes.
+
+Classes:
+
+- PeriodicTask(name, interval, func):
+    Daemon thread that calls `func()` every `interval` seconds until `stop()` is called.
+    Exceptions are logged and the loop keeps running, so a slow or unavailable
+    database never takes the service down.
+"""
+
+import logging
+import threading
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask(threading.Thread):
+    def __init__(self, name: str, interval: float, func: Callable[[], None]):
+        super().__init__(name=name, daemon=True)
+        self.interval = interval
+        self.func = func
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.func()
+            except Exception:
+                logger.exception("Background task %s failed", self.name)
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,90 @@
+"""
+Dedicated, size-limited thread pool for CPU-bound model scoring.
+
+Async handlers await DB I/O on the event loop and hand CatBoost inference to this
+executor, so CPU concurrency (SCORING_WORKERS) is tuned independently of the DB
+pool and of the default threadpool used by sync code.
+
+Classes:
+
+- ScoringExecutor(max_workers: int):
+    - run(func, *args) -> awaitable: runs `func(*args)` in the pool from async code.
+    - stats() -> dict: submitted/completed/failed/in-flight counts and mean/max
+      queue-wait and run times in milliseconds.
+    - shutdown(): stops the pool.
+
+Variables:
+- scoring_executor (ScoringExecutor): process-wide executor used by the API.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+
+SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', os.cpu_count() or 1))
+
+
+class ScoringExecutor:
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scoring")
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+
+    def _call(self, func: Callable, submitted_at: float):
+        started_at = time.perf_counter()
+        failed = False
+        try:
+            return func()
+        except Exception:
+            failed = True
+            raise
+        finally:
+            finished_at = time.perf_counter()
+            wait, run = started_at - submitted_at, finished_at - started_at
+            with self._lock:
+                self._completed += 1
+                self._failed += failed
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+                self._run_total += run
+                self._run_max = max(self._run_max, run)
+
+    async def run(self, func: Callable, *args, **kwargs):
+        with self._lock:
+            self._submitted += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool, self._call, partial(func, *args, **kwargs), time.perf_counter()
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = max(self._completed, 1)
+            return {
+                "max_workers": self.max_workers,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "in_flight": self._submitted - self._completed,
+                "wait_ms_mean": 1000 * self._wait_total / completed,
+                "wait_ms_max": 1000 * self._wait_max,
+                "run_ms_mean": 1000 * self._run_total / completed,
+                "run_ms_max": 1000 * self._run_max,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+
+scoring_executor = ScoringExecutor(SCORING_WORKERS)
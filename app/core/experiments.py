@@ -0,0 +1,198 @@
+"""
+Experiment configuration and user bucketing, shared by serving and A/B analysis.
+
+Users are bucketed with a salted SplitMix64 hash computed in NumPy, so millions of
+user ids are assigned in one vectorized call (`bucket`). The salt is turned into a
+64-bit key once; the hash of a user is `splitmix64(user_id ^ key)`.
+
+Experiments live in layers. Each layer has its own salt and splits users into
+`N_BUCKETS` buckets; an experiment owns a contiguous share of its layer's buckets
+(`offset`, `traffic`), so experiments in one layer never overlap and experiments in
+different layers are independent. Inside an experiment, users are split between the
+arms by weight with a second hash salted by the experiment. Each arm can be bound
+to a model alias of the model registry (and the file to load it from).
+
+The config is read from the JSON file in EXPERIMENTS_CONFIG; without it the service
+runs `DEFAULT_CONFIG`, a 50/50 'control'/'test' split bound to the 'control' and
+'test' models. Users outside every model experiment get `default_model`.
+
+Classes:
+
+- Arm(name, weight, model=None, model_path=None)
+- Experiment(name, salt, arms, layer='default', offset=0.0, traffic=1.0):
+    - assign(user_ids, layer_buckets) -> np.ndarray: arm index per user (-1 = not in the
+      experiment), given the users' buckets in the experiment's layer.
+- Assignment(experiment, arm, model): result of routing one user.
+- ExperimentRouter(experiments, layers, default_model, cache_size):
+    - from_config(config) / from_file(path): build from a config dict or JSON file.
+    - assign(user_id) -> Assignment: memoized assignment of the first model experiment
+      that includes the user.
+    - assign_many(user_ids) -> list: vectorized assignment for many users.
+    - model_paths() -> dict: model alias -> file, for arms that name one.
+    - check_models(loaded): raises ValueError if an arm (or the default) names a model
+      alias that is not in `loaded`; run at startup so a misconfigured arm fails fast.
+
+Functions:
+
+- salt_key(salt) -> np.uint64: 64-bit key of a salt.
+- bucket(user_ids, salt, n_buckets=N_BUCKETS) -> np.ndarray: bucket of every user id.
+- load_router(path=EXPERIMENTS_CONFIG) -> ExperimentRouter: router from the config file,
+  or from `DEFAULT_CONFIG`.
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+EXPERIMENTS_CONFIG = os.environ.get('EXPERIMENTS_CONFIG', '')
+EXPERIMENT_CACHE_SIZE = int(os.environ.get('EXPERIMENT_CACHE_SIZE', 1_000_000))
+
+N_BUCKETS = 10_000
+
+DEFAULT_CONFIG = {
+    "default_model": "control",
+    "layers": {"default": "default"},
+    "experiments": [{
+        "name": "experiment_1",
+        "salt": "experiment_1",
+        "layer": "default",
+        "arms": [
+            {"name": "control", "weight": 1, "model": "control"},
+            {"name": "test", "weight": 1, "model": "test"},
+        ],
+    }],
+}
+
+
+def salt_key(salt: str) -> np.uint64:
+    return np.uint64(int.from_bytes(hashlib.sha256(salt.encode()).digest()[:8], 'little'))
+
+
+def _splitmix64(x: np.ndarray) -> np.ndarray:
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def bucket(user_ids, salt: str, n_buckets: int = N_BUCKETS) -> np.ndarray:
+    ids = np.asarray(user_ids, dtype=np.int64).astype(np.uint64)
+    return (_splitmix64(ids ^ salt_key(salt)) % np.uint64(n_buckets)).astype(np.int64)
+
+
+class Arm(NamedTuple):
+    name: str
+    weight: float
+    model: Optional[str] = None
+    model_path: Optional[str] = None
+
+
+class Assignment(NamedTuple):
+    experiment: Optional[str]
+    arm: str
+    model: str
+
+
+class Experiment:
+    def __init__(self, name: str, salt: str, arms: List[Arm], layer: str = 'default',
+                 offset: float = 0.0, traffic: float = 1.0):
+        if not arms or any(arm.weight <= 0 for arm in arms):
+            raise ValueError(f"Experiment {name}: arms must have positive weights")
+        if not (traffic > 0 and 0 <= offset and offset + traffic <= 1):
+            raise ValueError(f"Experiment {name}: offset + traffic must be within [0, 1]")
+        self.name = name
+        self.salt = salt
+        self.arms = list(arms)
+        self.layer = layer
+        self.first_bucket = round(offset * N_BUCKETS)
+        self.last_bucket = round((offset + traffic) * N_BUCKETS)
+        weights = np.array([arm.weight for arm in arms], dtype=np.float64)
+        # upper arm boundaries on the [0, N_BUCKETS) scale
+        self._bounds = np.round(np.cumsum(weights) / weights.sum() * N_BUCKETS).astype(np.int64)
+
+    @property
+    def binds_models(self) -> bool:
+        return any(arm.model for arm in self.arms)
+
+    def assign(self, user_ids, layer_buckets: np.ndarray) -> np.ndarray:
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        arms = np.searchsorted(self._bounds, bucket(user_ids, self.salt), side='right')
+        included = (layer_buckets >= self.first_bucket) & (layer_buckets < self.last_bucket)
+        return np.where(included, arms, -1)
+
+
+class ExperimentRouter:
+    def __init__(self, experiments: List[Experiment], layers: Optional[Dict[str, str]] = None,
+                 default_model: str = 'control', cache_size: int = EXPERIMENT_CACHE_SIZE):
+        self.layers = dict(layers or {})
+        for experiment in experiments:
+            self.layers.setdefault(experiment.layer, experiment.layer)
+        taken: Dict[str, List[Experiment]] = {}
+        for experiment in experiments:
+            for other in taken.get(experiment.layer, []):
+                if experiment.first_bucket < other.last_bucket and other.first_bucket < experiment.last_bucket:
+                    raise ValueError(f"Experiments {other.name} and {experiment.name} overlap in layer "
+                                     f"{experiment.layer}")
+            taken.setdefault(experiment.layer, []).append(experiment)
+        self.experiments = list(experiments)
+        self.default_model = default_model
+        self.assign = lru_cache(maxsize=cache_size)(self._assign)
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'ExperimentRouter':
+        experiments = [
+            Experiment(
+                name=e['name'], salt=e.get('salt', e['name']),
+                arms=[Arm(**arm) for arm in e['arms']],
+                layer=e.get('layer', 'default'),
+                offset=e.get('offset', 0.0), traffic=e.get('traffic', 1.0),
+            )
+            for e in config['experiments']
+        ]
+        return cls(experiments, config.get('layers'), config.get('default_model', 'control'))
+
+    @classmethod
+    def from_file(cls, path: str) -> 'ExperimentRouter':
+        with open(path) as f:
+            return cls.from_config(json.load(f))
+
+    def model_paths(self) -> Dict[str, str]:
+        return {arm.model: arm.model_path for e in self.experiments for arm in e.arms
+                if arm.model and arm.model_path}
+
+    def check_models(self, loaded: Iterable[str]):
+        required = {self.default_model} | {arm.model for e in self.experiments if e.binds_models
+                                           for arm in e.arms if arm.model}
+        missing = sorted(required - set(loaded))
+        if missing:
+            raise ValueError(f"Experiment arms use models that are not loaded: {missing}")
+
+    def _assign(self, user_id: int) -> Assignment:
+        return self.assign_many([user_id])[0]
+
+    def assign_many(self, user_ids: Iterable[int]) -> List[Assignment]:
+        user_ids = np.fromiter(user_ids, dtype=np.int64)
+        result: List[Optional[Assignment]] = [None] * len(user_ids)
+        pending = np.arange(len(user_ids))
+        layer_buckets = {}
+        for experiment in self.experiments:
+            if not experiment.binds_models or len(pending) == 0:
+                continue
+            if experiment.layer not in layer_buckets:
+                layer_buckets[experiment.layer] = bucket(user_ids, self.layers[experiment.layer])
+            arms = experiment.assign(user_ids[pending], layer_buckets[experiment.layer][pending])
+            for i, arm_index in zip(pending[arms >= 0].tolist(), arms[arms >= 0].tolist()):
+                arm = experiment.arms[arm_index]
+                result[i] = Assignment(experiment.name, arm.name, arm.model or self.default_model)
+            pending = pending[arms < 0]
+        for i in pending.tolist():
+            result[i] = Assignment(None, self.default_model, self.default_model)
+        return result
+
+
+def load_router(path: str = EXPERIMENTS_CONFIG) -> ExperimentRouter:
+    return ExperimentRouter.from_file(path) if path else ExperimentRouter.from_config(DEFAULT_CONFIG)
@@ -0,0 +1,115 @@
+"""
+Local Parquet cache of the feature tables, keyed by a DB-side change marker.
+
+Loading `nechetnaya_*_features_full_1507` with `SELECT *` takes minutes and puts
+the whole table through Postgres on every rollout. The first load writes the table,
+typed with the feature schema (see `app.core.feature_schema`), to
+`<FEATURE_CACHE_DIR>/<name>-<version>-s<schema version>.parquet`. Later starts read that file and go to the database
+only when the table's change marker (or the schema version) differs.
+
+The change marker is built from the table's oid and relfilenode (they change on
+DROP/CREATE, TRUNCATE and rewrites) and the insert/update/delete counters from
+`pg_stat_user_tables`. A counter reset also changes the marker, which costs one
+extra reload and never serves stale data.
+
+Set FEATURE_CACHE_DIR to enable the cache (empty = always load from SQL).
+
+Functions:
+
+- relation_version(table) -> str | None:
+    Change marker of any table (e.g. 'public.feed_data'), None if unavailable.
+
+- table_version(name) -> str | None:
+    Change marker of the feature table `name` ('users' or 'posts'), None if unavailable.
+
+- typed_version(version) -> str | None:
+    Key of a typed copy of a table: its change marker plus the schema version. Used for
+    the Parquet file name and the memory-mapped snapshots (see `app.core.snapshot`), so
+    both are rebuilt when either changes; None when the marker is unknown.
+
+- load_features_cached(name, version=None, cache_dir=FEATURE_CACHE_DIR) -> pd.DataFrame:
+    Typed feature table from the local cache if it matches `version`, else from SQL
+    (and cached). Logs the table size before and after typing.
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Optional, Union
+
+import pandas as pd
+from sqlalchemy import text
+
+from app.core.feature_schema import SCHEMA_VERSION, apply_schema, frame_nbytes
+from app.core.features_loader import FEATURE_TABLES, load_features
+from app.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+FEATURE_CACHE_DIR = os.environ.get('FEATURE_CACHE_DIR', '')
+
+CHANGE_MARKER_QUERY = text("""
+SELECT c.oid, pg_relation_filenode(c.oid) AS filenode,
+       s.n_tup_ins, s.n_tup_upd, s.n_tup_del
+FROM pg_class c
+LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+WHERE c.oid = to_regclass(:table)
+""")
+
+
+def relation_version(table: str) -> Optional[str]:
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(CHANGE_MARKER_QUERY, {"table": table}).first()
+    except Exception:
+        logger.exception("Could not read the change marker of %s", table)
+        return None
+    if row is None:
+        return None
+    marker = "-".join(str(value) for value in row)
+    return hashlib.sha1(marker.encode()).hexdigest()[:16]
+
+
+def table_version(name: str) -> Optional[str]:
+    return relation_version(FEATURE_TABLES[name])
+
+
+def typed_version(version: Optional[str]) -> Optional[str]:
+    return None if version is None else f'{version}-s{SCHEMA_VERSION}'
+
+
+def _load_typed(name: str) -> pd.DataFrame:
+    raw = load_features(name)
+    df = apply_schema(raw)
+    logger.info("%s features: %.1f MiB as loaded, %.1f MiB typed",
+                name, frame_nbytes(raw) / 2**20, frame_nbytes(df) / 2**20)
+    return df
+
+
+def load_features_cached(name: str, version: Optional[str] = None,
+                         cache_dir: Union[str, Path] = FEATURE_CACHE_DIR) -> pd.DataFrame:
+    if not cache_dir:
+        return _load_typed(name)
+    if version is None:
+        version = table_version(name)
+    if version is None:
+        return _load_typed(name)
+
+    cache_dir = Path(cache_dir)
+    path = cache_dir / f'{name}-{typed_version(version)}.parquet'
+    if path.exists():
+        df = pd.read_parquet(path)
+        logger.info("%s features: %.1f MiB typed, from %s", name, frame_nbytes(df) / 2**20, path)
+        return df
+
+    df = _load_typed(name)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.tmp-{os.getpid()}')
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    for stale in cache_dir.glob(f'{name}-*.parquet'):
+        if stale != path:
+            stale.unlink(missing_ok=True)
+    logger.info("Cached %s features at %s", name, path)
+    return df
@@ -0,0 +1,54 @@
+"""
+Explicit dtypes for the user/post feature tables.
+
+`pd.read_sql` returns float64 for every numeric column (embeddings, tfidf, rates)
+and object for text. The schema is applied once at load time:
+
+- ids (`user_id`, `post_id`) -> int32
+- categorical features (`CATEGORICAL_FEATURES`, the `cat_features` the CatBoost
+  models are trained with, plus any other text column) -> pandas categoricals
+- integer columns (one-hot flags, counts, ranks) -> smallest integer type that fits
+- all other numeric columns (embeddings, tfidf, rates) -> float32
+
+CatBoost accepts categorical columns for its `cat_features`, so the typed frames
+can be passed to the models as is.
+
+Functions:
+
+- apply_schema(df) -> pd.DataFrame: typed copy of a feature table.
+- frame_nbytes(df) -> int: deep memory usage of a DataFrame in bytes.
+"""
+
+from typing import Dict
+
+import pandas as pd
+
+# Must match the cat_features of recommender/training (see train_model_entry.py).
+CATEGORICAL_FEATURES = ('topic', 'country', 'exp_group', 'age_group')
+
+ID_DTYPES: Dict[str, str] = {'user_id': 'int32', 'post_id': 'int32'}
+
+# Bumped whenever the schema changes, so cached typed tables are rebuilt.
+SCHEMA_VERSION = 1
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    typed = {}
+    for column in df.columns:
+        series = df[column]
+        if column in ID_DTYPES:
+            typed[column] = series.astype(ID_DTYPES[column])
+        elif column in CATEGORICAL_FEATURES or not (
+                pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series)):
+            typed[column] = series.astype('category')
+        elif pd.api.types.is_bool_dtype(series):
+            typed[column] = series.astype('int8')
+        elif pd.api.types.is_integer_dtype(series):
+            typed[column] = pd.to_numeric(series, downcast='integer')
+        else:
+            typed[column] = series.astype('float32')
+    return pd.DataFrame(typed, index=df.index)
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True, index=False).sum())
@@ -4,72 +4,102 @@ using SQL queries, including user and post features, user likes, and top-liked p
 
 Functions:
 
-- batch_load_sql(query: str) -> pd.DataFrame:
+- batch_load_sql(query: str, params: dict = None) -> pd.DataFrame:
     Loads a large SQL query result in chunks and concatenates them into a single DataFrame.
     Useful for memory-efficient loading of large tables.
 
 - load_features(name: str) -> pd.DataFrame:
     Loads predefined feature tables for users or posts based on the `name` argument.
-    Raises ValueError if an unknown name is provided.
+    Raises ValueError if an unknown name is provided. Table names are in `FEATURE_TABLES`;
+    `app.core.feature_cache` keeps a local copy between restarts.
 
-- load_likes_list(user_id: int, time: datetime) -> list:
-    Returns a list of post IDs that the user has liked before a given timestamp.
+- load_likes(since: datetime = None) -> pd.DataFrame:
+    Returns likes (user_id, post_id, timestamp), optionally only those at or after `since`.
+    Used to build and refresh the in-memory likes index (see `app.core.likes_index`).
 
-- select_top_liked_posts_ids(limit: int) -> list:
-    Returns a list of post IDs with the highest number of likes, limited by `limit`.
+- load_posts(post_ids: list) -> pd.DataFrame:
+    Returns post content (id, text, topic) for the given IDs. Feeds `app.core.post_cache`.
+
+- load_post_like_counts(before: datetime = None) -> pd.DataFrame:
+    Returns like counts per post (post_id, likes), optionally only for likes before `before`.
+
+- load_post_likes(since: datetime) -> pd.DataFrame:
+    Returns likes of `feed_data` (user_id, post_id, timestamp) at or after `since`.
+
+- last_like_time() -> datetime: timestamp of the newest like in `feed_data`.
+
+The last three feed `app.core.popularity`.
+
+The incremental queries use bound parameters and run in a transaction (so the
+per-transaction statement timeout of `app.db.pool` applies); they are not
+server-side prepared, which would break behind PgBouncer in transaction pooling.
 
 Requirements:
 - Expects tables: `nechetnaya_user_features_full_1507`,
-  `nechetnaya_post_features_full_1507`, `nechetnaya_likes`, `feed_data`.
+  `nechetnaya_post_features_full_1507`, `nechetnaya_likes`, `feed_data`, `post`.
 """
 
 from datetime import datetime
+from typing import Optional
+
 import pandas as pd
 from app.db.database import engine
 
+LIKES_SINCE_QUERY = "SELECT user_id, post_id, timestamp FROM nechetnaya_likes WHERE timestamp >= %(since)s"
+
+POST_LIKES_SINCE_QUERY = "SELECT user_id, post_id, timestamp FROM feed_data WHERE target = 1 AND timestamp >= %(since)s"
+
+FEATURE_TABLES = {
+    'users': 'nechetnaya_user_features_full_1507',
+    'posts': 'nechetnaya_post_features_full_1507',
+}
 
-def batch_load_sql(query: str) -> pd.DataFrame:
+
+def batch_load_sql(query: str, params: Optional[dict] = None) -> pd.DataFrame:
     CHUNKSIZE = 50000
     chunks = []
     with engine.connect().execution_options(stream_results=True) as conn:
-        for chunk_dataframe in pd.read_sql(query, conn, chunksize=CHUNKSIZE):
+        for chunk_dataframe in pd.read_sql(query, conn, params=params, chunksize=CHUNKSIZE):
             chunks.append(chunk_dataframe)
+    if not chunks:
+        return pd.DataFrame()
     return pd.concat(chunks, ignore_index=True)
 
 
 def load_features(name: str) -> pd.DataFrame:
-    queries = {
-        'users': "SELECT * FROM nechetnaya_user_features_full_1507",
-        'posts': "SELECT * FROM nechetnaya_post_features_full_1507",
-    }
-    if name not in queries:
+    if name not in FEATURE_TABLES:
         raise ValueError(f"Unknown dataset name: {name}")
-    return batch_load_sql(queries[name])
+    return batch_load_sql(f"SELECT * FROM {FEATURE_TABLES[name]}")
 
 
-def load_likes_list(user_id: int, time: datetime) -> list:
-    query = """
-    SELECT post_id
-    FROM nechetnaya_likes
-    WHERE user_id = %(user_id)s
-      AND timestamp < %(time)s
-    """
-    with engine.connect() as conn:
-        df = pd.read_sql(query, conn, params={"user_id": user_id, "time": time})
+def load_likes(since: Optional[datetime] = None) -> pd.DataFrame:
+    if since is None:
+        return batch_load_sql("SELECT user_id, post_id, timestamp FROM nechetnaya_likes")
+    with engine.begin() as conn:
+        return pd.read_sql(LIKES_SINCE_QUERY, conn, params={"since": since})
+
 
-    return df['post_id'].tolist()
+def load_posts(post_ids: list) -> pd.DataFrame:
+    query = "SELECT id, text, topic FROM post WHERE id = ANY(%(ids)s)"
+    return batch_load_sql(query, params={"ids": [int(pid) for pid in post_ids]})
 
 
-def select_top_liked_posts_ids(limit: int) -> list:
+def last_like_time() -> Optional[datetime]:
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("SELECT MAX(timestamp) FROM feed_data WHERE target = 1").scalar()
+
+
+def load_post_like_counts(before: Optional[datetime] = None) -> pd.DataFrame:
     query = """
-    SELECT post_id, COUNT(*) as likes
+    SELECT post_id, COUNT(*) AS likes
     FROM feed_data
-    WHERE target = 1
+    WHERE target = 1 {}
     GROUP BY post_id
-    ORDER BY likes DESC
-    LIMIT %(limit)s
-    """
+    """.format("" if before is None else "AND timestamp < %(before)s")
     with engine.connect() as conn:
-        df = pd.read_sql(query, conn, params={"limit": limit})
-    return df['post_id'].tolist()
+        return pd.read_sql(query, conn, params=None if before is None else {"before": before})
+
 
+def load_post_likes(since: datetime) -> pd.DataFrame:
+    with engine.begin() as conn:
+        return pd.read_sql(POST_LIKES_SINCE_QUERY, conn, params={"since": since})
@@ -0,0 +1,112 @@
+"""
+Non-blocking impression log of served recommendations, for A/B analysis.
+
+Request handlers only append an event tuple to an in-memory queue (no I/O, no
+formatting). A background task drains the queue every IMPRESSION_FLUSH_SECONDS and
+writes the batch as one Parquet file with typed columns:
+
+    user_id int64, experiment string, exp_group string, model_version string,
+    post_ids list<int32>, timestamp timestamp[ms] (request time),
+    logged_at timestamp[ms], latency_ms float32
+
+Files go to `<IMPRESSION_LOG_DIR>/date=YYYY-MM-DD/impressions-<logger id>-<n>.parquet`, so the
+whole directory reads back as one dataset (`pd.read_parquet(IMPRESSION_LOG_DIR)`).
+If the queue is full (IMPRESSION_QUEUE_SIZE), new events are dropped and counted
+rather than slowing requests down.
+
+Set IMPRESSION_LOG_DIR to enable the log (empty = disabled).
+
+Classes:
+
+- ImpressionLogger(directory, max_queue=IMPRESSION_QUEUE_SIZE):
+    - log(user_id, experiment, exp_group, model_version, post_ids, timestamp, latency_ms)
+    - flush() -> int: writes queued events, returns how many were written.
+    - stats() -> dict: queued, logged, dropped and written counts, files written.
+
+Functions:
+
+- read_impressions(path) -> pd.DataFrame: impressions from a log directory or file.
+"""
+
+import os
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+IMPRESSION_LOG_DIR = os.environ.get('IMPRESSION_LOG_DIR', '')
+IMPRESSION_FLUSH_SECONDS = float(os.environ.get('IMPRESSION_FLUSH_SECONDS', 5))
+IMPRESSION_QUEUE_SIZE = int(os.environ.get('IMPRESSION_QUEUE_SIZE', 100_000))
+
+SCHEMA = pa.schema([
+    ('user_id', pa.int64()),
+    ('experiment', pa.string()),
+    ('exp_group', pa.string()),
+    ('model_version', pa.string()),
+    ('post_ids', pa.list_(pa.int32())),
+    ('timestamp', pa.timestamp('ms')),
+    ('logged_at', pa.timestamp('ms')),
+    ('latency_ms', pa.float32()),
+])
+
+
+class ImpressionLogger:
+    def __init__(self, directory: Union[str, Path], max_queue: int = IMPRESSION_QUEUE_SIZE):
+        self.directory = Path(directory)
+        self.max_queue = max_queue
+        # unique per process start (worker pids repeat across container restarts)
+        self._id = uuid.uuid4().hex[:12]
+        self._queue: deque = deque()
+        self._flush_lock = threading.Lock()
+        self._logged = 0
+        self._dropped = 0
+        self._written = 0
+        self._files = 0
+
+    def log(self, user_id: int, experiment: Optional[str], exp_group: str, model_version: str,
+            post_ids: List[int], timestamp: datetime, latency_ms: float):
+        if len(self._queue) >= self.max_queue:
+            self._dropped += 1
+            return
+        self._queue.append((user_id, experiment, exp_group, model_version, post_ids, timestamp,
+                            datetime.now(), latency_ms))
+        self._logged += 1
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            events = []
+            while self._queue:
+                events.append(self._queue.popleft())
+            if not events:
+                return 0
+            table = pa.Table.from_arrays(
+                [pa.array(list(column), type=field.type) for column, field in zip(zip(*events), SCHEMA)],
+                schema=SCHEMA,
+            )
+            partition = self.directory / f"date={datetime.now():%Y-%m-%d}"
+            partition.mkdir(parents=True, exist_ok=True)
+            name = f"impressions-{self._id}-{self._files:06d}.parquet"
+            pq.write_table(table, partition / f".{name}.tmp")
+            os.replace(partition / f".{name}.tmp", partition / name)
+            self._files += 1
+            self._written += len(events)
+            return len(events)
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._queue),
+            "logged": self._logged,
+            "dropped": self._dropped,
+            "written": self._written,
+            "files": self._files,
+        }
+
+
+def read_impressions(path: Union[str, Path]) -> pd.DataFrame:
+    return pd.read_parquet(path)
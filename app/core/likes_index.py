@@ -0,0 +1,156 @@
+"""
+In-memory index of user likes used to filter out already liked posts.
+
+Likes are loaded once at startup and kept in a CSR layout: users sorted by id, and
+for each user a slice of post_ids (int32) and timestamps (int64 ns) sorted by time.
+"Liked before time T" is two binary searches and an array slice, with no database
+round trip on the request path.
+
+New likes are pulled by `refresh()` from a window that overlaps the newest like seen
+(see `app.core.refresh_window`), so likes committed late are not lost, and kept in a
+small delta block; once the delta grows past `compact_rows` it is merged into the
+base block. Readers always see a consistent (base, delta) pair because the pair is
+replaced with a single assignment.
+
+Classes:
+
+- LikesIndex(likes: pd.DataFrame, compact_rows: int = ...):
+    - liked_before(user_id, time) -> np.ndarray: post_ids liked strictly before `time`.
+    - refresh() -> int: loads likes not seen yet, returns rows added.
+    - subscribe(callback): calls `callback(user_ids)` after a refresh adds likes for those users.
+    - nbytes: memory footprint of the index in bytes.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Callable, List
+
+import numpy as np
+import pandas as pd
+
+from app.core.features_loader import load_likes
+from app.core.refresh_window import RefreshWindow
+
+logger = logging.getLogger(__name__)
+
+LIKES_REFRESH_SECONDS = float(os.environ.get('LIKES_REFRESH_SECONDS', 60))
+LIKES_COMPACT_ROWS = int(os.environ.get('LIKES_COMPACT_ROWS', 200_000))
+
+
+def to_ns(time: datetime) -> int:
+    ts = pd.Timestamp(time)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(None)
+    return ts.value
+
+
+class _LikesBlock:
+    """Immutable CSR block: user_ids[i] owns post_ids/timestamps[offsets[i]:offsets[i + 1]]."""
+
+    def __init__(self, user_ids: np.ndarray, offsets: np.ndarray, post_ids: np.ndarray, timestamps: np.ndarray):
+        self.user_ids = user_ids
+        self.offsets = offsets
+        self.post_ids = post_ids
+        self.timestamps = timestamps
+
+    @classmethod
+    def from_arrays(cls, user_ids: np.ndarray, post_ids: np.ndarray, timestamps: np.ndarray) -> '_LikesBlock':
+        order = np.lexsort((timestamps, user_ids))
+        user_ids = user_ids[order]
+        unique_users, starts = np.unique(user_ids, return_index=True)
+        offsets = np.append(starts, len(user_ids)).astype(np.int64)
+        return cls(unique_users.astype(np.int64), offsets,
+                   post_ids[order].astype(np.int32), timestamps[order].astype(np.int64))
+
+    @classmethod
+    def from_frame(cls, likes: pd.DataFrame) -> '_LikesBlock':
+        return cls.from_arrays(
+            likes['user_id'].to_numpy(dtype=np.int64),
+            likes['post_id'].to_numpy(dtype=np.int64),
+            pd.to_datetime(likes['timestamp']).to_numpy(dtype='datetime64[ns]').view(np.int64),
+        )
+
+    @classmethod
+    def empty(cls) -> '_LikesBlock':
+        return cls.from_arrays(np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64))
+
+    def __len__(self) -> int:
+        return len(self.post_ids)
+
+    @property
+    def nbytes(self) -> int:
+        return self.user_ids.nbytes + self.offsets.nbytes + self.post_ids.nbytes + self.timestamps.nbytes
+
+    def expand_user_ids(self) -> np.ndarray:
+        return np.repeat(self.user_ids, np.diff(self.offsets))
+
+    def liked_before(self, user_id: int, ts_ns: int) -> np.ndarray:
+        i = np.searchsorted(self.user_ids, user_id)
+        if i == len(self.user_ids) or self.user_ids[i] != user_id:
+            return self.post_ids[:0]
+        start, end = self.offsets[i], self.offsets[i + 1]
+        stop = start + np.searchsorted(self.timestamps[start:end], ts_ns, side='left')
+        return self.post_ids[start:stop]
+
+
+class LikesIndex:
+    def __init__(self, likes: pd.DataFrame, compact_rows: int = LIKES_COMPACT_ROWS):
+        self.compact_rows = compact_rows
+        base = _LikesBlock.from_frame(likes) if len(likes) else _LikesBlock.empty()
+        self._blocks = (base, _LikesBlock.empty())
+        # a user likes a post once: (user_id, post_id) identifies a like
+        self.window = RefreshWindow(('user_id', 'post_id'))
+        self.window.advance(likes)
+        self._refresh_lock = threading.Lock()
+        self._listeners: List[Callable[[np.ndarray], None]] = []
+
+    def subscribe(self, callback: Callable[[np.ndarray], None]):
+        self._listeners.append(callback)
+
+    def __len__(self) -> int:
+        base, delta = self._blocks
+        return len(base) + len(delta)
+
+    @property
+    def nbytes(self) -> int:
+        base, delta = self._blocks
+        return base.nbytes + delta.nbytes
+
+    def liked_before(self, user_id: int, time: datetime) -> np.ndarray:
+        base, delta = self._blocks
+        ts_ns = to_ns(time)
+        liked = base.liked_before(user_id, ts_ns)
+        if len(delta):
+            recent = delta.liked_before(user_id, ts_ns)
+            if len(recent):
+                liked = np.concatenate([liked, recent])
+        return liked
+
+    def refresh(self) -> int:
+        with self._refresh_lock:
+            new_likes = self.window.advance(load_likes(since=self.window.since))
+            if new_likes.empty:
+                return 0
+
+            base, delta = self._blocks
+            new = _LikesBlock.from_frame(new_likes)
+            merged = _LikesBlock.from_arrays(
+                np.concatenate([delta.expand_user_ids(), new.expand_user_ids()]),
+                np.concatenate([delta.post_ids, new.post_ids]),
+                np.concatenate([delta.timestamps, new.timestamps]),
+            )
+            if len(merged) >= self.compact_rows:
+                base = _LikesBlock.from_arrays(
+                    np.concatenate([base.expand_user_ids(), merged.expand_user_ids()]),
+                    np.concatenate([base.post_ids, merged.post_ids]),
+                    np.concatenate([base.timestamps, merged.timestamps]),
+                )
+                merged = _LikesBlock.empty()
+
+            self._blocks = (base, merged)
+            logger.info("Likes index refreshed: +%d rows, next read from %s", len(new_likes), self.window.since)
+            for callback in self._listeners:
+                callback(new.user_ids)
+            return len(new_likes)
@@ -10,14 +10,24 @@ Functions:
     If the code is running in the LMS environment (`IS_LMS=1`), LMS-specific paths are used.
     Otherwise, default local paths are returned.
 
+- file_digest(path) -> str:
+    SHA-256 of the model file content (identifies a model version).
+
+- load_model(path) -> CatBoostClassifier:
+    Loads one CatBoostClassifier from disk.
+
 - load_models():
     Loads and returns two CatBoostClassifier models (test and control) from disk using the paths
-    obtained from `get_model_path()`.
+    obtained from `get_model_path()`. Files with identical content are loaded once and the
+    same instance is returned for both.
 
 Returns:
     Tuple[CatBoostClassifier, CatBoostClassifier]: test model and control model.
+
+The serving app keeps its models in `app.core.model_registry.ModelRegistry`.
 """
 
+import hashlib
 import os
 from typing import List
 
@@ -34,10 +44,27 @@ def get_model_path() -> List[str]:
     return [MODEL_PATH_TEST, MODEL_PATH_CONTROL]
 
 
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_model(path: str) -> CatBoostClassifier:
+    model = CatBoostClassifier()
+    model.load_model(path)
+    return model
+
+
 def load_models():
-    model_path = get_model_path()
-    model_test = CatBoostClassifier()
-    model_control = CatBoostClassifier()
-    model_test.load_model(model_path[0])
-    model_control.load_model(model_path[1])
+    loaded = {}
+    models = []
+    for path in get_model_path():
+        digest = file_digest(path)
+        if digest not in loaded:
+            loaded[digest] = load_model(path)
+        models.append(loaded[digest])
+    model_test, model_control = models
     return model_test, model_control
@@ -0,0 +1,129 @@
+"""
+Registry of the loaded CatBoost models and their scoring engines.
+
+Each distinct model file is loaded once, keyed by the SHA-256 of its content, and gets
+one ScoringEngine whose `version` is that digest, so result caches never mix models.
+Aliases ('test', 'control', or e.g. a canary alias) point at versions; a version stays
+resident while any alias points at it, so several versions can serve side by side.
+
+A reload builds the new model and engine off to the side, then swaps the alias table
+in a single assignment. Requests already running keep the engine they looked up, so
+no request is dropped or sees a half-built model. Versions no longer referenced by
+an alias are released after the swap.
+
+Set MODEL_WATCH_SECONDS to poll the aliased files and reload an alias when its file
+content changes (0 = off). `POST /admin/models/{alias}` reloads on demand.
+
+Classes:
+
+- ModelRegistry(engine_factory):
+    `engine_factory(model, version)` builds the ScoringEngine of a newly loaded model.
+    - assign(alias, path) -> str: loads `path` (once per content) and points `alias` at it.
+    - engine(alias) -> ScoringEngine: current engine of `alias` (KeyError if unknown).
+    - aliases() -> dict: alias -> version.
+    - check_files(): reloads aliases whose file changed on disk (file watch).
+    - stats() -> dict: per version: path, aliases, load time and memory.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Tuple
+
+import psutil
+from catboost import CatBoostClassifier
+
+from app.core.model_loader import file_digest, load_model
+from app.core.scoring import ScoringEngine
+
+logger = logging.getLogger(__name__)
+
+MODEL_WATCH_SECONDS = float(os.environ.get('MODEL_WATCH_SECONDS', 0))
+
+# Digest prefix used as the model version (engine.version, logs, cache keys).
+VERSION_LENGTH = 16
+
+
+class ModelVersion:
+    def __init__(self, version: str, path: str, model: CatBoostClassifier, engine: ScoringEngine,
+                 load_seconds: float, rss_delta: int):
+        self.version = version
+        self.path = path
+        self.model = model
+        self.engine = engine
+        self.load_seconds = load_seconds
+        self.rss_delta = rss_delta
+        self.loaded_at = time.time()
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else None,
+            "trees": self.model.tree_count_,
+            "load_seconds": round(self.load_seconds, 3),
+            "rss_delta_bytes": self.rss_delta,
+            "engine_bytes": self.engine.nbytes,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    def __init__(self, engine_factory: Callable[[CatBoostClassifier, str], ScoringEngine]):
+        self.engine_factory = engine_factory
+        # alias -> ModelVersion, replaced as a whole so a lookup is a single dict read
+        self._aliases: Dict[str, ModelVersion] = {}
+        # alias -> (path, mtime, size) of the file it was loaded from
+        self._files: Dict[str, Tuple[str, float, int]] = {}
+        self._lock = threading.Lock()
+
+    def engine(self, alias: str) -> ScoringEngine:
+        return self._aliases[alias].engine
+
+    def __contains__(self, alias: str) -> bool:
+        return alias in self._aliases
+
+    def aliases(self) -> Dict[str, str]:
+        return {alias: entry.version for alias, entry in self._aliases.items()}
+
+    def _load(self, path: str, version: str) -> ModelVersion:
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        start = time.perf_counter()
+        model = load_model(path)
+        engine = self.engine_factory(model, version)
+        load_seconds = time.perf_counter() - start
+        rss_delta = process.memory_info().rss - rss_before
+        logger.info("Loaded model %s from %s in %.2fs (+%.1f MiB RSS)",
+                    version, path, load_seconds, rss_delta / 2**20)
+        return ModelVersion(version, path, model, engine, load_seconds, rss_delta)
+
+    def assign(self, alias: str, path: str) -> str:
+        with self._lock:
+            stat = os.stat(path)
+            version = file_digest(path)[:VERSION_LENGTH]
+            loaded = {entry.version: entry for entry in self._aliases.values()}
+            entry = loaded.get(version) or self._load(path, version)
+            # versions no longer referenced by any alias are released with the old table
+            self._aliases = {**self._aliases, alias: entry}
+            self._files[alias] = (path, stat.st_mtime, stat.st_size)
+            return version
+
+    def check_files(self):
+        for alias, (path, mtime, size) in list(self._files.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if (stat.st_mtime, stat.st_size) != (mtime, size):
+                previous = self.aliases().get(alias)
+                version = self.assign(alias, path)
+                if version != previous:
+                    logger.info("Model file %s changed: %s now serves %s", path, alias, version)
+
+    def stats(self) -> dict:
+        aliases = self._aliases
+        return {
+            entry.version: {**entry.stats(), "aliases": sorted(a for a, e in aliases.items() if e is entry)}
+            for entry in aliases.values()
+        }
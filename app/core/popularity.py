@@ -0,0 +1,77 @@
+"""
+In-memory ranking of the most liked posts.
+
+Like counts per post are loaded once at startup with a full aggregation over
+`feed_data`, up to REFRESH_OVERLAP_SECONDS before the newest like. After that,
+`refresh()` reads the individual likes of an overlapping window (see
+`app.core.refresh_window`), counts only the (user_id, post_id, timestamp) rows not
+counted yet, and re-ranks. A like that commits late, with a timestamp inside the
+window, is still counted once. The ranked
+top-N list is replaced with a single assignment, so readers never see a partial
+update and requests never touch `feed_data`.
+
+Classes:
+
+- PopularityService(top_n: int = TOP_POSTS_N):
+    - top(limit) -> list: up to `limit` (<= top_n) most liked post IDs, best first.
+    - refresh() -> int: counts likes not seen yet, returns posts updated.
+"""
+
+import logging
+import os
+import threading
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from app.core.features_loader import last_like_time, load_post_like_counts, load_post_likes
+from app.core.refresh_window import RefreshWindow
+
+logger = logging.getLogger(__name__)
+
+TOP_POSTS_N = int(os.environ.get('TOP_POSTS_N', 100))
+POPULARITY_REFRESH_SECONDS = float(os.environ.get('POPULARITY_REFRESH_SECONDS', 300))
+
+
+class PopularityService:
+    def __init__(self, top_n: int = TOP_POSTS_N):
+        self.top_n = top_n
+        self._counts = pd.Series(dtype=np.int64)
+        self._top: List[int] = []
+        self.window = RefreshWindow(('user_id', 'post_id', 'timestamp'))
+        self._refresh_lock = threading.Lock()
+        self.refresh()
+
+    def top(self, limit: int) -> List[int]:
+        return self._top[:limit]
+
+    def refresh(self) -> int:
+        with self._refresh_lock:
+            counts, updated, since = self._counts, 0, self.window.since
+            if since is None:
+                last_like = last_like_time()
+                if last_like is None:
+                    return 0
+                # the newest likes are left to the windowed read below
+                since = last_like - self.window.overlap
+                counts = load_post_like_counts(before=since).set_index('post_id')['likes']
+                updated = len(counts)
+
+            rows = load_post_likes(since=since)
+            self.window.since = since
+            new_likes = self.window.advance(rows)
+            if not new_likes.empty:
+                counts = counts.add(new_likes.groupby('post_id').size(), fill_value=0)
+                updated = max(updated, new_likes['post_id'].nunique())
+            if not updated:
+                return 0
+
+            counts = counts.astype(np.int64)
+            ranked = counts.rename_axis('post_id').reset_index(name='likes')
+            ranked = ranked.sort_values(['likes', 'post_id'], ascending=[False, True], kind='stable')
+
+            self._counts = counts
+            self._top = ranked['post_id'].head(self.top_n).astype(int).tolist()
+            logger.info("Top posts refreshed: %d posts updated, next read from %s", updated, self.window.since)
+            return updated
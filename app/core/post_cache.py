@@ -0,0 +1,102 @@
+"""
+In-process cache of post content (id, text, topic) for API responses.
+
+Posts of the candidate catalog (and the most liked posts) are loaded once at
+startup and pinned: texts in a list, topics as small integer codes into a list of
+topic names, ids in a dict for O(1) lookup. Any other post requested through the
+API is loaded from the DB on first use and kept in a bounded LRU.
+
+Recommendation and /post/{id} responses are built from the cache, so there is no DB
+round trip and no ORM object per post in the common case.
+
+Classes:
+
+- PostCache(posts: pd.DataFrame, lru_size: int = POST_CACHE_LRU_SIZE):
+    - get_many(ids) -> (dict, list): cached PostGet objects by id and the missing ids.
+    - get_or_load(ids, db) -> list: PostGet objects in `ids` order, loading misses from `db`.
+    - put(posts): adds posts (objects with id/text/topic) to the LRU part.
+    - invalidate(ids=None): drops the given posts (or every post) from the cache.
+    - nbytes: approximate memory footprint in bytes.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.table_post import select_posts_by_ids
+from app.schema import PostGet
+
+POST_CACHE_LRU_SIZE = int(os.environ.get('POST_CACHE_LRU_SIZE', 10_000))
+
+
+class PostCache:
+    def __init__(self, posts: pd.DataFrame, lru_size: int = POST_CACHE_LRU_SIZE):
+        topics = posts['topic'].fillna('').astype('category')
+        self._topics: List[str] = list(topics.cat.categories)
+        self._topic_codes = topics.cat.codes.to_numpy(dtype=np.int16)
+        self._texts: List[str] = posts['text'].tolist()
+        self._slots: Dict[int, int] = {int(pid): slot for slot, pid in enumerate(posts['id'])}
+
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._slots) + len(self._lru)
+
+    @property
+    def nbytes(self) -> int:
+        texts = sum(sys.getsizeof(t) for t in self._texts)
+        lru = sum(sys.getsizeof(text) + sys.getsizeof(topic) for text, topic in self._lru.values())
+        return texts + lru + self._topic_codes.nbytes + sys.getsizeof(self._slots)
+
+    def get_many(self, ids: Iterable[int]) -> Tuple[Dict[int, PostGet], List[int]]:
+        found, missing = {}, []
+        with self._lock:
+            for post_id in ids:
+                slot = self._slots.get(post_id)
+                if slot is not None:
+                    found[post_id] = PostGet.construct(
+                        id=post_id, text=self._texts[slot], topic=self._topics[self._topic_codes[slot]]
+                    )
+                elif post_id in self._lru:
+                    self._lru.move_to_end(post_id)
+                    text, topic = self._lru[post_id]
+                    found[post_id] = PostGet.construct(id=post_id, text=text, topic=topic)
+                else:
+                    missing.append(post_id)
+        return found, missing
+
+    def put(self, posts: Iterable):
+        with self._lock:
+            for post in posts:
+                self._lru[post.id] = (post.text, post.topic)
+                self._lru.move_to_end(post.id)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def invalidate(self, ids: Optional[Iterable[int]] = None):
+        with self._lock:
+            if ids is None:
+                self._slots.clear()
+                self._texts = []
+                self._topic_codes = self._topic_codes[:0]
+                self._lru.clear()
+                return
+            for post_id in ids:
+                self._slots.pop(post_id, None)
+                self._lru.pop(post_id, None)
+
+    async def get_or_load(self, ids: List[int], db: AsyncSession) -> List[PostGet]:
+        found, missing = self.get_many(ids)
+        if missing:
+            loaded = (await db.execute(select_posts_by_ids, {"ids": missing})).scalars().all()
+            self.put(loaded)
+            found.update({post.id: PostGet.from_orm(post) for post in loaded})
+        return [found[pid] for pid in ids if pid in found]
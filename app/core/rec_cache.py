@@ -0,0 +1,104 @@
+"""
+Cache of ranked recommendations per (model, user, hour, weekday, likes version).
+
+The model's only time-dependent inputs are hour and weekday, and the candidate set
+only depends on which posts the user liked before the request time. Since likes
+before T are a time-sorted prefix of the user's likes, their count identifies the
+set and serves as the likes version. A repeat visit within the same hour with no
+new likes is answered without scoring.
+
+Each entry keeps the top `top_k` post IDs (int32), so any `limit <= top_k` can be
+served from it. Entries expire after `ttl` seconds and the least recently used
+entries are evicted past `max_entries`. `invalidate_users` drops the entries of
+users whose likes changed (hooked to `LikesIndex.refresh`).
+
+Classes:
+
+- RecommendationCache(max_entries, ttl, top_k):
+    - get(key) -> list | None
+    - put(key, post_ids)
+    - invalidate_users(user_ids)
+    - stats() -> dict: hits, misses, hit rate, evictions, invalidations and size.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+REC_CACHE_SIZE = int(os.environ.get('REC_CACHE_SIZE', 100_000))
+REC_CACHE_TTL_SECONDS = float(os.environ.get('REC_CACHE_TTL_SECONDS', 3600))
+REC_CACHE_TOP_K = int(os.environ.get('REC_CACHE_TOP_K', 50))
+
+# (model version, user_id, hour, weekday, likes version)
+CacheKey = Tuple[Hashable, int, int, int, int]
+
+
+class RecommendationCache:
+    def __init__(self, max_entries: int = REC_CACHE_SIZE, ttl: float = REC_CACHE_TTL_SECONDS,
+                 top_k: int = REC_CACHE_TOP_K):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.top_k = top_k
+        self._entries: "OrderedDict[CacheKey, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._by_user: Dict[int, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: CacheKey):
+        self._entries.pop(key, None)
+        user_keys = self._by_user.get(key[1])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._by_user[key[1]]
+
+    def get(self, key: CacheKey) -> Optional[List[int]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1].tolist()
+
+    def put(self, key: CacheKey, post_ids: List[int]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, np.asarray(post_ids, dtype=np.int32))
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(key[1], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def invalidate_users(self, user_ids: Iterable[int]):
+        with self._lock:
+            for user_id in user_ids:
+                for key in self._by_user.pop(int(user_id), ()):
+                    self._entries.pop(key, None)
+                    self._invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations,
+            }
@@ -4,57 +4,96 @@ recommendations based on user features and a trained CatBoost model.
 
 Functions:
 
-- get_user_df(user_id: int, time: datetime) -> pd.DataFrame:
-    Constructs a feature-enriched DataFrame of posts for a given user.
-    Filters out posts the user has already interacted with (liked).
-    Adds user-related time features (hour and weekday).
-    Returns:
-        pd.DataFrame: Feature matrix combining user and post features.
+- get_user_vector(user_id: int, columns: list) -> np.ndarray | None:
+    Returns the user's features ordered as `columns`, or None for an unknown user.
+
+- get_candidate_rows(user_id: int, engine: ScoringEngine, liked: np.ndarray) -> np.ndarray | None:
+    Engine rows to score: posts not liked yet, shortlisted by `state.retriever` when
+    embedding retrieval is enabled (None means the whole catalog).
 
-- get_recommend_ids(user_id: int, time: datetime, model: CatBoostClassifier, limit: int = 5) -> list:
+- get_recommend_ids(user_id: int, time: datetime, engine: ScoringEngine, limit: int = 5) -> list:
     Generates a ranked list of post IDs recommended for the given user.
-    Scores posts using the provided CatBoost model based on user-post features.
+    Filters out posts the user liked before `time` (in-memory likes index) and scores
+    the rest with the engine's CatBoost model (see `app.core.scoring`).
+    Results are served from `state.rec_cache` when the same user, model, hour,
+    weekday and likes were scored before.
     Returns:
         list: Top-N recommended post IDs, ranked by predicted relevance.
+
+- get_recommend_ids_batch(requests: list, engine: ScoringEngine, limit: int = 5) -> list:
+    Same as `get_recommend_ids` for many (user_id, time) pairs scored by one model,
+    stacking all candidates into one matrix per `predict_proba` call.
+    Returns:
+        list: Top-N post IDs per request (empty list for unknown users), in input order.
 """
 
-import numpy as np
-import pandas as pd
 from datetime import datetime
-from catboost import CatBoostClassifier
+from typing import List, Optional, Tuple
+
+import numpy as np
 
 import app.core.state as state
-from app.core.features_loader import load_likes_list
+from app.core.rec_cache import CacheKey
+from app.core.scoring import ScoringEngine
+
 
-def get_user_df(user_id: int, time: datetime) -> pd.DataFrame:
-    user_row = state.users_data[state.users_data['user_id'] == user_id]
-    if user_row.empty:
-        return pd.DataFrame()
+def get_user_vector(user_id: int, columns: list) -> Optional[np.ndarray]:
+    return state.user_store.get(user_id, columns)
 
-    user_data = user_row.drop('user_id', axis=1).iloc[0].to_dict()
-    user_data['hour'] = np.float32(time.hour)
-    user_data['weekday'] = np.float32(time.weekday())
 
-    posts_list = load_likes_list(user_id, time)
-    if not posts_list:
-        post_subset = state.posts_data
-    else:
-        posts_to_exclude = set(posts_list)
-        post_subset = state.posts_data.loc[~state.posts_data['post_id'].isin(posts_to_exclude)]
+def cache_key(engine: ScoringEngine, user_id: int, time: datetime, liked: np.ndarray) -> CacheKey:
+    return engine.version, user_id, time.hour, time.weekday(), len(liked)
 
-    post_indexed = post_subset.set_index('post_id')
-    user_features_df = pd.DataFrame([user_data] * len(post_indexed), index=post_indexed.index)
-    df = pd.concat([post_indexed, user_features_df], axis=1)
 
-    return df
+def get_candidate_rows(user_id: int, engine: ScoringEngine, liked: np.ndarray) -> Optional[np.ndarray]:
+    rows = engine.candidate_rows(liked)
+    retriever = state.retriever
+    if retriever is None:
+        return rows
+    user_embedding = state.user_store.get(user_id, retriever.user_columns)
+    return retriever.shortlist(user_embedding, rows)
 
 
-def get_recommend_ids(user_id: int, time: datetime, model: CatBoostClassifier, limit: int = 5) -> list:
-    df = get_user_df(user_id, time)
-    if df.empty:
+def get_recommend_ids(user_id: int, time: datetime, engine: ScoringEngine, limit: int = 5) -> list:
+    user_vector = get_user_vector(user_id, engine.user_columns)
+    if user_vector is None:
         return []
 
-    features = model.feature_names_
-    df['pred'] = model.predict_proba(df[features])[:, 1]
+    liked = state.likes_index.liked_before(user_id, time)
+    cache = state.rec_cache
+    if cache is None or limit > cache.top_k:
+        return engine.top_k(user_vector, time, limit, get_candidate_rows(user_id, engine, liked))
+
+    key = cache_key(engine, user_id, time, liked)
+    post_ids = cache.get(key)
+    if post_ids is None:
+        post_ids = engine.top_k(user_vector, time, cache.top_k, get_candidate_rows(user_id, engine, liked))
+        cache.put(key, post_ids)
+    return post_ids[:limit]
+
+
+def get_recommend_ids_batch(requests: List[Tuple[int, datetime]], engine: ScoringEngine, limit: int = 5) -> List[list]:
+    cache = state.rec_cache
+    use_cache = cache is not None and limit <= cache.top_k
+    results: List[list] = [[] for _ in requests]
+    scored, keys, items = [], [], []
+    for i, (user_id, time) in enumerate(requests):
+        user_vector = get_user_vector(user_id, engine.user_columns)
+        if user_vector is None:
+            continue
+        liked = state.likes_index.liked_before(user_id, time)
+        key = cache_key(engine, user_id, time, liked)
+        if use_cache:
+            post_ids = cache.get(key)
+            if post_ids is not None:
+                results[i] = post_ids[:limit]
+                continue
+        scored.append(i)
+        keys.append(key)
+        items.append((user_vector, time, get_candidate_rows(user_id, engine, liked)))
 
-    return df.nlargest(limit, 'pred').index.tolist()
+    for i, key, post_ids in zip(scored, keys, engine.top_k_many(items, cache.top_k if use_cache else limit)):
+        if use_cache:
+            cache.put(key, post_ids)
+        results[i] = post_ids[:limit]
+    return results
@@ -0,0 +1,53 @@
+"""
+Overlapping lower bound for incremental reads of append-only tables.
+
+A plain `timestamp > high-water mark` read loses rows that commit late with a
+timestamp at or below the mark. `RefreshWindow` instead re-reads everything from
+REFRESH_OVERLAP_SECONDS below the newest timestamp seen (`timestamp >= since`) and
+drops the rows whose key was already applied, so a late row is picked up as long as
+it commits within the overlap. Only the keys inside the window are kept.
+
+Settings: REFRESH_OVERLAP_SECONDS (600).
+
+Classes:
+
+- RefreshWindow(key_columns, overlap_seconds=REFRESH_OVERLAP_SECONDS):
+    - since: lower bound (inclusive) of the next read; None before the first one.
+    - advance(rows) -> pd.DataFrame: the rows of a read from `since` that were not
+      applied yet; moves `since` and the seen keys forward.
+"""
+
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+
+import pandas as pd
+
+REFRESH_OVERLAP_SECONDS = float(os.environ.get('REFRESH_OVERLAP_SECONDS', 600))
+
+
+class RefreshWindow:
+    def __init__(self, key_columns: Sequence[str], overlap_seconds: float = REFRESH_OVERLAP_SECONDS):
+        self.key_columns = list(key_columns)
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self.since: Optional[datetime] = None
+        self._seen = set()
+
+    def _keys(self, rows: pd.DataFrame) -> list:
+        return list(zip(*(rows[column].to_numpy().tolist() for column in self.key_columns)))
+
+    def advance(self, rows: pd.DataFrame) -> pd.DataFrame:
+        if rows.empty:
+            return rows
+        if self._seen:
+            new_rows = rows[[key not in self._seen for key in self._keys(rows)]]
+        else:
+            new_rows = rows
+
+        since = pd.Timestamp(rows['timestamp'].max()).to_pydatetime() - self.overlap
+        if self.since is not None:
+            since = max(since, self.since)
+        # a read covers [self.since, ...], so it holds every key of the new window
+        self._seen = set(self._keys(rows[rows['timestamp'] >= since]))
+        self.since = since
+        return new_rows
@@ -0,0 +1,117 @@
+"""
+Embedding-based candidate retrieval ahead of CatBoost ranking.
+
+The feature tables carry matching user and post embeddings (`user_emb_i` with
+`item_emb_i` or `post_emb_i`). The retriever keeps the post embeddings as one
+float32 matrix in `posts_data` order (the same row order as `ScoringEngine`), and
+shortlists the posts with the highest dot product with the user embedding, using an
+exact matrix-vector product. Only the shortlist is sent to CatBoost, so ranking cost
+no longer grows with the catalog size.
+
+Set RETRIEVAL_CANDIDATES to the shortlist size (0 disables retrieval and ranks the
+whole catalog). Use `evaluate_recall` (or `python -m app.core.retrieval`) to pick it:
+it reports Recall@K of the two-stage top-K against full scoring.
+
+Classes:
+
+- EmbeddingRetriever(posts_data, user_columns, n_candidates):
+    - shortlist(user_embedding, rows=None, n=None) -> np.ndarray: engine rows of the
+      `n` best posts, restricted to `rows` when given.
+
+Functions:
+
+- embedding_columns(user_columns, post_columns) -> (list, list):
+    Matching user/post embedding column names.
+
+- evaluate_recall(engine, retriever, user_store, user_ids, time, shortlist_sizes, k) -> pd.DataFrame:
+    Mean Recall@K of retrieval + ranking versus full scoring, per shortlist size.
+"""
+
+import os
+import re
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.core.scoring import ScoringEngine, top_k_indices
+from app.core.user_store import UserFeatureStore
+
+RETRIEVAL_CANDIDATES = int(os.environ.get('RETRIEVAL_CANDIDATES', 0))
+
+POST_EMBEDDING_PREFIXES = ('item_emb_', 'post_emb_')
+
+
+def embedding_columns(user_columns: Iterable[str], post_columns: Iterable[str]) -> Tuple[List[str], List[str]]:
+    user_dims = {int(m.group(1)): c for c in user_columns if (m := re.fullmatch(r'user_emb_(\d+)', c))}
+    post_columns = set(post_columns)
+    for prefix in POST_EMBEDDING_PREFIXES:
+        dims = sorted(d for d in user_dims if f'{prefix}{d}' in post_columns)
+        if dims:
+            return [user_dims[d] for d in dims], [f'{prefix}{d}' for d in dims]
+    return [], []
+
+
+class EmbeddingRetriever:
+    def __init__(self, posts_data: pd.DataFrame, user_columns: Iterable[str],
+                 n_candidates: int = RETRIEVAL_CANDIDATES):
+        self.user_columns, self.post_columns = embedding_columns(user_columns, posts_data.columns)
+        if not self.user_columns:
+            raise ValueError("No matching user/post embedding columns for retrieval")
+        self.n_candidates = n_candidates
+        self.post_ids = posts_data['post_id'].to_numpy(dtype=np.int64)
+        self.post_embeddings = np.ascontiguousarray(posts_data[self.post_columns].to_numpy(dtype=np.float32))
+
+    def shortlist(self, user_embedding: np.ndarray, rows: Optional[np.ndarray] = None,
+                  n: Optional[int] = None) -> np.ndarray:
+        n = self.n_candidates if n is None else n
+        scores = self.post_embeddings @ user_embedding
+        if rows is None:
+            return np.sort(top_k_indices(scores, n))
+        return np.sort(rows[top_k_indices(scores[rows], n)])
+
+
+def evaluate_recall(engine: ScoringEngine, retriever: EmbeddingRetriever, user_store: UserFeatureStore,
+                    user_ids: Iterable[int], time: datetime, shortlist_sizes: Sequence[int],
+                    k: int = 5) -> pd.DataFrame:
+    hits = {n: [] for n in shortlist_sizes}
+    for user_id in user_ids:
+        user_vector = user_store.get(user_id, engine.user_columns)
+        if user_vector is None:
+            continue
+        post_ids, scores = engine.score(user_vector, time)
+        exact = set(post_ids[top_k_indices(scores, k)].tolist())
+        ranked_rows = top_k_indices(scores, len(scores))
+        rank_of_row = np.empty(len(scores), dtype=np.int64)
+        rank_of_row[ranked_rows] = np.arange(len(scores))
+
+        user_embedding = user_store.get(user_id, retriever.user_columns)
+        for n in shortlist_sizes:
+            # ranking a shortlist keeps the full-scoring order of its members
+            rows = retriever.shortlist(user_embedding, n=n)
+            top_rows = rows[np.argsort(rank_of_row[rows])[:k]]
+            hits[n].append(len(exact & set(engine.post_ids[top_rows].tolist())) / k)
+
+    return pd.DataFrame({
+        'shortlist_size': list(shortlist_sizes),
+        f'recall@{k}': [np.mean(hits[n]) if hits[n] else np.nan for n in shortlist_sizes],
+        'share_of_catalog': [n / engine.n_posts for n in shortlist_sizes],
+    })
+
+
+if __name__ == "__main__":
+    from app.core.features_loader import load_features
+    from app.core.model_loader import load_models
+
+    model_test, _ = load_models()
+    users_data = load_features('users')
+    posts_data = load_features('posts')
+    store = UserFeatureStore.from_frame(users_data)
+    engine = ScoringEngine(model_test, posts_data, store.columns)
+    retriever = EmbeddingRetriever(posts_data, store.columns)
+
+    sample = users_data['user_id'].sample(n=min(500, len(users_data)), random_state=0)
+    report = evaluate_recall(engine, retriever, store, sample, datetime(2021, 12, 10, 12),
+                             shortlist_sizes=[50, 100, 200, 400, 800, 1600])
+    print(report.to_string(index=False))
@@ -0,0 +1,254 @@
+"""
+Vectorized candidate scoring for the recommendation endpoint.
+
+The post features of the candidate catalog are packed once, at startup, into a
+float32 block whose columns follow the model's numeric features. A request only
+writes the user vector and the time features (hour, weekday) into a reusable buffer
+and hands the buffer to `predict_proba`, so no DataFrame is built on the hot path.
+
+Models with categorical features get a second, object block holding the categorical
+values already encoded as bytes (encoded once per distinct value at startup). User
+categorical values arrive as codes in the user vector (see `UserFeatureStore`) and are
+mapped to their pre-encoded bytes. Both blocks go to CatBoost as `FeaturesData`, which
+skips the per-call DataFrame validation and string conversion.
+
+Classes:
+
+- ScoringEngine(model, posts_data, user_columns, version=None, user_categories=None):
+    Holds the column-ordered post block for one model and scores candidates for a user.
+    `version` identifies the model in result caches (a unique token by default).
+    `user_categories` maps categorical user columns to their category lists.
+    - candidate_rows(exclude_post_ids) -> np.ndarray: positions of posts not excluded.
+    - build(user_vector, time, rows) -> (np.ndarray, np.ndarray | None): fills the
+      per-thread numeric (and categorical) buffers.
+    - score(user_vector, time, rows) -> (np.ndarray, np.ndarray): post ids and scores.
+    - top_k(user_vector, time, limit, rows) -> list: top-N post ids, best first (through
+      `ranker` when one is attached, see `app.core.tree_ranker`).
+    - top_k_many(items, limit, max_rows) -> list: top-N post ids for many users, scoring
+      a stacked matrix with one `predict_proba` call per `max_rows` rows.
+
+Functions:
+
+- encode_categories(values: pd.Series) -> np.ndarray:
+    Categorical column as an object array of bytes, encoding each distinct value once.
+
+- top_k_indices(scores: np.ndarray, limit: int) -> np.ndarray:
+    Positions of the `limit` largest scores, ordered by descending score.
+"""
+
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from catboost import CatBoostClassifier, FeaturesData
+
+TIME_FEATURES = ('hour', 'weekday')
+
+# Upper bound on rows of a stacked batch matrix (~1.2 KB per row for the serving models).
+BATCH_MAX_ROWS = int(os.environ.get('BATCH_MAX_ROWS', 200_000))
+
+# (user_vector, time, candidate rows or None for the whole catalog)
+BatchItem = Tuple[np.ndarray, datetime, Optional[np.ndarray]]
+
+
+def _as_index(positions: Sequence[int]):
+    """Return a slice for contiguous positions (cheap view), else an index array."""
+    positions = list(positions)
+    if positions and positions == list(range(positions[0], positions[-1] + 1)):
+        return slice(positions[0], positions[-1] + 1)
+    return np.asarray(positions, dtype=np.intp)
+
+
+def encode_categories(values: pd.Series) -> np.ndarray:
+    """Object array of bytes for a categorical column, encoding each distinct value once."""
+    values = values.astype('category')
+    lookup = np.array([str(c).encode() for c in values.cat.categories] + [b''], dtype=object)
+    return lookup[values.cat.codes.to_numpy()]
+
+
+def top_k_indices(scores: np.ndarray, limit: int) -> np.ndarray:
+    if limit <= 0 or len(scores) == 0:
+        return np.empty(0, dtype=np.intp)
+    if limit < len(scores):
+        part = np.argpartition(-scores, limit - 1)[:limit]
+    else:
+        part = np.arange(len(scores))
+    return part[np.argsort(-scores[part], kind='stable')]
+
+
+class ScoringEngine:
+    def __init__(self, model: CatBoostClassifier, posts_data: pd.DataFrame, user_columns: Iterable[str],
+                 version: Optional[str] = None, user_categories: Optional[Dict[str, list]] = None):
+        self.model = model
+        self.version = version or uuid.uuid4().hex
+        self.features = list(model.feature_names_)
+        cat_names = {self.features[i] for i in model.get_cat_feature_indices()}
+        self.cat_features = [f for f in self.features if f in cat_names]
+        self.num_features = [f for f in self.features if f not in cat_names]
+        user_columns = set(user_columns)
+
+        self.user_columns = [f for f in self.features if f in user_columns]
+        post_columns = [
+            f for f in self.features
+            if f not in user_columns and f not in TIME_FEATURES and f in posts_data.columns
+        ]
+        missing = set(self.features) - set(self.user_columns) - set(post_columns) - set(TIME_FEATURES)
+        if missing:
+            raise ValueError(f"Features not found in user or post data: {sorted(missing)}")
+
+        position = {name: i for i, name in enumerate(self.num_features)}
+        user_num = [i for i, c in enumerate(self.user_columns) if c not in cat_names]
+        self._user_source = slice(None) if len(user_num) == len(self.user_columns) else np.array(user_num)
+        self._user_index = _as_index([position[self.user_columns[i]] for i in user_num])
+        self._time_index = {c: position[c] for c in TIME_FEATURES if c in position}
+
+        self.post_ids = posts_data['post_id'].to_numpy(dtype=np.int64)
+        post_num = [c for c in post_columns if c not in cat_names]
+        self._post_block = np.zeros((len(self.post_ids), len(self.num_features)), dtype=np.float32)
+        self._post_block[:, _as_index([position[c] for c in post_num])] = (
+            posts_data[post_num].to_numpy(dtype=np.float32)
+        )
+
+        # categorical features: pre-encoded post values, user codes -> pre-encoded values
+        self._post_cat = None
+        self._user_cat = []
+        if self.cat_features:
+            cat_position = {name: i for i, name in enumerate(self.cat_features)}
+            self._post_cat = np.full((len(self.post_ids), len(self.cat_features)), b'', dtype=object)
+            for c in post_columns:
+                if c in cat_names:
+                    self._post_cat[:, cat_position[c]] = encode_categories(posts_data[c])
+            user_categories = user_categories or {}
+            for i, c in enumerate(self.user_columns):
+                if c in cat_names:
+                    if c not in user_categories:
+                        raise ValueError(f"No categories for categorical user feature: {c}")
+                    lookup = [str(v).encode() for v in user_categories[c]] + [b'']
+                    self._user_cat.append((cat_position[c], i, lookup))
+        # optional faster ranker with the same top_k signature (see app.core.tree_ranker)
+        self.ranker = None
+        self._local = threading.local()
+
+    @property
+    def n_posts(self) -> int:
+        return len(self.post_ids)
+
+    @property
+    def nbytes(self) -> int:
+        cat_bytes = self._post_cat.nbytes if self._post_cat is not None else 0
+        return self._post_block.nbytes + cat_bytes + self.post_ids.nbytes
+
+    def _buffer(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        # One buffer per worker thread: sync handlers run concurrently in a threadpool.
+        buf = getattr(self._local, 'buf', None)
+        if buf is None:
+            buf = self._post_block.copy()
+            self._local.buf = buf
+            self._local.cat_buf = None if self._post_cat is None else self._post_cat.copy()
+            self._local.full = True
+        return buf, self._local.cat_buf
+
+    def candidate_rows(self, exclude_post_ids: Optional[Iterable[int]] = None) -> Optional[np.ndarray]:
+        """Positions of candidate posts; None means the whole catalog."""
+        if exclude_post_ids is None:
+            return None
+        if isinstance(exclude_post_ids, np.ndarray):
+            exclude = exclude_post_ids
+        else:
+            exclude = np.fromiter(exclude_post_ids, dtype=np.int64)
+        if exclude.size == 0:
+            return None
+        return np.flatnonzero(~np.isin(self.post_ids, exclude))
+
+    def build(self, user_vector: np.ndarray, time: datetime,
+              rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        buf, cat_buf = self._buffer()
+        if rows is None:
+            n = self.n_posts
+            if not self._local.full:
+                buf[:] = self._post_block
+                if cat_buf is not None:
+                    cat_buf[:] = self._post_cat
+                self._local.full = True
+        else:
+            n = len(rows)
+            np.take(self._post_block, rows, axis=0, out=buf[:n])
+            if cat_buf is not None:
+                np.take(self._post_cat, rows, axis=0, out=cat_buf[:n])
+            self._local.full = False
+
+        block = buf[:n]
+        cat_block = None if cat_buf is None else cat_buf[:n]
+        self._fill_user(block, cat_block, user_vector, time)
+        return block, cat_block
+
+    def _fill_user(self, block: np.ndarray, cat_block: Optional[np.ndarray], user_vector: np.ndarray,
+                   time: datetime):
+        block[:, self._user_index] = user_vector[self._user_source]
+        if 'hour' in self._time_index:
+            block[:, self._time_index['hour']] = time.hour
+        if 'weekday' in self._time_index:
+            block[:, self._time_index['weekday']] = time.weekday()
+        for column, source, lookup in self._user_cat:
+            cat_block[:, column] = lookup[int(user_vector[source])]
+
+    def _predict(self, block: np.ndarray, cat_block: Optional[np.ndarray]) -> np.ndarray:
+        if cat_block is None:
+            return self.model.predict_proba(block)[:, 1]
+        data = FeaturesData(
+            num_feature_data=block, cat_feature_data=cat_block,
+            num_feature_names=self.num_features, cat_feature_names=self.cat_features,
+        )
+        return self.model.predict_proba(data)[:, 1]
+
+    def score(self, user_vector: np.ndarray, time: datetime,
+              rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        block, cat_block = self.build(user_vector, time, rows)
+        post_ids = self.post_ids if rows is None else self.post_ids[rows]
+        if len(block) == 0:
+            return post_ids, np.empty(0, dtype=np.float64)
+        return post_ids, self._predict(block, cat_block)
+
+    def top_k(self, user_vector: np.ndarray, time: datetime, limit: int,
+              rows: Optional[np.ndarray] = None) -> List[int]:
+        if self.ranker is not None:
+            return self.ranker.top_k(user_vector, time, limit, rows)
+        post_ids, scores = self.score(user_vector, time, rows)
+        return post_ids[top_k_indices(scores, limit)].tolist()
+
+    def top_k_many(self, items: Sequence[BatchItem], limit: int, max_rows: int = BATCH_MAX_ROWS) -> List[List[int]]:
+        all_rows = np.arange(self.n_posts)
+        results = []
+        chunk, chunk_rows = [], 0
+        for user_vector, time, rows in items:
+            rows = all_rows if rows is None else rows
+            if chunk and chunk_rows + len(rows) > max_rows:
+                results.extend(self._top_k_stacked(chunk, limit))
+                chunk, chunk_rows = [], 0
+            chunk.append((user_vector, time, rows))
+            chunk_rows += len(rows)
+        if chunk:
+            results.extend(self._top_k_stacked(chunk, limit))
+        return results
+
+    def _top_k_stacked(self, items: Sequence[BatchItem], limit: int) -> List[List[int]]:
+        rows = np.concatenate([item[2] for item in items])
+        if len(rows) == 0:
+            return [[] for _ in items]
+        block = np.take(self._post_block, rows, axis=0)
+        cat_block = None if self._post_cat is None else np.take(self._post_cat, rows, axis=0)
+        bounds = np.cumsum([0] + [len(item[2]) for item in items])
+        for (user_vector, time, _), start, end in zip(items, bounds[:-1], bounds[1:]):
+            self._fill_user(block[start:end], None if cat_block is None else cat_block[start:end],
+                            user_vector, time)
+
+        scores = self._predict(block, cat_block)
+        post_ids = self.post_ids[rows]
+        return [
+            post_ids[start + top_k_indices(scores[start:end], limit)].tolist()
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
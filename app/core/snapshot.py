@@ -0,0 +1,128 @@
+"""
+On-disk feature snapshots shared by all workers through memory mapping.
+
+One process loads a feature table and writes it once as fixed-dtype arrays:
+
+    <root>/<name>/manifest.json   column names, categorical dictionaries, row count
+    <root>/<name>/ids.npy         int64 ids (user_id / post_id)
+    <root>/<name>/matrix.npy      float32 [rows x numeric columns], row-major
+    <root>/<name>/codes.npy       int32 [rows x categorical columns] (-1 = missing)
+
+Every worker opens the arrays with `np.load(mmap_mode='r')`. The pages are
+backed by the page cache and shared between processes, so N workers hold one copy
+of the table and a new worker starts without touching the database.
+
+Writers take an exclusive `fcntl` lock on `<root>/<name>.lock` and publish the
+snapshot with an atomic directory rename, so concurrent workers either wait
+for the writer or see a complete snapshot.
+
+Set FEATURE_SNAPSHOT_DIR to enable snapshots (empty = load tables into each worker).
+
+Classes:
+
+- FeatureSnapshot(path):
+    Read-only, memory-mapped view of a snapshot.
+    - ids, matrix, codes: np.memmap arrays; numeric_columns, categorical_columns.
+    - to_frame() -> pd.DataFrame: in-memory DataFrame copy (for small tables).
+
+Functions:
+
+- write_snapshot(df, path, id_column): writes `df` as a snapshot at `path`.
+- ensure_snapshot(name, loader, id_column, root, version=None) -> FeatureSnapshot:
+    Opens the snapshot `name`, building it from `loader()` first if it does not exist
+    or was written for a different `version` (see `app.core.feature_cache.table_version`).
+    Without a `version` the snapshot is always rebuilt.
+"""
+
+import fcntl
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+FEATURE_SNAPSHOT_DIR = os.environ.get('FEATURE_SNAPSHOT_DIR', '')
+
+
+class FeatureSnapshot:
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path / 'manifest.json') as f:
+            self.manifest = json.load(f)
+        self.id_column = self.manifest['id_column']
+        self.numeric_columns = self.manifest['numeric_columns']
+        self.categories = self.manifest['categories']
+        self.categorical_columns = list(self.categories)
+        self.ids = np.load(self.path / 'ids.npy', mmap_mode='r')
+        self.matrix = np.load(self.path / 'matrix.npy', mmap_mode='r')
+        self.codes = np.load(self.path / 'codes.npy', mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def to_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(np.array(self.matrix), columns=self.numeric_columns)
+        for i, column in enumerate(self.categorical_columns):
+            df[column] = pd.Categorical.from_codes(np.array(self.codes[:, i]), categories=self.categories[column])
+        df.insert(0, self.id_column, np.array(self.ids).astype(self.manifest.get('id_dtype', 'int64')))
+        return df[self.manifest['columns']]
+
+
+def write_snapshot(df: pd.DataFrame, path: Union[str, Path], id_column: str, version: Optional[str] = None):
+    path = Path(path)
+    features = df.drop(columns=id_column)
+    numeric = features.select_dtypes(include=['number', 'bool'])
+    categorical = features.drop(columns=numeric.columns).astype('category')
+
+    tmp = path.with_name(f'.{path.name}.tmp-{os.getpid()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    np.save(tmp / 'ids.npy', df[id_column].to_numpy(dtype=np.int64))
+    np.save(tmp / 'matrix.npy', np.ascontiguousarray(numeric.to_numpy(dtype=np.float32)))
+    codes = np.column_stack([categorical[c].cat.codes.to_numpy(dtype=np.int32) for c in categorical.columns]) \
+        if len(categorical.columns) else np.empty((len(df), 0), dtype=np.int32)
+    np.save(tmp / 'codes.npy', codes)
+    manifest = {
+        'id_column': id_column,
+        'columns': list(df.columns),
+        'numeric_columns': list(numeric.columns),
+        'categories': {c: categorical[c].cat.categories.tolist() for c in categorical.columns},
+        'id_dtype': str(df[id_column].dtype),
+        'rows': len(df),
+        'version': version,
+    }
+    with open(tmp / 'manifest.json', 'w') as f:
+        json.dump(manifest, f)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp, path)
+
+
+def _is_current(path: Path, version: Optional[str]) -> bool:
+    manifest_path = path / 'manifest.json'
+    if not manifest_path.exists():
+        return False
+    if version is None:
+        # provenance unknown: never trust an existing snapshot
+        return False
+    with open(manifest_path) as f:
+        return json.load(f).get('version') == version
+
+
+def ensure_snapshot(name: str, loader: Callable[[], pd.DataFrame], id_column: str,
+                    root: Union[str, Path] = FEATURE_SNAPSHOT_DIR,
+                    version: Optional[str] = None) -> FeatureSnapshot:
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    path = root / name
+    with open(root / f'{name}.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            if not _is_current(path, version):
+                write_snapshot(loader(), path, id_column, version)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return FeatureSnapshot(path)
@@ -2,15 +2,32 @@
 Global placeholders for models and datasets used in recommendation system.
 
 Variables:
-- model_test (CatBoostClassifier | None): Test group CatBoost model.
-- model_control (CatBoostClassifier | None): Control group CatBoost model.
-- users_data (pd.DataFrame | None): DataFrame with user features.
+- experiments (ExperimentRouter | None): Experiment arm and model alias of each user.
+- models (ModelRegistry | None): Loaded models and their ScoringEngines by alias
+  ('test', 'control', ...), hot-reloadable.
+- user_store (UserFeatureStore | None): Packed user features with O(1) lookup by user_id.
 - posts_data (pd.DataFrame | None): DataFrame with post features.
-- top_5_posts_list (list | None): Precomputed list of top 5 posts for default recommendations.
+- popularity (PopularityService | None): Ranked most liked posts, used by /post/top-liked and as the
+  default recommendations.
+- likes_index (LikesIndex | None): In-memory likes per user, refreshed in the background.
+- retriever (EmbeddingRetriever | None): Embedding shortlist ahead of CatBoost ranking, if enabled.
+- rec_cache (RecommendationCache | None): Ranked post IDs per (model, user, hour, weekday, likes).
+- post_cache (PostCache | None): Post content for responses, pinned for candidate posts.
+- impressions (ImpressionLogger | None): Queue of served recommendations, flushed to Parquet
+  in the background, if enabled.
+- background_tasks (list): Running PeriodicTask threads, stopped on shutdown.
+- startup_timings (dict): Seconds spent in each startup phase.
 """
 
-model_test = None
-model_control = None
-users_data = None
+experiments = None
+models = None
+user_store = None
 posts_data = None
-top_5_posts_list = None
+popularity = None
+likes_index = None
+post_cache = None
+rec_cache = None
+retriever = None
+impressions = None
+background_tasks = []
+startup_timings = {}
@@ -0,0 +1,28 @@
+"""
+Wall-clock timing of named phases (startup, offline jobs).
+
+Functions:
+
+- timed(phase, timings=None):
+    Context manager that logs how long the block took and, if `timings` is given,
+    stores the seconds under `timings[phase]`.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def timed(phase: str, timings: Optional[Dict[str, float]] = None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if timings is not None:
+            timings[phase] = round(elapsed, 3)
+        logger.info("%s took %.2fs", phase, elapsed)
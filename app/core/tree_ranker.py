@@ -0,0 +1,268 @@
+"""
+Experimental ranking mode that splits the CatBoost trees into post and request parts.
+
+The serving models are oblivious trees over float features: every tree applies the
+same splits at each level, so a leaf index is a bitmask of `feature > border` tests.
+Each split reads either a post feature (tfidf, embeddings, likes_rating, ...) or a
+request feature (user features, hour, weekday). For every tree, the post bits of
+every post are computed once at startup; a request only evaluates the request-side
+splits once and gathers leaf values:
+
+    raw(user, post) = static[post] + const(user) + sum_t leaf_t[post_bits[t, post] | user_bits[t]]
+
+where `static` sums the trees that only split on post features and `const` the trees
+that only split on request features. This is exact (up to float32 rounding of the
+leaf values) and skips all post-side comparisons per request. Every request gathers
+the leaves of the whole catalog, TREE_RANKER_CHUNK_TREES trees at a time into a
+per-thread buffer, and selects its candidate rows (liked posts excluded) from the
+scores afterwards.
+
+Optionally (`prefix_trees` > 0), candidates are pruned in a cascade: all candidates
+are scored on the `prefix_trees` trees with the widest leaf range, only the best
+`keep` go through the remaining trees. This is approximate, so `validate` compares
+the ranked scores against the model's exact `predict_proba` and the mode is only
+enabled when the error stays within the configured tolerance. It is also only
+enabled when it measures faster than exact scoring on the validation users.
+
+Settings: TREE_RANKER (1 = enabled), TREE_RANKER_PREFIX_TREES (0 = exact, no pruning),
+TREE_RANKER_KEEP, TREE_RANKER_TOLERANCE (max abs difference of ranked probabilities),
+TREE_RANKER_CHUNK_TREES.
+
+Classes:
+
+- ObliviousTreeRanker(engine, prefix_trees, keep):
+    Built from a ScoringEngine (same post rows and feature order).
+    - raw_scores(user_vector, time, rows) -> np.ndarray: exact raw scores (log-odds).
+    - top_k(user_vector, time, limit, rows) -> list: top-N post ids, best first.
+    - validate(user_vectors, time, limit) -> float: max abs difference between the
+      probabilities of the ranked posts and exact scoring.
+    - timings(user_vectors, time, limit) -> (float, float): median seconds per request
+      of the ranker and of exact scoring.
+
+Functions:
+
+- enable_tree_ranker(engine, user_vectors, time) -> bool:
+    Attaches a validated ranker to `engine` (see `ScoringEngine.top_k`); False if the
+    model is not supported, validation exceeds the tolerance, or the ranker is not
+    faster than exact scoring on the sample users.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time as clock
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.scoring import TIME_FEATURES, ScoringEngine, top_k_indices
+
+logger = logging.getLogger(__name__)
+
+TREE_RANKER = os.environ.get('TREE_RANKER', '0') == '1'
+TREE_RANKER_PREFIX_TREES = int(os.environ.get('TREE_RANKER_PREFIX_TREES', 0))
+TREE_RANKER_KEEP = int(os.environ.get('TREE_RANKER_KEEP', 200))
+TREE_RANKER_TOLERANCE = float(os.environ.get('TREE_RANKER_TOLERANCE', 1e-4))
+# trees gathered per step; keeps the gather buffer in cache for large catalogs
+TREE_RANKER_CHUNK_TREES = int(os.environ.get('TREE_RANKER_CHUNK_TREES', 32))
+
+
+def _model_json(model) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.json')
+        model.save_model(path, format='json')
+        with open(path) as f:
+            return json.load(f)
+
+
+def _pack_splits(trees: Sequence[list]):
+    """Flattens per-tree (column, border, bit) splits into arrays for vectorized evaluation."""
+    splits = [(t, column, border, bit) for t, tree in enumerate(trees) for column, border, bit in tree]
+    tree_index, columns, borders, bits = zip(*splits) if splits else ((), (), (), ())
+    return (np.array(tree_index, dtype=np.intp), np.array(columns, dtype=np.intp),
+            np.array(borders, dtype=np.float32), np.array(bits, dtype=np.int64))
+
+
+def _tree_bits(row: np.ndarray, packed, n_trees: int) -> np.ndarray:
+    tree_index, columns, borders, bits = packed
+    values = (row[columns] > borders).astype(np.int64) << bits
+    # bits within a tree are distinct, so their sum is the leaf bitmask
+    return np.bincount(tree_index, weights=values, minlength=n_trees).astype(np.int32)
+
+
+class ObliviousTreeRanker:
+    def __init__(self, engine: ScoringEngine, prefix_trees: int = TREE_RANKER_PREFIX_TREES,
+                 keep: int = TREE_RANKER_KEEP):
+        if engine.cat_features:
+            raise ValueError("Tree ranker supports float features only")
+        self.engine = engine
+        self.keep = keep
+
+        spec = _model_json(engine.model)
+        names = [f['feature_id'] for f in spec['features_info']['float_features']]
+        column = {name: i for i, name in enumerate(engine.num_features)}
+        request_side = set(engine.user_columns) | set(TIME_FEATURES)
+        # raw = bias + scale * sum of leaves; the scale is folded into the leaf values
+        self.bias = float(spec['scale_and_bias'][1][0])
+        scale = float(spec['scale_and_bias'][0])
+
+        block = engine._post_block
+        static = np.zeros(engine.n_posts, dtype=np.float64)
+        user_only, mixed = [], []
+        for tree in spec['oblivious_trees']:
+            if any(split['split_type'] != 'FloatFeature' for split in tree['splits']):
+                raise ValueError("Tree ranker supports float splits only")
+            leaves = scale * np.asarray(tree['leaf_values'], dtype=np.float64)
+            post_bits = np.zeros(engine.n_posts, dtype=np.int32)
+            request_splits = []
+            for bit, split in enumerate(tree['splits']):
+                name = names[split['float_feature_index']]
+                border = np.float32(split['border'])
+                if name in request_side:
+                    request_splits.append((column[name], border, bit))
+                else:
+                    post_bits |= (block[:, column[name]] > border).astype(np.int32) << bit
+            if not request_splits:
+                static += leaves[post_bits]
+            elif len(request_splits) == len(tree['splits']):
+                user_only.append((leaves, request_splits))
+            else:
+                mixed.append((leaves, request_splits, post_bits))
+
+        self.static = static
+        self.user_only_leaves = [leaves for leaves, _ in user_only]
+        self._user_only_splits = _pack_splits([splits for _, splits in user_only])
+        # widest trees first, so a prefix of the trees carries most of the score
+        mixed.sort(key=lambda tree: -np.ptp(tree[0]))
+        self.n_leaves = max((len(tree[0]) for tree in mixed), default=1)
+        self.leaves = np.zeros((len(mixed), self.n_leaves), dtype=np.float32)
+        for t, (leaves, _, _) in enumerate(mixed):
+            self.leaves[t, :len(leaves)] = leaves
+        self.n_mixed = len(mixed)
+        self._request_splits = _pack_splits([splits for _, splits, _ in mixed])
+        # flat positions into `leaves` of each (tree, post), request bits still to be OR-ed in
+        offsets = (np.arange(len(mixed), dtype=np.int32) * self.n_leaves)[:, None]
+        self.post_leaf = np.vstack([bits for _, _, bits in mixed]) + offsets if mixed else \
+            np.empty((0, engine.n_posts), dtype=np.int32)
+        self.prefix_trees = min(prefix_trees, len(mixed))
+        self._local = threading.local()
+
+    @property
+    def n_trees(self) -> int:
+        return self.n_mixed + len(self.user_only_leaves)
+
+    def _request_row(self, user_vector: np.ndarray, time: datetime) -> np.ndarray:
+        row = np.zeros((1, len(self.engine.num_features)), dtype=np.float32)
+        self.engine._fill_user(row, None, user_vector, time)
+        return row[0]
+
+    def _request_leaves(self, user_vector: np.ndarray, time: datetime):
+        row = self._request_row(user_vector, time)
+        const = sum(leaves[bits] for leaves, bits in zip(
+            self.user_only_leaves, _tree_bits(row, self._user_only_splits, len(self.user_only_leaves))
+        ))
+        user_bits = _tree_bits(row, self._request_splits, self.n_mixed)
+        # leaf value of every post-bit combination, with this request's bits applied
+        request_leaves = np.take_along_axis(
+            self.leaves, np.arange(self.n_leaves, dtype=np.int32)[None, :] | user_bits[:, None], axis=1
+        ).ravel()
+        return float(const), request_leaves
+
+    def _buffer(self) -> np.ndarray:
+        # one gather buffer per worker thread, as ScoringEngine._buffer
+        buf = getattr(self._local, 'buf', None)
+        if buf is None:
+            buf = np.empty((TREE_RANKER_CHUNK_TREES, self.engine.n_posts), dtype=np.float32)
+            self._local.buf = buf
+        return buf
+
+    def _catalog_scores(self, request_leaves: np.ndarray, base: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Adds trees [start, stop) to `base` for every post, a chunk of trees at a time."""
+        buf = self._buffer()
+        scores = base.copy()
+        for s in range(start, stop, TREE_RANKER_CHUNK_TREES):
+            e = min(s + TREE_RANKER_CHUNK_TREES, stop)
+            np.take(request_leaves, self.post_leaf[s:e], out=buf[:e - s])
+            scores += buf[:e - s].sum(axis=0)
+        return scores
+
+    def raw_scores(self, user_vector: np.ndarray, time: datetime,
+                   rows: Optional[np.ndarray] = None) -> np.ndarray:
+        const, request_leaves = self._request_leaves(user_vector, time)
+        scores = self._catalog_scores(request_leaves, self.bias + const + self.static, 0, self.n_mixed)
+        return scores if rows is None else scores[rows]
+
+    def _ranked(self, user_vector: np.ndarray, time: datetime, limit: int,
+                rows: Optional[np.ndarray] = None):
+        """Ranked engine rows and their raw scores."""
+        # The whole catalog is scored and the candidate rows selected afterwards:
+        # indexing the (tree, post) position table by `rows` would copy all of it.
+        const, request_leaves = self._request_leaves(user_vector, time)
+        base = self.bias + const + self.static
+        rows = np.arange(self.engine.n_posts) if rows is None else np.asarray(rows)
+        prefix = self.prefix_trees
+        if prefix and len(rows) > max(self.keep, limit):
+            partial = self._catalog_scores(request_leaves, base, 0, prefix)[rows]
+            kept = top_k_indices(partial, max(self.keep, limit))
+            rows = rows[kept]
+            scores = partial[kept] + np.take(request_leaves, self.post_leaf[prefix:, rows]).sum(axis=0)
+        else:
+            scores = self._catalog_scores(request_leaves, base, 0, self.n_mixed)[rows]
+        best = top_k_indices(scores, limit)
+        return rows[best], scores[best]
+
+    def top_k(self, user_vector: np.ndarray, time: datetime, limit: int,
+              rows: Optional[np.ndarray] = None) -> List[int]:
+        ranked_rows, _ = self._ranked(user_vector, time, limit, rows)
+        return self.engine.post_ids[ranked_rows].tolist()
+
+    def validate(self, user_vectors: Sequence[np.ndarray], time: datetime, limit: int = 5) -> float:
+        error = 0.0
+        for user_vector in user_vectors:
+            _, exact = self.engine.score(user_vector, time)
+            exact_top = np.sort(exact)[::-1][:limit]
+            _, raw = self._ranked(user_vector, time, limit)
+            ranked = 1 / (1 + np.exp(-raw))
+            error = max(error, float(np.abs(ranked - exact_top[:len(ranked)]).max(initial=0.0)))
+        return error
+
+    def timings(self, user_vectors: Sequence[np.ndarray], time: datetime, limit: int = 5,
+                n_excluded: int = 20) -> Tuple[float, float]:
+        """Median seconds per request of this ranker and of exact scoring, with a few liked posts excluded."""
+        rows = np.arange(min(n_excluded, self.engine.n_posts // 2), self.engine.n_posts)
+        ranker, exact = [], []
+        for user_vector in user_vectors:
+            start = clock.perf_counter()
+            self.top_k(user_vector, time, limit, rows)
+            ranker.append(clock.perf_counter() - start)
+            start = clock.perf_counter()
+            post_ids, scores = self.engine.score(user_vector, time, rows)
+            post_ids[top_k_indices(scores, limit)]
+            exact.append(clock.perf_counter() - start)
+        return float(np.median(ranker)), float(np.median(exact))
+
+
+def enable_tree_ranker(engine: ScoringEngine, user_vectors: Sequence[np.ndarray], time: datetime,
+                       tolerance: float = TREE_RANKER_TOLERANCE) -> bool:
+    try:
+        ranker = ObliviousTreeRanker(engine)
+    except ValueError as e:
+        logger.warning("Tree ranker disabled for model %s: %s", engine.version, e)
+        return False
+    error = ranker.validate(user_vectors, time)
+    if error > tolerance:
+        logger.warning("Tree ranker disabled for model %s: error %.2e > tolerance %.2e",
+                       engine.version, error, tolerance)
+        return False
+    ranker_s, exact_s = ranker.timings(user_vectors, time)
+    if ranker_s >= exact_s:
+        logger.warning("Tree ranker disabled for model %s: %.1f ms per request, not faster than %.1f ms",
+                       engine.version, ranker_s * 1000, exact_s * 1000)
+        return False
+    logger.info("Tree ranker enabled for model %s (%d trees, prefix %d, error %.2e, %.1f ms vs %.1f ms)",
+                engine.version, ranker.n_trees, ranker.prefix_trees, error, ranker_s * 1000, exact_s * 1000)
+    engine.ranker = ranker
+    return True
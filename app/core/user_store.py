@@ -0,0 +1,122 @@
+"""
+Constant-time user feature lookup for the recommendation hot path.
+
+The user feature table is packed once, at startup, into a float32 matrix (one row per
+user). A dense position index maps user_id -> row, so a lookup is a single array
+access instead of a boolean scan over the whole DataFrame. When user ids are too
+sparse for a dense index, a dict is used instead.
+
+The matrix can be an in-memory array (`from_frame`) or a read-only memory-mapped
+snapshot shared by all workers (`from_snapshot`, see `app.core.snapshot`).
+
+Categorical columns are kept as int32 codes next to the matrix (-1 = missing), with
+their category lists in `categories`. In a feature row they follow the numeric
+columns, as codes, so categorical model inputs can be decoded by the scorer.
+
+Classes:
+
+- UserFeatureStore(user_ids, matrix, columns, codes=None, categories=None):
+    - from_frame(users_data) / from_snapshot(snapshot): build from a DataFrame or a snapshot.
+    - get(user_id, columns=None) -> np.ndarray | None: user's feature row (optionally
+      reordered to `columns`), or None for an unknown user.
+    - categories: category list per categorical column.
+    - column_index(columns) -> np.ndarray: positions of `columns` in the matrix.
+    - nbytes: memory footprint of the store in bytes.
+    - shared: True when the matrix is memory-mapped (its pages are shared between workers).
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.core.snapshot import FeatureSnapshot
+
+# Dense index is used while max(user_id) stays within this factor of the user count.
+DENSE_INDEX_MAX_RATIO = 8
+
+
+class UserFeatureStore:
+    def __init__(self, user_ids: np.ndarray, matrix: np.ndarray, columns: List[str],
+                 codes: Optional[np.ndarray] = None, categories: Optional[Dict[str, list]] = None):
+        self.categories = dict(categories or {})
+        self.columns = list(columns) + list(self.categories)
+        self.matrix = matrix
+        self.codes = codes if codes is not None else np.empty((len(user_ids), 0), dtype=np.int32)
+        self.user_ids = user_ids
+
+        self._position = {name: i for i, name in enumerate(self.columns)}
+        self._column_cache: Dict[tuple, np.ndarray] = {}
+        self._dense_index = None
+        self._dict_index = None
+
+        min_id = int(user_ids.min()) if len(user_ids) else 0
+        max_id = int(user_ids.max()) if len(user_ids) else -1
+        if min_id >= 0 and max_id < DENSE_INDEX_MAX_RATIO * max(len(user_ids), 1024):
+            self._dense_index = np.full(max_id + 1, -1, dtype=np.int32)
+            self._dense_index[user_ids] = np.arange(len(user_ids), dtype=np.int32)
+        else:
+            self._dict_index = {uid: row for row, uid in enumerate(user_ids.tolist())}
+
+    @classmethod
+    def from_frame(cls, users_data: pd.DataFrame) -> 'UserFeatureStore':
+        features = users_data.drop(columns='user_id')
+        feature_frame = features.select_dtypes(include=['number', 'bool'])
+        categorical = features.drop(columns=feature_frame.columns).astype('category')
+        return cls(
+            users_data['user_id'].to_numpy(dtype=np.int64),
+            np.ascontiguousarray(feature_frame.to_numpy(dtype=np.float32)),
+            list(feature_frame.columns),
+            np.column_stack([categorical[c].cat.codes.to_numpy(dtype=np.int32) for c in categorical.columns])
+            if len(categorical.columns) else None,
+            {c: categorical[c].cat.categories.tolist() for c in categorical.columns},
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: FeatureSnapshot) -> 'UserFeatureStore':
+        return cls(snapshot.ids, snapshot.matrix, snapshot.numeric_columns, snapshot.codes, snapshot.categories)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    @property
+    def shared(self) -> bool:
+        return isinstance(self.matrix, np.memmap)
+
+    @property
+    def nbytes(self) -> int:
+        index_bytes = self._dense_index.nbytes if self._dense_index is not None else 0
+        if self._dict_index is not None:
+            # rough CPython estimate: dict slot plus two small ints per entry
+            index_bytes = len(self._dict_index) * 100
+        return self.matrix.nbytes + self.codes.nbytes + self.user_ids.nbytes + index_bytes
+
+    def row(self, user_id: int) -> int:
+        if self._dense_index is not None:
+            if 0 <= user_id < len(self._dense_index):
+                return int(self._dense_index[user_id])
+            return -1
+        return self._dict_index.get(user_id, -1)
+
+    def column_index(self, columns: Iterable[str]) -> np.ndarray:
+        key = tuple(columns)
+        index = self._column_cache.get(key)
+        if index is None:
+            missing = [c for c in key if c not in self._position]
+            if missing:
+                raise KeyError(f"Unknown user feature columns: {missing}")
+            index = np.array([self._position[c] for c in key], dtype=np.intp)
+            self._column_cache[key] = index
+        return index
+
+    def get(self, user_id: int, columns: Optional[Iterable[str]] = None) -> Optional[np.ndarray]:
+        row = self.row(user_id)
+        if row < 0:
+            return None
+        if self.categories:
+            values = np.concatenate((self.matrix[row], self.codes[row].astype(np.float32)))
+        else:
+            values = self.matrix[row]
+        if columns is None:
+            return values
+        return values[self.column_index(columns)]
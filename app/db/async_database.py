@@ -0,0 +1,43 @@
+"""
+Async database setup for the request path.
+
+- Builds an asyncpg-backed SQLAlchemy engine from the same PostgreSQL settings as `database`,
+  with the shared pool settings from `pool` and its own `async_pool_metrics`.
+- asyncpg runs every statement as a protocol-level prepared statement; SQLAlchemy caches
+  up to DB_PREPARED_STATEMENT_CACHE_SIZE of them per connection. Behind PgBouncer in
+  transaction pooling mode this needs PgBouncer >= 1.21 with `max_prepared_statements`
+  > 0 (it then tracks prepared statements per client); with older versions set
+  DB_PREPARED_STATEMENT_CACHE_SIZE=0.
+- Creates an AsyncSession factory.
+- Provides `get_async_db` generator to yield and close an async DB session for dependency injection.
+
+The sync engine in `database` stays in use for startup loading and offline scripts.
+"""
+
+import os
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.db.database import SQLALCHEMY_DATABASE_URL
+from app.db.pool import PoolMetrics, pool_options, instrument_engine, apply_statement_timeout
+
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_PREPARED_STATEMENT_CACHE_SIZE', 100))
+
+ASYNC_DATABASE_URL = (
+    SQLALCHEMY_DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+    + f"?prepared_statement_cache_size={DB_PREPARED_STATEMENT_CACHE_SIZE}"
+)
+
+# Create async engine and session factory
+async_pool_metrics = PoolMetrics("async")
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(async_pool_metrics, AsyncAdaptedQueuePool))
+instrument_engine(async_engine.sync_engine, async_pool_metrics)
+apply_statement_timeout(async_engine.sync_engine)
+AsyncSessionLocal = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
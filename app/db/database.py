@@ -2,7 +2,9 @@
 Database setup and connection management using SQLAlchemy.
 
 - Loads PostgreSQL connection parameters from environment variables.
-- Creates SQLAlchemy engine and session factory.
+- Creates SQLAlchemy engine (pool settings and per-transaction statement timeout from `pool`)
+  and session factory.
+- Records pool checkout waits and query times in `pool_metrics`.
 - Provides `get_db` generator to yield and close DB session for dependency injection.
 """
 
@@ -11,6 +13,9 @@ from dotenv import load_dotenv # Load env variables from .env file
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from app.db.pool import PoolMetrics, pool_options, instrument_engine, apply_statement_timeout
 
 
 load_dotenv()
@@ -24,7 +29,10 @@ database = os.environ.get('POSTGRES_DATABASE')
 SQLALCHEMY_DATABASE_URL = f"postgresql://{user}:{password}@{host}:{port}/{database}"
 
 # Create SQLAlchemy engine and session factory
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+pool_metrics = PoolMetrics("sync")
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options(pool_metrics, QueuePool))
+instrument_engine(engine, pool_metrics)
+apply_statement_timeout(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base class for declarative models
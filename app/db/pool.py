@@ -0,0 +1,137 @@
+"""
+Connection pool configuration and metrics shared by the sync and async engines.
+
+Settings (environment variables):
+- DB_POOL_SIZE (5): connections kept open in the pool.
+- DB_MAX_OVERFLOW (10): extra connections allowed above the pool size.
+- DB_POOL_TIMEOUT (30): seconds to wait for a free connection before failing.
+- DB_POOL_RECYCLE (1800): seconds after which a connection is replaced.
+- DB_POOL_PRE_PING (1): test connections on checkout.
+- DB_STATEMENT_TIMEOUT_MS (0): statement_timeout for every transaction, 0 = off.
+
+Classes:
+
+- PoolMetrics(name):
+    Counts pool checkouts and query executions with their timings, so pool
+    starvation (long checkout waits) can be told apart from slow queries.
+    - stats() -> dict
+
+Functions:
+
+- pool_options(metrics, base_pool) -> dict:
+    Keyword arguments for `create_engine` / `create_async_engine`: pool sizing and a
+    pool class that records checkout wait time into `metrics`.
+
+- instrument_engine(engine, metrics):
+    Registers cursor-execute listeners that record query durations into `metrics`.
+
+- apply_statement_timeout(engine, timeout_ms=DB_STATEMENT_TIMEOUT_MS):
+    Runs `SET LOCAL statement_timeout` at the start of every transaction. The setting
+    lives as long as the transaction, so it is safe behind PgBouncer in transaction
+    pooling mode (which rejects the `options` startup parameter and may hand the next
+    transaction to another backend). It covers ORM sessions and `engine.begin()`
+    blocks; for statements outside a transaction set it on the role instead
+    (`ALTER ROLE ... SET statement_timeout`).
+"""
+
+import os
+import threading
+import time
+from typing import Type
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 0))
+
+
+class _Timer:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def stats(self) -> dict:
+        return {
+            "count": self.count,
+            "ms_mean": 1000 * self.total / self.count if self.count else 0.0,
+            "ms_max": 1000 * self.max,
+        }
+
+
+class PoolMetrics:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._checkout = _Timer()
+        self._query = _Timer()
+
+    def record_checkout(self, seconds: float):
+        with self._lock:
+            self._checkout.record(seconds)
+
+    def record_query(self, seconds: float):
+        with self._lock:
+            self._query.record(seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"checkout_wait": self._checkout.stats(), "query": self._query.stats()}
+
+
+def _timed_pool_class(base_pool: Type[Pool], metrics: PoolMetrics) -> Type[Pool]:
+    # _do_get blocks while the pool is exhausted, so its duration is the checkout wait.
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return base_pool._do_get(self)
+        finally:
+            metrics.record_checkout(time.perf_counter() - start)
+
+    return type(f"Timed{base_pool.__name__}", (base_pool,), {"_do_get": _do_get})
+
+
+def pool_options(metrics: PoolMetrics, base_pool: Type[Pool]) -> dict:
+    return {
+        "poolclass": _timed_pool_class(base_pool, metrics),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def instrument_engine(engine: Engine, metrics: PoolMetrics):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        metrics.record_query(time.perf_counter() - conn.info["query_start"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        if context.connection is not None and context.connection.info.get("query_start"):
+            context.connection.info["query_start"].pop()
+
+
+def apply_statement_timeout(engine: Engine, timeout_ms: int = DB_STATEMENT_TIMEOUT_MS):
+    if not timeout_ms:
+        return
+
+    @event.listens_for(engine, "begin")
+    def _set_timeout(conn):
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
@@ -6,10 +6,15 @@ Attributes:
 - text (str): Text content of the post.
 - topic (str): Topic/category of the post.
 
+Queries:
+- select_posts_by_ids: posts whose id is in the `ids` bind parameter. Uses `id = ANY(:ids)`
+  so the statement text (and its server-side prepared plan) is the same for any list length.
+
 Includes a test query to fetch the 10 most recent posts with topic 'business'.
 """
 
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Column, Integer, String, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
 from app.db.database import Base, SessionLocal
 
 
@@ -20,6 +25,9 @@ class Post(Base):
     text = Column(String)
     topic = Column(String)
 
+
+select_posts_by_ids = select(Post).where(Post.id == any_(bindparam("ids", type_=ARRAY(Integer))))
+
 # Test querying the latest 10 posts in the "business" topic
 if __name__ == "__main__":
     with SessionLocal() as session:
@@ -2,39 +2,144 @@
 Main entry point for the StartML Recommendation System API.
 
 - Initializes FastAPI application.
-- Loads models and feature data on startup.
-- Includes routers for user, post, and recommendation endpoints.
+- Loads models and feature data on startup (from a local Parquet cache when FEATURE_CACHE_DIR
+  is set, from shared memory-mapped snapshots when FEATURE_SNAPSHOT_DIR is set) and records
+  per-phase startup timings.
+- Loads each distinct model file once into the model registry (hot-reloadable), optionally
+  ranking through the validated tree ranker (TREE_RANKER=1, see `app.core.tree_ranker`).
+  Startup fails if an experiment arm names a model alias that is not loaded.
+- Starts background refresh of the likes index and top posts (and the model file watch),
+  stops it on shutdown.
+- Includes routers for user, post, recommendation and admin endpoints.
+- Request handlers are async; model scoring runs in a dedicated executor.
 
 Routes:
 - GET /: Health check root endpoint returning project info.
 """
 
+from datetime import datetime
+
 import uvicorn
 from fastapi import FastAPI
 from app.core import state
-from app.core.model_loader import load_models
-from app.core.features_loader import load_features, select_top_liked_posts_ids
-from app.api import users, posts, recommend
+from app.core.model_loader import get_model_path
+from app.core.model_registry import ModelRegistry, MODEL_WATCH_SECONDS
+from app.core.background import PeriodicTask
+from app.core.feature_cache import load_features_cached, table_version, typed_version
+from app.core.feature_schema import frame_nbytes
+from app.core.features_loader import load_likes, load_posts
+from app.core.likes_index import LikesIndex, LIKES_REFRESH_SECONDS
+from app.core.popularity import PopularityService, POPULARITY_REFRESH_SECONDS
+from app.core.post_cache import PostCache
+from app.core.rec_cache import RecommendationCache, REC_CACHE_SIZE
+from app.core.retrieval import EmbeddingRetriever, RETRIEVAL_CANDIDATES
+from app.core.scoring import ScoringEngine
+from app.core.snapshot import ensure_snapshot, FEATURE_SNAPSHOT_DIR
+from app.core.timing import timed
+from app.core.tree_ranker import enable_tree_ranker, TREE_RANKER
+from app.core.user_store import UserFeatureStore
+from app.core.executor import scoring_executor
+from app.core.impressions import ImpressionLogger, IMPRESSION_LOG_DIR, IMPRESSION_FLUSH_SECONDS
+from app.core.experiments import load_router
+from app.db.async_database import async_engine
+from app.api import users, posts, recommend, admin
 
 app = FastAPI(title="StartML Recommendation System")
 
 
+def build_engine(model, version: str) -> ScoringEngine:
+    engine = ScoringEngine(model, state.posts_data, state.user_store.columns, version=version,
+                           user_categories=state.user_store.categories)
+    if TREE_RANKER:
+        sample = [state.user_store.get(int(uid), engine.user_columns) for uid in state.user_store.user_ids[:20]]
+        enable_tree_ranker(engine, sample, datetime.now())
+    return engine
+
+
 @app.on_event("startup")
 def startup_event():
     """
     Load models and feature data into global state on application startup.
     """
     print("Loading model and features on startup...")
-    state.model_test, state.model_control = load_models()
-    state.users_data = load_features('users')
-    state.posts_data = load_features('posts')
-    state.top_5_posts_list = select_top_liked_posts_ids(5)
-    print("Model and features loaded.")
+    timings = state.startup_timings
+    with timed("features", timings):
+        versions = {name: table_version(name) for name in ('users', 'posts')}
+        if FEATURE_SNAPSHOT_DIR:
+            # the first worker writes the snapshots, every worker memory-maps them
+            state.user_store = UserFeatureStore.from_snapshot(ensure_snapshot(
+                'users', lambda: load_features_cached('users', versions['users']), 'user_id',
+                version=typed_version(versions['users']),
+            ))
+            state.posts_data = ensure_snapshot(
+                'posts', lambda: load_features_cached('posts', versions['posts']), 'post_id',
+                version=typed_version(versions['posts']),
+            ).to_frame()
+        else:
+            state.user_store = UserFeatureStore.from_frame(load_features_cached('users', versions['users']))
+            state.posts_data = load_features_cached('posts', versions['posts'])
+    print(f"User store: {len(state.user_store)} users, {state.user_store.nbytes / 2**20:.1f} MiB"
+          f"{' (memory-mapped, shared)' if state.user_store.shared else ''}")
+    print(f"Post features: {len(state.posts_data)} posts, {frame_nbytes(state.posts_data) / 2**20:.1f} MiB")
+    with timed("post cache", timings):
+        state.popularity = PopularityService()
+        pinned_post_ids = set(state.posts_data['post_id'].tolist()) | set(state.popularity.top(state.popularity.top_n))
+        state.post_cache = PostCache(load_posts(sorted(pinned_post_ids)))
+    print(f"Post cache: {len(state.post_cache)} posts, {state.post_cache.nbytes / 2**20:.1f} MiB")
+    user_columns = state.user_store.columns
+    with timed("models", timings):
+        state.models = ModelRegistry(build_engine)
+        state.experiments = load_router()
+        model_paths = {**dict(zip(('test', 'control'), get_model_path())), **state.experiments.model_paths()}
+        for alias, path in model_paths.items():
+            state.models.assign(alias, path)
+        state.experiments.check_models(state.models.aliases())
+    with timed("likes index", timings):
+        state.likes_index = LikesIndex(load_likes())
+    if REC_CACHE_SIZE > 0:
+        state.rec_cache = RecommendationCache()
+        state.likes_index.subscribe(state.rec_cache.invalidate_users)
+    print(f"Likes index: {len(state.likes_index)} likes, {state.likes_index.nbytes / 2**20:.1f} MiB")
+    refreshers = [
+        ("likes-refresh", LIKES_REFRESH_SECONDS, state.likes_index.refresh),
+        ("popularity-refresh", POPULARITY_REFRESH_SECONDS, state.popularity.refresh),
+        ("model-watch", MODEL_WATCH_SECONDS, state.models.check_files),
+    ]
+    if IMPRESSION_LOG_DIR:
+        state.impressions = ImpressionLogger(IMPRESSION_LOG_DIR)
+        refreshers.append(("impression-flush", IMPRESSION_FLUSH_SECONDS, state.impressions.flush))
+    for name, interval, func in refreshers:
+        if interval > 0:
+            task = PeriodicTask(name, interval, func)
+            task.start()
+            state.background_tasks.append(task)
+    if RETRIEVAL_CANDIDATES > 0:
+        # built from the same posts_data as the engines, so retriever rows are engine rows
+        with timed("retriever", timings):
+            state.retriever = EmbeddingRetriever(state.posts_data, user_columns, RETRIEVAL_CANDIDATES)
+    print("Model and features loaded. Startup timings (s): "
+          + ", ".join(f"{phase}={seconds}" for phase, seconds in timings.items()))
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Stop background refresh tasks (flushing pending impressions), the scoring executor and the
+    async DB pool.
+    """
+    for task in state.background_tasks:
+        task.stop()
+    state.background_tasks.clear()
+    if state.impressions is not None:
+        state.impressions.flush()
+    scoring_executor.shutdown()
+    await async_engine.dispose()
 
 # Register API routes
 app.include_router(users.router)
 app.include_router(posts.router)
 app.include_router(recommend.router)
+app.include_router(admin.router)
 
 @app.get("/")
 def read_root():
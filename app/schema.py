@@ -6,12 +6,19 @@ Models:
 - PostGet: Schema for returning post data.
 - Response: Schema for recommendation response with experiment group info.
 - FeedGet: Schema for user-post interaction data (feed actions).
+- BatchRecommendationRequest: Schema for a batch of (user_id, time) recommendation requests.
+- BatchRecommendationResponse: Schema for per-user recommended post IDs of a batch.
+
+MAX_RECOMMENDATIONS (100) bounds the `limit` of recommendation requests.
 """
 
 import datetime
+import os
 from typing import List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+MAX_RECOMMENDATIONS = int(os.environ.get('MAX_RECOMMENDATIONS', 100))
 
 # users data validation
 class UserGet(BaseModel):
@@ -51,3 +58,24 @@ class FeedGet(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+# batch recommendations
+class UserTime(BaseModel):
+    user_id: int
+    time: datetime.datetime
+
+
+class BatchRecommendationRequest(BaseModel):
+    requests: List[UserTime]
+    limit: int = Field(5, ge=1, le=MAX_RECOMMENDATIONS)
+
+
+class UserRecommendations(BaseModel):
+    user_id: int
+    exp_group: str
+    post_ids: List[int]
+
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[UserRecommendations]
@@ -0,0 +1,169 @@
+"""
+Local stand-ins for Postgres, built from `recommender/data_samples/*.csv`.
+
+The benchmark fills `app.core.state` the way `app.main.startup_event` does, but from
+the sample CSVs instead of the database, so the recommendation path runs in-process
+with no network:
+
+- user features: `user_features.csv`, post features: `post_features.csv`, typed with
+  the feature schema. The serving models use more features than the samples carry;
+  features missing from the samples are filled with seeded random values on the user
+  or post side (`USER_FEATURE_PREFIXES`), so every model split is still evaluated.
+- `n_users` / `n_posts` tile the sample rows under fresh ids to a production-like
+  catalog (the samples hold 50 users and 50 posts).
+- likes: the timestamps of `likes.csv`, spread over the fixture users and posts
+  (`likes_per_user` on average), in a real `LikesIndex`.
+- post content: a `PostCache` of every fixture post, `SampleSession` answers cache
+  misses like the async DB session.
+- `SamplePopularity`: most liked fixture posts, the fallback for unknown users.
+
+Classes:
+
+- Fixtures(users, posts, likes): the fixture tables.
+- SamplePopularity(likes, top_n), SampleSession(posts)
+
+Functions:
+
+- load_fixtures(model, samples_dir, n_users, n_posts, likes_per_user, seed) -> Fixtures
+- install(fixtures, model_paths, rec_cache=False): fills `app.core.state` (models through
+  `app.main.build_engine`, experiments from `load_router`).
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from catboost import CatBoostClassifier
+
+# The app modules build their DB engines at import time; the stand-ins never connect.
+for _name, _value in (('POSTGRES_USER', 'bench'), ('POSTGRES_PASSWORD', 'bench'), ('POSTGRES_HOST', 'localhost'),
+                      ('POSTGRES_PORT', '5432'), ('POSTGRES_DATABASE', 'bench')):
+    os.environ.setdefault(_name, _value)
+
+from app.core import state  # noqa: E402
+from app.core.feature_schema import apply_schema  # noqa: E402
+from app.core.likes_index import LikesIndex  # noqa: E402
+from app.core.post_cache import PostCache  # noqa: E402
+from app.core.rec_cache import RecommendationCache  # noqa: E402
+from app.core.user_store import UserFeatureStore  # noqa: E402
+from app.db.table_post import Post  # noqa: E402
+
+SAMPLES_DIR = Path(__file__).resolve().parent.parent / 'recommender' / 'data_samples'
+
+# model features that belong to the user side when the samples do not carry them
+USER_FEATURE_PREFIXES = ('user_emb_', 'country_', 'exp_group_', 'gender', 'age', 'views_', 'likes_per_day',
+                         'city_', 'movie_', 'business_', 'covid_', 'sport_', 'politics_', 'tech_')
+
+
+class Fixtures(NamedTuple):
+    users: pd.DataFrame
+    posts: pd.DataFrame
+    likes: pd.DataFrame
+
+
+class SamplePopularity:
+    def __init__(self, likes: pd.DataFrame, top_n: int = 100):
+        ranked = likes['post_id'].value_counts().sort_index().sort_values(ascending=False, kind='stable')
+        self.top_n = top_n
+        self._top: List[int] = ranked.index[:top_n].astype(int).tolist()
+
+    def top(self, limit: int) -> List[int]:
+        return self._top[:limit]
+
+    def refresh(self) -> int:
+        return 0
+
+
+class _Result:
+    def __init__(self, rows: list):
+        self._rows = rows
+
+    def scalars(self) -> '_Result':
+        return self
+
+    def all(self) -> list:
+        return self._rows
+
+
+class SampleSession:
+    """Answers `select_posts_by_ids` like the AsyncSession of the request path."""
+
+    def __init__(self, posts: pd.DataFrame):
+        self._posts = {int(pid): (text, topic) for pid, text, topic in
+                       zip(posts['id'], posts['text'], posts['topic'])}
+        self.queries = 0
+
+    async def execute(self, statement, params: Optional[dict] = None) -> _Result:
+        self.queries += 1
+        ids = (params or {}).get('ids', [])
+        return _Result([Post(id=pid, text=self._posts[pid][0], topic=self._posts[pid][1])
+                        for pid in ids if pid in self._posts])
+
+
+def _tile(df: pd.DataFrame, id_column: str, n: Optional[int]) -> pd.DataFrame:
+    if not n or n == len(df):
+        return df.reset_index(drop=True)
+    tiled = df.iloc[np.arange(n) % len(df)].reset_index(drop=True)
+    first_id = int(df[id_column].min())
+    tiled[id_column] = np.arange(first_id, first_id + n)
+    return tiled
+
+
+def _side(feature: str) -> str:
+    return 'user' if feature.startswith(USER_FEATURE_PREFIXES) else 'post'
+
+
+def load_fixtures(model: CatBoostClassifier, samples_dir: Path = SAMPLES_DIR, n_users: Optional[int] = None,
+                  n_posts: Optional[int] = None, likes_per_user: float = 20, seed: int = 0) -> Fixtures:
+    rng = np.random.default_rng(seed)
+    users = _tile(pd.read_csv(samples_dir / 'user_features.csv'), 'user_id', n_users)
+    posts = _tile(pd.read_csv(samples_dir / 'post_features.csv'), 'post_id', n_posts)
+
+    extra: Dict[str, Dict[str, np.ndarray]] = {'user': {}, 'post': {}}
+    present = set(users.columns) | set(posts.columns)
+    for feature in model.feature_names_:
+        if feature in present or feature in ('hour', 'weekday'):
+            continue
+        side = _side(feature)
+        extra[side][feature] = rng.standard_normal(len(users) if side == 'user' else len(posts)).astype(np.float32)
+    users = pd.concat([users, pd.DataFrame(extra['user'])], axis=1)
+    posts = pd.concat([posts, pd.DataFrame(extra['post'])], axis=1)
+
+    times = pd.to_datetime(pd.read_csv(samples_dir / 'likes.csv')['timestamp'], format='%d/%m/%y %H:%M')
+    n_likes = int(len(users) * likes_per_user)
+    likes = pd.DataFrame({
+        'user_id': rng.choice(users['user_id'].to_numpy(), n_likes),
+        'post_id': rng.choice(posts['post_id'].to_numpy(), n_likes),
+        'timestamp': times.sample(n_likes, replace=True, random_state=seed).to_numpy(),
+    })
+    return Fixtures(apply_schema(users), apply_schema(posts), likes)
+
+
+def post_content(posts: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        'id': posts['post_id'].astype(int),
+        'text': [f'sample post {pid}' for pid in posts['post_id']],
+        'topic': posts['topic'].astype(str) if 'topic' in posts.columns else '',
+    })
+
+
+def install(fixtures: Fixtures, model_paths: Dict[str, str], rec_cache: bool = False):
+    from app.core.experiments import load_router
+    from app.core.model_registry import ModelRegistry
+    from app.main import build_engine
+
+    state.user_store = UserFeatureStore.from_frame(fixtures.users)
+    state.posts_data = fixtures.posts
+    state.likes_index = LikesIndex(fixtures.likes)
+    state.popularity = SamplePopularity(fixtures.likes)
+    state.post_cache = PostCache(post_content(fixtures.posts))
+    state.rec_cache = RecommendationCache() if rec_cache else None
+    state.retriever = None
+    state.impressions = None
+    state.experiments = load_router()
+    state.models = ModelRegistry(build_engine)
+    for alias, path in model_paths.items():
+        state.models.assign(alias, path)
+    state.experiments.check_models(state.models.aliases())
@@ -0,0 +1,255 @@
+"""
+Offline replay benchmark of the recommendation endpoint.
+
+Recorded requests are replayed one by one against the real endpoint coroutine
+(`app.api.recommend.recommended_posts`) in-process: experiment routing, model
+registry, scoring executor and post cache all run as in the service, with the
+database replaced by the stand-ins of `benchmarks.fixtures`.
+
+Each stage of a request is timed by wrapping the component that implements it:
+
+- user_lookup: `UserFeatureStore.get`
+- likes_lookup: `LikesIndex.liked_before`
+- frame_build: `ScoringEngine.build` (filling the candidate feature block)
+- predict: `ScoringEngine._predict` (CatBoost), or the tree ranker's `top_k` when enabled
+- post_hydration: `PostCache.get_or_load`
+- total: the whole endpoint call
+
+The report gives throughput and mean/p50/p95/p99/max milliseconds per stage (the
+time a request spent in the stage), plus the settings and versions the run used,
+as JSON. Compare two reports with `--compare` to see regressions between commits.
+
+Request files:
+
+- `.jsonl`: one request per line, `{"user_id": 200, "time": "2021-12-10T12:00:00", "limit": 5}`
+  (or the same fields under "params", as in tests/test_api.py);
+- Parquet (file or directory): the service's impression log (see `app.core.impressions`);
+  each impression is replayed with its user, request time and number of posts.
+
+Usage:
+
+    python -m benchmarks.replay --requests benchmarks/requests.jsonl --output bench.json
+    python -m benchmarks.replay --posts 7000 --users 160000 --tree-ranker
+    python -m benchmarks.replay --compare before.json after.json
+
+Functions:
+
+- load_requests(path) -> list: (user_id, time, limit) tuples.
+- run_benchmark(requests, warmup=20) -> dict: report of one replay over the installed state.
+- compare(before, after) -> str: per-stage latency changes between two reports.
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.fixtures import SAMPLES_DIR, SampleSession, install, load_fixtures, post_content
+
+STAGES = ('user_lookup', 'likes_lookup', 'frame_build', 'predict', 'post_hydration', 'total')
+PERCENTILES = (50, 95, 99)
+
+Request = Tuple[int, datetime, int]
+
+
+def load_requests(path: str) -> List[Request]:
+    path = Path(path)
+    if path.suffix == '.jsonl':
+        requests = []
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                record = record.get('params', record)
+                requests.append((int(record['user_id']), datetime.fromisoformat(record['time']),
+                                 int(record.get('limit', 5))))
+        return requests
+    impressions = pd.read_parquet(path, columns=['user_id', 'timestamp', 'post_ids'])
+    return [(int(user_id), pd.Timestamp(ts).to_pydatetime(), len(post_ids))
+            for user_id, ts, post_ids in impressions.itertuples(index=False)]
+
+
+class StageRecorder:
+    """Accumulates the seconds spent in each stage of the current request."""
+
+    def __init__(self):
+        self.current: Dict[str, float] = {}
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.current[stage] = self.current.get(stage, 0.0) + time.perf_counter() - start
+        return timed
+
+    def wrap_async(self, stage: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.current[stage] = self.current.get(stage, 0.0) + time.perf_counter() - start
+        return timed
+
+
+def instrument(recorder: StageRecorder):
+    from app.core import state
+
+    state.user_store.get = recorder.wrap('user_lookup', state.user_store.get)
+    state.likes_index.liked_before = recorder.wrap('likes_lookup', state.likes_index.liked_before)
+    state.post_cache.get_or_load = recorder.wrap_async('post_hydration', state.post_cache.get_or_load)
+    engines = {id(state.models.engine(alias)): state.models.engine(alias) for alias in state.models.aliases()}
+    for engine in engines.values():
+        engine.build = recorder.wrap('frame_build', engine.build)
+        engine._predict = recorder.wrap('predict', engine._predict)
+        if engine.ranker is not None:
+            engine.ranker.top_k = recorder.wrap('predict', engine.ranker.top_k)
+
+
+def _summary(seconds: List[float]) -> dict:
+    ms = np.asarray(seconds) * 1000
+    summary = {'count': len(ms), 'mean_ms': round(float(ms.mean()), 4)}
+    for q, value in zip(PERCENTILES, np.percentile(ms, PERCENTILES)):
+        summary[f'p{q}_ms'] = round(float(value), 4)
+    summary['max_ms'] = round(float(ms.max()), 4)
+    return summary
+
+
+async def _replay(requests: List[Request], recorder: StageRecorder, session: SampleSession,
+                  warmup: int) -> Tuple[Dict[str, List[float]], float, int]:
+    from app.api.recommend import recommended_posts
+
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    empty = 0
+    for i, (user_id, request_time, limit) in enumerate(requests[:warmup] + requests):
+        if i == warmup:
+            started = time.perf_counter()
+        recorder.current = {}
+        start = time.perf_counter()
+        response = await recommended_posts(user_id=user_id, time=request_time, limit=limit, db=session)
+        recorder.current['total'] = time.perf_counter() - start
+        if i < warmup:
+            continue
+        empty += not response.recommendations
+        for stage, seconds in recorder.current.items():
+            samples[stage].append(seconds)
+    return samples, time.perf_counter() - started, empty
+
+
+def run_benchmark(requests: List[Request], warmup: int = 20) -> dict:
+    from app.core import state
+
+    recorder = StageRecorder()
+    instrument(recorder)
+    session = SampleSession(post_content(state.posts_data))
+    samples, wall, empty = asyncio.run(_replay(requests, recorder, session, min(warmup, len(requests))))
+    return {
+        'requests': len(requests),
+        'wall_seconds': round(wall, 4),
+        'throughput_rps': round(len(requests) / wall, 2) if wall > 0 else None,
+        'empty_responses': empty,
+        'db_queries': session.queries,
+        'stages': {stage: _summary(samples[stage]) for stage in STAGES if samples[stage]},
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before: dict, after: dict) -> str:
+    lines = [f"{'stage':<16}{'metric':<10}{'before':>12}{'after':>12}{'change':>10}"]
+    for stage in STAGES:
+        if stage not in before['stages'] or stage not in after['stages']:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            old, new = before['stages'][stage][metric], after['stages'][stage][metric]
+            change = f"{(new - old) / old:+.1%}" if old else 'n/a'
+            lines.append(f"{stage:<16}{metric:<10}{old:>12.3f}{new:>12.3f}{change:>10}")
+    lines.append(f"{'throughput':<26}{before['throughput_rps']:>12}{after['throughput_rps']:>12}")
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay recorded requests against the app in-process.")
+    parser.add_argument('--requests', default=str(Path(__file__).with_name('requests.jsonl')),
+                        help="recorded requests (.jsonl) or impression log (Parquet file or directory)")
+    parser.add_argument('--output', help="JSON report path (default: print only)")
+    parser.add_argument('--samples', default=str(SAMPLES_DIR), help="directory with the sample CSVs")
+    parser.add_argument('--users', type=int, help="tile sample users to this many users")
+    parser.add_argument('--posts', type=int, help="tile sample posts to this many posts")
+    parser.add_argument('--likes-per-user', type=float, default=20)
+    parser.add_argument('--model-test', default='models/best_catboost_model_16_7.cbm')
+    parser.add_argument('--model-control', default='models/best_catboost_model_16_7.cbm')
+    parser.add_argument('--warmup', type=int, default=20, help="requests replayed first and not measured")
+    parser.add_argument('--repeat', type=int, default=1, help="replay the request file this many times")
+    parser.add_argument('--rec-cache', action='store_true', help="serve repeated requests from the result cache")
+    parser.add_argument('--tree-ranker', action='store_true', help="rank through the validated tree ranker")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help="compare two reports and exit")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f_before, open(args.compare[1]) as f_after:
+            print(compare(json.load(f_before), json.load(f_after)))
+        return
+
+    if args.tree_ranker:
+        os.environ['TREE_RANKER'] = '1'
+    # imported after TREE_RANKER is set: app.main reads it at import time
+    from app.core.model_loader import load_model
+    from app.core.executor import scoring_executor
+
+    model_paths = {'test': args.model_test, 'control': args.model_control}
+    fixtures = load_fixtures(load_model(args.model_test), Path(args.samples), args.users, args.posts,
+                             args.likes_per_user)
+    install(fixtures, model_paths, rec_cache=args.rec_cache)
+    requests = load_requests(args.requests) * args.repeat
+
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'requests_file': args.requests,
+            'users': len(fixtures.users),
+            'posts': len(fixtures.posts),
+            'likes': len(fixtures.likes),
+            'models': model_paths,
+            'rec_cache': args.rec_cache,
+            'tree_ranker': args.tree_ranker,
+        },
+        **run_benchmark(requests, args.warmup),
+    }
+    scoring_executor.shutdown()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(text + '\n')
+    print(text, file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,21 @@
 """
 Module for generating and saving training dataset for the recommendation model.
 
+The feed window is read once from the database (server-side cursor, post ids passed
+as one array parameter, ordered by timestamp with user_id and post_id as tiebreak so
+the LIMIT cut is reproducible) and spooled to temporary Parquet chunks while the liked
+pairs are collected from the same rows. The chunks are then deduplicated one by one:
+a (user_id, post_id) pair keeps its first like if the pair was liked within the
+window, else its first view. Pairs are tracked as sorted int64 keys
+(`user_id << 32 | post_id`), so the dedup state is 8 bytes per pair and nothing but
+the current chunk is held as a DataFrame.
+`save_train_dataset` joins the features to each chunk and writes it as one Parquet
+part of a dataset directory, so the training set is bounded by disk, not RAM.
+
 Functions:
+- iter_feed_data(popular_post_ids, limit=..., chunk_size=...):
+    Yields deduplicated feed data chunks for selected post IDs, in timestamp order.
+
 - load_feed_data(popular_post_ids, limit=..., chunk_size=...):
     Loads filtered and deduplicated feed data for selected post IDs from the database.
 
@@ -9,61 +23,119 @@ Functions:
     Combines user, post, and interaction features into a single training dataset.
 
 - save_train_dataset(path):
-    Saves the generated training dataset to a parquet file.
+    Writes the training dataset as a directory of Parquet parts, chunk by chunk.
 
 - load_train_dataset(path):
-    Loads the training dataset from a parquet file.
+    Loads the training dataset from a parquet file or directory.
 """
 
-import pandas as pd
+import os
+import shutil
+import tempfile
 from pathlib import Path
+from typing import Iterator, Tuple
+
+import numpy as np
+import pandas as pd
 
 from app.db.database import engine
+from recommender.features.embeddings import get_lightfm_artifact
 from recommender.features.feature_engineering import make_user_features, make_post_features
+from recommender.features.feed_aggregates import scan_feed
+
+FEED_WINDOW_QUERY = """
+    SELECT timestamp, post_id, user_id, target
+    FROM public.feed_data
+    WHERE action = 'view' AND post_id = ANY(%(post_ids)s)
+    ORDER BY timestamp, user_id, post_id
+    LIMIT %(limit)s
+"""
+
+
+def _pair_keys(user_ids, post_ids) -> np.ndarray:
+    return (np.asarray(user_ids, dtype=np.int64) << 32) | np.asarray(post_ids, dtype=np.int64)
+
+
+def _isin_sorted(keys: np.ndarray, sorted_keys: np.ndarray) -> np.ndarray:
+    if len(sorted_keys) == 0:
+        return np.zeros(len(keys), dtype=bool)
+    position = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+    return sorted_keys[position] == keys
 
 
+def _dedup_chunk(chunk: pd.DataFrame, positives: np.ndarray, seen: np.ndarray) -> Tuple[pd.DataFrame, np.ndarray]:
+    keys = _pair_keys(chunk['user_id'], chunk['post_id'])
+    # liked pairs keep a like row, other pairs their first view
+    candidate = (chunk['target'].to_numpy() == 1) | ~_isin_sorted(keys, positives)
+    _, first = np.unique(keys[candidate], return_index=True)
+    rows = np.flatnonzero(candidate)[np.sort(first)]
+    rows = rows[~_isin_sorted(keys[rows], seen)]
+    return chunk.iloc[rows], np.union1d(seen, keys[rows])
+
+
+def iter_feed_data(popular_post_ids, limit=2_000_000, chunk_size=500_000) -> Iterator[pd.DataFrame]:
+    params = {"post_ids": [int(post_id) for post_id in popular_post_ids], "limit": int(limit)}
+    with tempfile.TemporaryDirectory() as tmp:
+        # one read of the window: spool it and collect the liked pairs from the same rows
+        parts = []
+        positives = np.empty(0, dtype=np.int64)
+        with engine.connect().execution_options(stream_results=True) as conn:
+            for chunk in pd.read_sql(FEED_WINDOW_QUERY, conn, params=params, chunksize=chunk_size):
+                liked = chunk[chunk['target'] == 1]
+                positives = np.union1d(positives, _pair_keys(liked['user_id'], liked['post_id']))
+                parts.append(Path(tmp) / f"window-{len(parts):05d}.parquet")
+                chunk.to_parquet(parts[-1], index=False)
+
+        seen = np.empty(0, dtype=np.int64)
+        for part in parts:
+            chunk, seen = _dedup_chunk(pd.read_parquet(part), positives, seen)
+            if len(chunk):
+                yield chunk
+
 
 def load_feed_data(popular_post_ids, limit=2_000_000, chunk_size=500_000):
-    post_ids_str = ','.join(map(str, popular_post_ids))
-    query = f"""
-        SELECT timestamp, post_id, user_id, target
-        FROM public.feed_data
-        WHERE action = 'view' AND post_id IN ({post_ids_str})
-        ORDER BY timestamp
-        LIMIT {limit}
-    """
-    chunks = []
-    with engine.connect() as conn:
-        for chunk in pd.read_sql(query, conn, chunksize=chunk_size):
-            chunks.append(chunk)
-    feed_df = pd.concat(chunks, ignore_index=True)
-    feed_df = (
-        feed_df.sort_values(by="target", ascending=False)
-        .drop_duplicates(subset=["user_id", "post_id"], keep="first")
-        .sort_values(by="timestamp")
-    )
-    return feed_df
+    chunks = list(iter_feed_data(popular_post_ids, limit, chunk_size))
+    return pd.concat(chunks, ignore_index=True)
 
 
-def make_train_dataset() -> pd.DataFrame:
-    user_df = make_user_features()
-    post_df = make_post_features()
-    popular_post_ids = post_df['post_id'].tolist()
-    feed_df = load_feed_data(popular_post_ids)
+def _build_features():
+    aggregates = scan_feed()
+    artifact = get_lightfm_artifact(likes_loader=aggregates.likes)
+    user_df = make_user_features(artifact=artifact, aggregates=aggregates)
+    post_df = make_post_features(artifact=artifact, aggregates=aggregates)
+    return user_df, post_df
+
 
-    train_df = (
+def _join_features(feed_df, user_df, post_df) -> pd.DataFrame:
+    return (
         feed_df
         .merge(post_df, how="left", on="post_id")
         .merge(user_df, how="left", on="user_id")
         .set_index(["timestamp", "user_id", "post_id"])
     )
 
-    return train_df
+
+def make_train_dataset() -> pd.DataFrame:
+    user_df, post_df = _build_features()
+    feed_df = load_feed_data(post_df['post_id'].tolist())
+    return _join_features(feed_df, user_df, post_df)
 
 def save_train_dataset(path: str = "recommender/train_data/train_dataset.parquet"):
-    df = make_train_dataset()
-    df.to_parquet(path)
-    print(f"Train dataset saved to {path}")
+    user_df, post_df = _build_features()
+    path = Path(path)
+    tmp = path.with_name(f'.{path.name}.tmp-{os.getpid()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    rows = 0
+    for part, feed_df in enumerate(iter_feed_data(post_df['post_id'].tolist())):
+        _join_features(feed_df, user_df, post_df).to_parquet(tmp / f"part-{part:05d}.parquet")
+        rows += len(feed_df)
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+    os.replace(tmp, path)
+    print(f"Train dataset saved to {path} ({rows} rows)")
 
 
 def load_train_dataset(path: str = "recommender/train_data/train_dataset.parquet") -> pd.DataFrame:
@@ -0,0 +1,198 @@
+"""
+LightFM embedding stage shared by the user and post feature builders.
+
+The WARP model is trained once on the likes of `feed_data` and stored as an artifact:
+
+    <LIGHTFM_CACHE_DIR>/lightfm-<key>/manifest.json         data version, hyperparameters
+    <LIGHTFM_CACHE_DIR>/lightfm-<key>/model.pkl             pickled (Dataset, LightFM)
+    <LIGHTFM_CACHE_DIR>/lightfm-<key>/user_ids.npy          user id of every embedding row
+    <LIGHTFM_CACHE_DIR>/lightfm-<key>/user_embeddings.npy   float32 [users x components]
+    <LIGHTFM_CACHE_DIR>/lightfm-<key>/post_ids.npy
+    <LIGHTFM_CACHE_DIR>/lightfm-<key>/post_embeddings.npy
+
+`key` hashes the change marker of `feed_data` (see `app.core.feature_cache.relation_version`)
+and the hyperparameters, so user and post vectors always come from the same model and
+a run retrains only when the likes or the parameters change. Within a process the
+artifact is also kept in memory, so `make_user_features` and `make_post_features` share
+one training even without a cache directory.
+
+Settings: LIGHTFM_CACHE_DIR (empty = no disk cache), LIGHTFM_NUM_THREADS (trainer
+threads, default: all CPUs), LIGHTFM_COMPONENTS, LIGHTFM_EPOCHS.
+
+Classes:
+
+- LightFMArtifact(dataset, model, user_ids, user_embeddings, post_ids, post_embeddings, manifest):
+    - train(likes, params, num_threads, manifest) -> LightFMArtifact
+    - save(path) / load(path)
+    - user_frame() -> pd.DataFrame: user_id, user_emb_0..n
+    - post_frame() -> pd.DataFrame: post_id, post_emb_0..n
+
+Functions:
+
+- load_likes() -> pd.DataFrame: (user_id, post_id) of all likes.
+- artifact_key(version, params) -> str
+- get_lightfm_artifact(cache_dir=LIGHTFM_CACHE_DIR, params=LIGHTFM_PARAMS,
+                       num_threads=LIGHTFM_NUM_THREADS, likes_loader=load_likes) -> LightFMArtifact:
+    `likes_loader` is only called when the model has to be trained.
+- latest_lightfm_artifact(cache_dir=LIGHTFM_CACHE_DIR) -> LightFMArtifact | None:
+    Most recently written artifact whatever its data version (incremental refreshes
+    reuse it instead of retraining on every new like).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+from lightfm import LightFM
+from lightfm.data import Dataset
+
+from app.core.feature_cache import relation_version
+from app.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+LIGHTFM_CACHE_DIR = os.environ.get('LIGHTFM_CACHE_DIR', '')
+LIGHTFM_NUM_THREADS = int(os.environ.get('LIGHTFM_NUM_THREADS', os.cpu_count() or 1))
+
+LIGHTFM_PARAMS = {
+    'loss': 'warp',
+    'no_components': int(os.environ.get('LIGHTFM_COMPONENTS', 10)),
+    'epochs': int(os.environ.get('LIGHTFM_EPOCHS', 10)),
+    'random_state': 42,
+}
+
+LIKES_TABLE = 'public.feed_data'
+
+_artifacts: Dict[str, 'LightFMArtifact'] = {}
+
+
+def load_likes() -> pd.DataFrame:
+    query = f'SELECT post_id, user_id FROM {LIKES_TABLE} WHERE target = 1'
+    chunks = []
+    with engine.connect() as conn:
+        for chunk in pd.read_sql(query, conn, chunksize=100_000):
+            chunks.append(chunk)
+    return pd.concat(chunks)
+
+
+def artifact_key(version: Optional[str], params: dict) -> str:
+    marker = json.dumps({'data': version, 'params': params}, sort_keys=True)
+    return hashlib.sha1(marker.encode()).hexdigest()[:16]
+
+
+class LightFMArtifact:
+    def __init__(self, dataset: Dataset, model: LightFM, user_ids: np.ndarray, user_embeddings: np.ndarray,
+                 post_ids: np.ndarray, post_embeddings: np.ndarray, manifest: dict):
+        self.dataset = dataset
+        self.model = model
+        self.user_ids = user_ids
+        self.user_embeddings = user_embeddings
+        self.post_ids = post_ids
+        self.post_embeddings = post_embeddings
+        self.manifest = manifest
+
+    @classmethod
+    def train(cls, likes: pd.DataFrame, params: dict, num_threads: int, manifest: dict) -> 'LightFMArtifact':
+        dataset = Dataset()
+        dataset.fit(likes['user_id'], likes['post_id'])
+        interactions, _ = dataset.build_interactions(zip(likes['user_id'], likes['post_id']))
+
+        model_params = {k: v for k, v in params.items() if k != 'epochs'}
+        model = LightFM(**model_params)
+        start = time.perf_counter()
+        model.fit(interactions, epochs=params['epochs'], num_threads=num_threads)
+        logger.info("Trained LightFM on %d likes in %.1fs (%d threads)",
+                    len(likes), time.perf_counter() - start, num_threads)
+
+        # embedding row i belongs to the id with internal index i
+        user_id_map, _, post_id_map, _ = dataset.mapping()
+        user_ids = np.empty(len(user_id_map), dtype=np.int64)
+        user_ids[list(user_id_map.values())] = list(user_id_map.keys())
+        post_ids = np.empty(len(post_id_map), dtype=np.int64)
+        post_ids[list(post_id_map.values())] = list(post_id_map.keys())
+        return cls(dataset, model, user_ids, model.get_user_representations()[1],
+                   post_ids, model.get_item_representations()[1], manifest)
+
+    def save(self, path: Union[str, Path]):
+        path = Path(path)
+        tmp = path.with_name(f'.{path.name}.tmp-{os.getpid()}')
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        with open(tmp / 'model.pkl', 'wb') as f:
+            pickle.dump((self.dataset, self.model), f, protocol=pickle.HIGHEST_PROTOCOL)
+        np.save(tmp / 'user_ids.npy', self.user_ids)
+        np.save(tmp / 'user_embeddings.npy', self.user_embeddings)
+        np.save(tmp / 'post_ids.npy', self.post_ids)
+        np.save(tmp / 'post_embeddings.npy', self.post_embeddings)
+        with open(tmp / 'manifest.json', 'w') as f:
+            json.dump(self.manifest, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'LightFMArtifact':
+        path = Path(path)
+        with open(path / 'manifest.json') as f:
+            manifest = json.load(f)
+        with open(path / 'model.pkl', 'rb') as f:
+            dataset, model = pickle.load(f)
+        return cls(dataset, model, np.load(path / 'user_ids.npy'), np.load(path / 'user_embeddings.npy'),
+                   np.load(path / 'post_ids.npy'), np.load(path / 'post_embeddings.npy'), manifest)
+
+    @staticmethod
+    def _frame(ids: np.ndarray, embeddings: np.ndarray, id_column: str, prefix: str) -> pd.DataFrame:
+        df = pd.DataFrame(embeddings, columns=[f'{prefix}_{i}' for i in range(embeddings.shape[1])])
+        df[id_column] = ids
+        return df
+
+    def user_frame(self) -> pd.DataFrame:
+        return self._frame(self.user_ids, self.user_embeddings, 'user_id', 'user_emb')
+
+    def post_frame(self) -> pd.DataFrame:
+        return self._frame(self.post_ids, self.post_embeddings, 'post_id', 'post_emb')
+
+
+def get_lightfm_artifact(cache_dir: Union[str, Path] = LIGHTFM_CACHE_DIR, params: dict = LIGHTFM_PARAMS,
+                         num_threads: int = LIGHTFM_NUM_THREADS,
+                         likes_loader: Callable[[], pd.DataFrame] = load_likes) -> LightFMArtifact:
+    version = relation_version(LIKES_TABLE)
+    key = artifact_key(version, params)
+    if key in _artifacts:
+        return _artifacts[key]
+
+    path = Path(cache_dir) / f'lightfm-{key}' if cache_dir and version is not None else None
+    if path is not None and (path / 'manifest.json').exists():
+        artifact = LightFMArtifact.load(path)
+        logger.info("Loaded LightFM embeddings from %s", path)
+    else:
+        manifest = {'key': key, 'data_version': version, 'params': params}
+        artifact = LightFMArtifact.train(likes_loader(), params, num_threads, manifest)
+        if path is not None:
+            artifact.save(path)
+            for stale in path.parent.glob('lightfm-*'):
+                if stale != path:
+                    shutil.rmtree(stale, ignore_errors=True)
+            logger.info("Cached LightFM embeddings at %s", path)
+    _artifacts[key] = artifact
+    return artifact
+
+
+def latest_lightfm_artifact(cache_dir: Union[str, Path] = LIGHTFM_CACHE_DIR) -> Optional[LightFMArtifact]:
+    if not cache_dir:
+        return None
+    saved = [path for path in Path(cache_dir).glob('lightfm-*') if (path / 'manifest.json').exists()]
+    if not saved:
+        return None
+    path = max(saved, key=lambda p: (p / 'manifest.json').stat().st_mtime)
+    key = path.name[len('lightfm-'):]
+    if key not in _artifacts:
+        _artifacts[key] = LightFMArtifact.load(path)
+    return _artifacts[key]
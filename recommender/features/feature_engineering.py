@@ -4,20 +4,22 @@ Feature engineering module for training the recommendation model.
 Functions:
 
 User Features:
-- get_user_data():
+- get_user_data(user_ids=None):
     Loads raw user metadata from the database.
 
-- get_user_activity_features():
+- get_user_activity_features(user_ids=None):
     Calculates user activity as mean views per active day.
 
-- get_user_topic_preferences():
+- get_user_topic_preferences(user_ids=None):
     Computes user like/view rates for each topic.
 
-- get_user_embeddings():
+- get_user_embeddings(artifact=None):
     Returns user embeddings from LightFM model.
 
-- make_user_features():
-    Combines user features into a single DataFrame.
+- make_user_features(user_ids=None, artifact=None, aggregates=None):
+    Combines user features into a single DataFrame. `user_ids` limits it to those
+    users (incremental refresh), `artifact` picks the LightFM artifact to use and
+    `aggregates` (recommender.features.feed_aggregates) replaces the feed_data queries.
 
 Post Features:
 - get_post_data():
@@ -32,54 +34,64 @@ Post Features:
 - get_post_rating():
     Computes like-based rating for posts.
 
-- get_post_embeddings():
+- get_post_embeddings(artifact=None):
     Returns post embeddings from LightFM model.
 
-- make_post_features():
-    Combines post features into a single DataFrame.
+- make_post_features(artifact=None, aggregates=None):
+    Combines post features into a single DataFrame. `aggregates` is a FeedAggregates
+    or the stored PostCounters of the incremental refresh.
 
 LightFM:
 - get_lightfm_embeddings():
-    Trains LightFM model and extracts user/post embeddings.
+    LightFM dataset, model and user/post embeddings from the shared embedding stage
+    (trained once per data version, see recommender.features.embeddings).
 """
 
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.decomposition import TruncatedSVD
-from lightfm import LightFM
-from lightfm.data import Dataset
 
 from app.db.database import engine
+from recommender.features.embeddings import get_lightfm_artifact
 
 # USERS FEATURES
+# restricts a feature query to `user_ids` (None = all users)
+def _user_filter(user_ids):
+    if user_ids is None:
+        return '', None
+    return ' AND user_id = ANY(%(user_ids)s)', {'user_ids': [int(i) for i in user_ids]}
+
+
 # load users data
-def get_user_data():
+def get_user_data(user_ids=None):
+    condition, params = _user_filter(user_ids)
     with engine.connect() as conn:
-        return pd.read_sql('SELECT * FROM public.user_data', conn)
+        return pd.read_sql('SELECT * FROM public.user_data WHERE TRUE' + condition, conn, params=params)
 
 # count users mean views per day (users activity rate)
-def get_user_activity_features():
+def get_user_activity_features(user_ids=None):
+    condition, params = _user_filter(user_ids)
     query = """
     WITH preagg AS (
         SELECT user_id, COUNT(target) AS views_count,
                MAX("timestamp")::date - MIN("timestamp")::date AS active_days
         FROM public.feed_data
-        WHERE action = 'view'
+        WHERE action = 'view'""" + condition + """
         GROUP BY user_id
     )
     SELECT user_id, views_count / NULLIF(active_days, 0) AS views_day FROM preagg
     """
     with engine.connect() as conn:
-        return pd.read_sql(query, conn)
+        return pd.read_sql(query, conn, params=params)
 
 
-def get_user_embeddings():
-    _, _, user_df_fm, _ = get_lightfm_embeddings()
-    return user_df_fm
+def get_user_embeddings(artifact=None):
+    return (artifact or get_lightfm_artifact()).user_frame()
 
 
 # count users' likes-rate fot post's topics
-def get_user_topic_preferences():
+def get_user_topic_preferences(user_ids=None):
+    condition, params = _user_filter(user_ids)
     query = """
     SELECT 
         user_id,     
@@ -97,19 +109,23 @@ def get_user_topic_preferences():
         SUM(target) FILTER (where topic = 'tech')::decimal / COUNT(post_id) FILTER (where topic = 'tech') AS tech_likes_rate
     
     FROM public.feed_data f LEFT JOIN public.post_text_df p USING (post_id)
-    WHERE action = 'view'
+    WHERE action = 'view'""" + condition + """
     GROUP BY user_id
     """
 
     with engine.connect() as conn:
-        return pd.read_sql(query, conn)
+        return pd.read_sql(query, conn, params=params)
 
 
-def make_user_features():
-    base = get_user_data()
-    activity = get_user_activity_features()
-    preferences = get_user_topic_preferences()
-    embeddings = get_user_embeddings()
+def make_user_features(user_ids=None, artifact=None, aggregates=None):
+    base = get_user_data(user_ids)
+    if aggregates is not None:
+        activity = aggregates.user_activity()
+        preferences = aggregates.user_topic_preferences()
+    else:
+        activity = get_user_activity_features(user_ids)
+        preferences = get_user_topic_preferences(user_ids)
+    embeddings = get_user_embeddings(artifact)
 
     user_df = base.merge(activity, on='user_id', how='left')\
                    .merge(preferences, on='user_id', how='left')\
@@ -166,19 +182,18 @@ def get_post_rating():
         return pd.read_sql(query, conn)
 
 
-def get_post_embeddings():
-    _, _, _, post_df_fm = get_lightfm_embeddings()
-    return post_df_fm
+def get_post_embeddings(artifact=None):
+    return (artifact or get_lightfm_artifact()).post_frame()
 
 
-def make_post_features():
+def make_post_features(artifact=None, aggregates=None):
     posts = get_post_data()
-    ids = get_popular_post_ids()
+    ids = aggregates.popular_post_ids() if aggregates is not None else get_popular_post_ids()
     posts = posts[posts['post_id'].isin(ids)]
 
     tfidf_df = get_text_features(posts)
-    rating = get_post_rating()
-    embeddings = get_post_embeddings()
+    rating = aggregates.post_rating() if aggregates is not None else get_post_rating()
+    embeddings = get_post_embeddings(artifact)
 
     post_df = pd.concat([posts.reset_index(drop=True), tfidf_df], axis=1)
     post_df = post_df.merge(rating, on='post_id', how='left') \
@@ -189,41 +204,5 @@ def make_post_features():
 
 # LIGHTFM FEATURES
 def get_lightfm_embeddings():
-    query = 'SELECT post_id, user_id FROM public.feed_data WHERE target = 1'
-    chunks = []
-    with engine.connect() as conn:
-        for chunk in pd.read_sql(query, conn, chunksize=100_000):
-            chunks.append(chunk)
-    df = pd.concat(chunks)
-
-    dataset = Dataset()
-    dataset.fit(df['user_id'], df['post_id'])
-    interactions, _ = dataset.build_interactions(list(zip(df['user_id'], df['post_id'])))
-
-    model = LightFM(loss='warp')
-    model.fit(interactions, epochs=10, num_threads=2)
-
-    user_embeddings = model.get_user_representations()[1]
-    item_embeddings = model.get_item_representations()[1]
-
-    user_id_map, _, post_id_map, _ = dataset.mapping()
-    user_inv = {v: k for k, v in user_id_map.items()}
-    post_inv = {v: k for k, v in post_id_map.items()}
-
-    user_df = pd.DataFrame(user_embeddings)
-    user_df['internal_id'] = user_df.index
-    user_df['user_id'] = user_df['internal_id'].map(user_inv)
-    user_df = user_df.drop(columns='internal_id')
-    user_df = user_df.rename(columns={i: f'user_emb_{i}' for i in range(user_embeddings.shape[1])})
-
-    post_df = pd.DataFrame(item_embeddings)
-    post_df['internal_id'] = post_df.index
-    post_df['post_id'] = post_df['internal_id'].map(post_inv)
-    post_df = post_df.drop(columns='internal_id')
-    post_df = post_df.rename(columns={i: f'post_emb_{i}' for i in range(item_embeddings.shape[1])})
-
-    return dataset, model, user_df, post_df
-
-
-
-
+    artifact = get_lightfm_artifact()
+    return artifact.dataset, artifact.model, artifact.user_frame(), artifact.post_frame()
@@ -0,0 +1,168 @@
+"""
+Single-pass aggregation of `feed_data` for the user and post features.
+
+`scan_feed` streams `feed_data` once through a server-side cursor (`stream_results`)
+in chunks of FEED_CHUNK_ROWS and folds every chunk into per-user and per-post
+accumulators with vectorized group-bys. It replaces the separate full scans of
+`get_user_activity_features`, `get_user_topic_preferences`, `get_popular_post_ids`,
+`get_post_rating` and the LightFM like query. Accumulators only depend on sums,
+counts, minima and maxima, so chunks can arrive in any order and the query needs
+no ORDER BY (which would sort the whole table first).
+
+Every result matches the SQL it replaces (integer `views_day`, NULL rates for
+users without views of a topic, dense like ranking of posts).
+
+Post views and likes are also kept per day (`post_daily_counts`): the incremental
+refresh of `recommender.features.materialize` stores them and only recomputes the
+days since its watermark, then ranks posts from the stored counters (`PostCounters`).
+
+Classes:
+
+- PostCounters(counts): views and likes per post (post_id, views, likes).
+    - popular_post_ids(min_likes) -> list: posts with more than `min_likes` views.
+    - post_rating() -> pd.DataFrame: post_id, likes_rating.
+
+- FeedAggregates(post_topics):
+    - update(chunk): folds a chunk of (timestamp, user_id, post_id, action, target).
+    - user_activity() -> pd.DataFrame: user_id, views_day.
+    - user_topic_preferences() -> pd.DataFrame: user_id, <topic>_likes_rate, movie_views_rate.
+    - post_daily_counts() -> pd.DataFrame: post_id, day, views, likes.
+    - post_counters() -> PostCounters; popular_post_ids(min_likes) and post_rating()
+      delegate to it.
+    - likes() -> pd.DataFrame: (user_id, post_id) of all likes, for LightFM.
+
+Functions:
+
+- scan_feed(chunk_size=FEED_CHUNK_ROWS) -> FeedAggregates
+"""
+
+import logging
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.db.database import engine
+
+logger = logging.getLogger(__name__)
+
+FEED_CHUNK_ROWS = int(os.environ.get('FEED_CHUNK_ROWS', 1_000_000))
+
+FEED_QUERY = 'SELECT "timestamp", user_id, post_id, action, target FROM public.feed_data'
+
+# topics of get_user_topic_preferences; only 'movie' also has a views rate
+TOPICS = ['movie', 'business', 'covid', 'sport', 'politics', 'tech']
+
+
+def _add(total: Optional[pd.DataFrame], part: pd.DataFrame) -> pd.DataFrame:
+    return part if total is None else total.add(part, fill_value=0)
+
+
+class PostCounters:
+    def __init__(self, counts: pd.DataFrame):
+        self.counts = counts.set_index('post_id')[['views', 'likes']]
+
+    def popular_post_ids(self, min_likes: int = 2000) -> list:
+        views = self.counts['views']
+        return views.index[views > min_likes].tolist()
+
+    def post_rating(self) -> pd.DataFrame:
+        likes = self.counts['likes']
+        rating = likes.rank(method='dense', ascending=False).astype(np.int64)
+        return pd.DataFrame({'post_id': likes.index, 'likes_rating': rating.to_numpy()})
+
+
+class FeedAggregates:
+    def __init__(self, post_topics: pd.Series):
+        self.post_topics = post_topics
+        self.rows = 0
+        # per user over views: count(target), count(post_id), first and last view
+        self._user_views: Optional[pd.DataFrame] = None
+        self._user_span: Optional[pd.DataFrame] = None
+        # per (user, topic) over views: sum(target), count(post_id)
+        self._topic_likes: Optional[pd.DataFrame] = None
+        self._topic_views: Optional[pd.DataFrame] = None
+        # per (post, day) over views: count(*), sum(target)
+        self._post_days: Optional[pd.DataFrame] = None
+        self._like_users: List[np.ndarray] = []
+        self._like_posts: List[np.ndarray] = []
+
+    def update(self, chunk: pd.DataFrame):
+        self.rows += len(chunk)
+        liked = chunk[chunk['target'] == 1]
+        self._like_users.append(liked['user_id'].to_numpy())
+        self._like_posts.append(liked['post_id'].to_numpy())
+
+        views = chunk[chunk['action'] == 'view']
+        by_user = views.groupby('user_id')
+        self._user_views = _add(self._user_views, by_user.agg(
+            views=('target', 'count'), posts=('post_id', 'count')
+        ))
+        span = by_user['timestamp'].agg(['min', 'max'])
+        if self._user_span is not None:
+            span = pd.concat([self._user_span, span]).groupby(level=0).agg({'min': 'min', 'max': 'max'})
+        self._user_span = span
+
+        topics = views.assign(topic=views['post_id'].map(self.post_topics))
+        topics = topics[topics['topic'].isin(TOPICS)].groupby(['user_id', 'topic'])
+        self._topic_likes = _add(self._topic_likes, topics['target'].sum().unstack())
+        self._topic_views = _add(self._topic_views, topics['post_id'].count().unstack())
+
+        days = views['timestamp'].dt.normalize().rename('day')
+        self._post_days = _add(self._post_days, views.groupby(['post_id', days]).agg(
+            views=('target', 'size'), likes=('target', 'sum')
+        ))
+
+    def user_activity(self) -> pd.DataFrame:
+        views = self._user_views['views']
+        active_days = (self._user_span['max'].dt.normalize() - self._user_span['min'].dt.normalize()).dt.days
+        # bigint / integer in SQL: integer division, NULL for a single active day
+        views_day = (views // active_days.replace(0, np.nan).reindex(views.index))
+        return pd.DataFrame({'user_id': views.index, 'views_day': views_day.to_numpy()})
+
+    def user_topic_preferences(self) -> pd.DataFrame:
+        users = self._user_views.index
+        likes = self._topic_likes.reindex(index=users, columns=TOPICS)
+        # no views of a topic: NULL rate, as SUM / COUNT over an empty FILTER
+        views = self._topic_views.reindex(index=users, columns=TOPICS).replace(0, np.nan)
+        rates = likes / views
+        df = pd.DataFrame({'user_id': users})
+        for topic in TOPICS:
+            df[f'{topic}_likes_rate'] = rates[topic].to_numpy()
+            if topic == 'movie':
+                df['movie_views_rate'] = (views['movie'].fillna(0) / self._user_views['posts']).to_numpy()
+        return df
+
+    def post_daily_counts(self) -> pd.DataFrame:
+        return self._post_days.astype(np.int64).reset_index()
+
+    def post_counters(self) -> PostCounters:
+        return PostCounters(self._post_days.groupby(level='post_id').sum().reset_index())
+
+    def popular_post_ids(self, min_likes: int = 2000) -> list:
+        return self.post_counters().popular_post_ids(min_likes)
+
+    def post_rating(self) -> pd.DataFrame:
+        return self.post_counters().post_rating()
+
+    def likes(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'post_id': np.concatenate(self._like_posts) if self._like_posts else np.empty(0, dtype=np.int64),
+            'user_id': np.concatenate(self._like_users) if self._like_users else np.empty(0, dtype=np.int64),
+        })
+
+
+def scan_feed(chunk_size: int = FEED_CHUNK_ROWS) -> FeedAggregates:
+    with engine.connect() as conn:
+        post_topics = pd.read_sql('SELECT post_id, topic FROM public.post_text_df', conn) \
+            .set_index('post_id')['topic']
+
+    aggregates = FeedAggregates(post_topics)
+    start = time.perf_counter()
+    with engine.connect().execution_options(stream_results=True) as conn:
+        for chunk in pd.read_sql(FEED_QUERY, conn, chunksize=chunk_size):
+            aggregates.update(chunk)
+    logger.info("Aggregated %d feed_data rows in one pass in %.1fs", aggregates.rows, time.perf_counter() - start)
+    return aggregates
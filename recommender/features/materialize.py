@@ -0,0 +1,274 @@
+"""
+Incremental materialization of the user and post feature tables.
+
+A refresh only recomputes what changed since the last run:
+
+- users: the watermark (max `feed_data.timestamp` already materialized) is kept in
+  `public.feature_watermarks`. Users with views after the watermark minus
+  REFRESH_OVERLAP_SECONDS, plus users of `user_data` missing from the table, are
+  recomputed with `make_user_features(user_ids)` and merged
+  into `user_features`: COPY into a temporary staging table, then DELETE + INSERT of
+  those users and the new watermark in one transaction.
+- posts: a few thousand rows whose `likes_rating` is a rank over all posts, so the
+  table is rebuilt in full, but from `public.post_daily_counters` (views and likes per
+  post and day) instead of the feed history. An incremental run only recomputes the
+  counters of the days from the day of its watermark minus REFRESH_OVERLAP_SECONDS on
+  (`feed_data` rows of those days).
+
+Like the serving-side `RefreshWindow` (app.core.refresh_window), both refreshes re-read
+REFRESH_OVERLAP_SECONDS below the watermark, so a feed row that commits late with a
+timestamp at or below it is still picked up by the next run. Both merges replace
+whole users or days, so re-reading rows already applied does not count them twice.
+
+The LightFM embeddings are not retrained by an incremental run: it reuses the latest
+artifact in LIGHTFM_CACHE_DIR (see `recommender.features.embeddings`), and new users
+get zero vectors until the next full run. Without a saved artifact the incremental run
+fails; run `--full` once with LIGHTFM_CACHE_DIR set.
+
+A full rebuild (first run, `--full`, or when the feature columns changed) COPYs the
+whole table into `<table>_staging` and swaps it in with renames in one transaction,
+so readers see either the old or the new table and never a dropped one.
+
+Functions:
+
+- copy_frame(conn, df, table): bulk-loads `df` into `table` with COPY.
+- publish_full(conn, df, table, id_column): staging table + atomic rename swap;
+    `id_column` may be a list of columns (composite primary key).
+- publish_delta(conn, df, table, id_column): replaces the rows of `df`'s ids.
+- rescan_since(watermark) -> datetime: lower bound of an incremental read (the
+    watermark minus REFRESH_OVERLAP_SECONDS).
+- changed_user_ids(since, until) -> list: users with views in (since, until].
+- refresh_post_counters(conn, since, until) -> PostCounters: recomputes the counters of
+    the days of [since, until] and returns the totals per post.
+- refresh_user_features(full=False, feed=scan_feed) -> int: rows written.
+- refresh_post_features(full=False, feed=scan_feed) -> int: rows written.
+    `feed()` returns the single-pass feed_data aggregates (see
+    recommender.features.feed_aggregates), shared by both refreshes in `main`.
+- main(full=False)
+
+Run `python -m recommender.features.materialize [--full]`.
+"""
+
+import argparse
+import io
+import logging
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Callable, List, Optional, Union
+
+import pandas as pd
+from sqlalchemy import text
+
+from app.core.refresh_window import REFRESH_OVERLAP_SECONDS
+from app.db.database import engine
+from recommender.features.embeddings import get_lightfm_artifact, latest_lightfm_artifact
+from recommender.features.feed_aggregates import FeedAggregates, PostCounters, scan_feed
+from recommender.features.feature_engineering import make_user_features, make_post_features
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = 'public'
+USER_TABLE = 'user_features'
+POST_TABLE = 'post_features'
+COUNTERS_TABLE = 'post_daily_counters'
+COPY_CHUNK_ROWS = 100_000
+
+WATERMARKS_DDL = text("""
+CREATE TABLE IF NOT EXISTS public.feature_watermarks (
+    name text PRIMARY KEY,
+    watermark timestamp NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now()
+)
+""")
+
+
+def get_watermark(conn, name: str):
+    conn.execute(WATERMARKS_DDL)
+    return conn.execute(
+        text("SELECT watermark FROM public.feature_watermarks WHERE name = :name"), {"name": name}
+    ).scalar()
+
+
+def set_watermark(conn, name: str, watermark):
+    conn.execute(text("""
+        INSERT INTO public.feature_watermarks (name, watermark) VALUES (:name, :watermark)
+        ON CONFLICT (name) DO UPDATE SET watermark = EXCLUDED.watermark, updated_at = now()
+    """), {"name": name, "watermark": watermark})
+
+
+def table_columns(conn, table: str) -> List[str]:
+    return list(conn.execute(text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = :schema AND table_name = :table ORDER BY ordinal_position
+    """), {"schema": SCHEMA, "table": table}).scalars())
+
+
+def copy_frame(conn, df: pd.DataFrame, table: str):
+    columns = ', '.join(f'"{column}"' for column in df.columns)
+    cursor = conn.connection.cursor()
+    for start in range(0, len(df), COPY_CHUNK_ROWS):
+        buffer = io.StringIO()
+        df.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(f'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def publish_full(conn, df: pd.DataFrame, table: str, id_column: Union[str, List[str]]):
+    staging = f'{table}_staging'
+    key = ', '.join(f'"{column}"' for column in ([id_column] if isinstance(id_column, str) else id_column))
+    conn.execute(text('SET LOCAL statement_timeout = 0'))
+    conn.execute(text(f'DROP TABLE IF EXISTS {SCHEMA}.{staging}'))
+    df.head(0).to_sql(staging, conn, schema=SCHEMA, index=False)
+    copy_frame(conn, df, f'{SCHEMA}.{staging}')
+    conn.execute(text(f'ALTER TABLE {SCHEMA}.{staging} ADD CONSTRAINT {staging}_pkey PRIMARY KEY ({key})'))
+    conn.execute(text(f'DROP TABLE IF EXISTS {SCHEMA}.{table}_old'))
+    conn.execute(text(f'ALTER TABLE IF EXISTS {SCHEMA}.{table} RENAME TO {table}_old'))
+    conn.execute(text(f'ALTER TABLE {SCHEMA}.{staging} RENAME TO {table}'))
+    conn.execute(text(f'DROP TABLE IF EXISTS {SCHEMA}.{table}_old'))
+    conn.execute(text(f'ALTER INDEX {SCHEMA}.{staging}_pkey RENAME TO {table}_pkey'))
+
+
+def publish_delta(conn, df: pd.DataFrame, table: str, id_column: str):
+    staging = f'{table}_delta'
+    columns = ', '.join(f'"{column}"' for column in df.columns)
+    conn.execute(text('SET LOCAL statement_timeout = 0'))
+    conn.execute(text(
+        f'CREATE TEMPORARY TABLE {staging} (LIKE {SCHEMA}.{table} INCLUDING DEFAULTS) ON COMMIT DROP'
+    ))
+    copy_frame(conn, df, staging)
+    conn.execute(text(f'DELETE FROM {SCHEMA}.{table} t USING {staging} s WHERE t."{id_column}" = s."{id_column}"'))
+    conn.execute(text(f'INSERT INTO {SCHEMA}.{table} ({columns}) SELECT {columns} FROM {staging}'))
+
+
+def feed_watermark(conn):
+    return conn.execute(text('SELECT MAX("timestamp") FROM public.feed_data')).scalar()
+
+
+def rescan_since(watermark) -> datetime:
+    return pd.Timestamp(watermark).to_pydatetime() - timedelta(seconds=REFRESH_OVERLAP_SECONDS)
+
+
+def changed_user_ids(since, until) -> List[int]:
+    query = text("""
+        SELECT DISTINCT user_id FROM public.feed_data
+        WHERE "timestamp" > :since AND "timestamp" <= :until
+        UNION
+        SELECT user_id FROM public.user_data u
+        WHERE NOT EXISTS (SELECT 1 FROM public.user_features f WHERE f.user_id = u.user_id)
+    """)
+    with engine.connect() as conn:
+        return list(conn.execute(query, {"since": since, "until": until}).scalars())
+
+
+def refresh_post_counters(conn, since, until) -> PostCounters:
+    start = pd.Timestamp(since).normalize().to_pydatetime()
+    delta = pd.read_sql(text("""
+        SELECT post_id, date_trunc('day', "timestamp") AS day, COUNT(*) AS views, SUM(target) AS likes
+        FROM public.feed_data
+        WHERE action = 'view' AND "timestamp" >= :start AND "timestamp" <= :until
+        GROUP BY 1, 2
+    """), conn, params={"start": start, "until": until})
+    conn.execute(text(f'DELETE FROM {SCHEMA}.{COUNTERS_TABLE} WHERE day >= :start'), {"start": start})
+    copy_frame(conn, delta[['post_id', 'day', 'views', 'likes']], f'{SCHEMA}.{COUNTERS_TABLE}')
+    logger.info("%s: recomputed %d post days from %s", COUNTERS_TABLE, len(delta), start)
+    return PostCounters(pd.read_sql(text(f"""
+        SELECT post_id, SUM(views) AS views, SUM(likes) AS likes
+        FROM {SCHEMA}.{COUNTERS_TABLE} GROUP BY post_id
+    """), conn))
+
+
+def _needs_full(conn, table: str, watermark) -> Optional[str]:
+    if watermark is None:
+        return "no watermark"
+    if not table_columns(conn, table):
+        return "table missing"
+    return None
+
+
+def _latest_artifact(table: str):
+    artifact = latest_lightfm_artifact()
+    if artifact is None:
+        raise RuntimeError(
+            f"{table}: no saved LightFM artifact for an incremental run; "
+            "set LIGHTFM_CACHE_DIR and run with --full"
+        )
+    return artifact
+
+
+def refresh_user_features(full: bool = False, feed: Callable[[], FeedAggregates] = scan_feed) -> int:
+    with engine.connect() as conn:
+        since = get_watermark(conn, USER_TABLE)
+        until = feed_watermark(conn)
+        reason = "requested" if full else _needs_full(conn, USER_TABLE, since)
+        existing = table_columns(conn, USER_TABLE)
+
+    if reason is None:
+        artifact = _latest_artifact(USER_TABLE)
+        start = rescan_since(since)
+        user_ids = changed_user_ids(start, until)
+        df = make_user_features(user_ids, artifact=artifact)
+        if list(df.columns) != existing:
+            reason = "columns changed"
+        else:
+            with engine.begin() as conn:
+                publish_delta(conn, df, USER_TABLE, 'user_id')
+                set_watermark(conn, USER_TABLE, until)
+            logger.info("%s: merged %d users with activity in (%s, %s]", USER_TABLE, len(df), start, until)
+            return len(df)
+
+    aggregates = feed()
+    artifact = get_lightfm_artifact(likes_loader=aggregates.likes)
+    df = make_user_features(artifact=artifact, aggregates=aggregates)
+    with engine.begin() as conn:
+        publish_full(conn, df, USER_TABLE, 'user_id')
+        set_watermark(conn, USER_TABLE, until)
+    logger.info("%s: rebuilt %d users (%s)", USER_TABLE, len(df), reason)
+    return len(df)
+
+
+def refresh_post_features(full: bool = False, feed: Callable[[], FeedAggregates] = scan_feed) -> int:
+    with engine.connect() as conn:
+        since = get_watermark(conn, POST_TABLE)
+        until = feed_watermark(conn)
+        reason = "requested" if full else _needs_full(conn, POST_TABLE, since)
+        if reason is None and not table_columns(conn, COUNTERS_TABLE):
+            reason = "counters missing"
+
+    if reason is None:
+        artifact = _latest_artifact(POST_TABLE)
+        with engine.begin() as conn:
+            conn.execute(text('SET LOCAL statement_timeout = 0'))
+            start = rescan_since(since)
+            counters = refresh_post_counters(conn, start, until)
+            df = make_post_features(artifact=artifact, aggregates=counters)
+            publish_full(conn, df, POST_TABLE, 'post_id')
+            set_watermark(conn, POST_TABLE, until)
+        logger.info("%s: rebuilt %d posts from counters [%s, %s]", POST_TABLE, len(df), start, until)
+        return len(df)
+
+    aggregates = feed()
+    artifact = get_lightfm_artifact(likes_loader=aggregates.likes)
+    df = make_post_features(artifact=artifact, aggregates=aggregates)
+    with engine.begin() as conn:
+        publish_full(conn, aggregates.post_daily_counts(), COUNTERS_TABLE, ['post_id', 'day'])
+        publish_full(conn, df, POST_TABLE, 'post_id')
+        set_watermark(conn, POST_TABLE, until)
+    logger.info("%s: rebuilt %d posts (%s)", POST_TABLE, len(df), reason)
+    return len(df)
+
+
+def main(full: bool = False):
+    # one pass over feed_data, shared by both tables
+    feed = lru_cache(maxsize=None)(scan_feed)
+    for name, refresh in ((USER_TABLE, refresh_user_features), (POST_TABLE, refresh_post_features)):
+        start = time.perf_counter()
+        rows = refresh(full, feed)
+        print(f"{name}: {rows} rows written in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Refresh the user and post feature tables.")
+    parser.add_argument('--full', action='store_true', help="rebuild the tables from full history")
+    main(parser.parse_args().full)
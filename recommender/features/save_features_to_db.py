@@ -5,27 +5,29 @@ This script generates user and post features using the corresponding
 feature engineering functions and saves them to a PostgreSQL database.
 
 Functions:
-- save_features_to_db(df, table_name): saves a DataFrame to a SQL table.
-- main(): generates features and writes them to 'user_features' and 'post_features' tables.
+- save_features_to_db(df, table_name, id_column): replaces a SQL table with a DataFrame
+  (COPY into a staging table, then an atomic rename swap).
+- main(full=False): refreshes the 'user_features' and 'post_features' tables, incrementally
+  unless `full` (see recommender.features.materialize).
 
 Run this script directly to update feature tables in the database.
 """
 
+import sys
+
 from app.db.database import engine
-from recommender.features.feature_engineering import make_user_features, make_post_features
+from recommender.features import materialize
+from recommender.features.materialize import publish_full
 
-def save_features_to_db(df, table_name):
-    df.to_sql(table_name, con=engine, schema="public", if_exists="replace", index=False)
+def save_features_to_db(df, table_name, id_column):
+    with engine.begin() as conn:
+        publish_full(conn, df, table_name, id_column)
     print(f"Features saved to table '{table_name}' ({len(df)} rows).")
 
 
 
-def main():
-    user_features = make_user_features()
-    post_features = make_post_features()
-
-    save_features_to_db(user_features, "user_features")
-    save_features_to_db(post_features, "post_features")
+def main(full=False):
+    materialize.main(full)
 
 if __name__ == "__main__":
-    main()
+    main(full='--full' in sys.argv[1:])
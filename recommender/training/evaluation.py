@@ -0,0 +1,70 @@
+"""
+Vectorized ranking metrics over per-user candidate lists.
+
+Rows are ordered once with `np.lexsort` (user, then score descending); user boundaries
+become segment starts, and every metric is a segment sum (`np.add.reduceat`) over
+that order, so all K values are evaluated in one pass without a Python loop per user.
+
+For each K and each user (ties in score keep the input order):
+
+- HitRate@K: 1 if any of the top K rows is relevant.
+- Precision@K: relevant rows in the top K / K.
+- NDCG@K: DCG of the top K / DCG of the ideal order (binary gains, log2 discount).
+- MAP@K: sum of precision@i at relevant ranks i <= K / min(relevant rows, K).
+
+Metrics are averaged over all users; users without relevant rows count as 0.
+
+Functions:
+
+- ranking_metrics(user_ids, y_true, y_score, ks=(5,)) -> dict: {'HitRate@5': ..., ...}
+- evaluate_model(model, X_test, y_test, ks=(5,)) -> dict: ranking metrics of
+  `model.predict_proba` on a test split indexed by user_id.
+"""
+
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def ranking_metrics(user_ids, y_true, y_score, ks: Sequence[int] = (5,)) -> dict:
+    user_ids = np.asarray(user_ids)
+    order = np.lexsort((-np.asarray(y_score, dtype=np.float64), user_ids))
+    users = user_ids[order]
+    relevant = (np.asarray(y_true)[order] > 0).astype(np.float64)
+
+    n = len(users)
+    if n == 0:
+        return {f'{name}@{k}': 0.0 for k in ks for name in ('HitRate', 'Precision', 'NDCG', 'MAP')}
+    starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    rank = np.arange(n) - np.repeat(starts, sizes)
+    # relevant rows at or above each row, within its user
+    hits_so_far = np.cumsum(relevant)
+    hits_so_far -= np.repeat(hits_so_far[starts] - relevant[starts], sizes)
+    n_relevant = np.add.reduceat(relevant, starts)
+    discount = 1 / np.log2(np.arange(2, max(ks) + 2))
+    ideal_dcg = np.r_[0.0, np.cumsum(discount)]
+
+    metrics = {}
+    for k in ks:
+        top = rank < k
+        hits = np.add.reduceat(relevant * top, starts)
+        dcg = np.add.reduceat(np.where(top, relevant * discount[np.minimum(rank, k - 1)], 0.0), starts)
+        idcg = ideal_dcg[np.minimum(n_relevant, k).astype(np.int64)]
+        precision_sum = np.add.reduceat(np.where(top, relevant * hits_so_far / (rank + 1), 0.0), starts)
+        has_relevant = n_relevant > 0
+        metrics[f'HitRate@{k}'] = float(np.mean(hits > 0))
+        metrics[f'Precision@{k}'] = float(np.mean(hits / k))
+        metrics[f'NDCG@{k}'] = float(np.mean(np.divide(dcg, idcg, out=np.zeros_like(dcg), where=has_relevant)))
+        metrics[f'MAP@{k}'] = float(np.mean(np.divide(
+            precision_sum, np.minimum(n_relevant, k), out=np.zeros_like(precision_sum), where=has_relevant
+        )))
+    return metrics
+
+
+def evaluate_model(model, X_test: pd.DataFrame, y_test: pd.Series, ks: Sequence[int] = (5,)) -> dict:
+    y_pred = model.predict_proba(X_test)[:, 1]
+    user_ids = X_test.index.get_level_values('user_id') if 'user_id' in X_test.index.names \
+        else X_test['user_id']
+    return ranking_metrics(np.asarray(user_ids), np.asarray(y_test), y_pred, ks)
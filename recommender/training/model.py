@@ -2,7 +2,10 @@ import gc
 import json
 from catboost import CatBoostClassifier, Pool
 
-from recommender.training.metrics import calculate_auc, calculate_hit_rate_by_user
+from recommender.training.evaluation import evaluate_model
+from recommender.training.metrics import calculate_auc
+
+EVAL_KS = (1, 5, 10)
 
 
 def train_and_save_model(train_df, cat_features):
@@ -45,14 +48,15 @@ def train_and_save_model(train_df, cat_features):
     model.fit(train_pool, eval_set=eval_pool)
 
     auc = calculate_auc(model, X_test, y_test)
-    hitrate = calculate_hit_rate_by_user(model, X_test, y_test, top_n=5)
+    ranking = evaluate_model(model, X_test, y_test, ks=EVAL_KS)
 
     print(f"Test AUC: {auc:.4f}")
-    print(f"Test HitRate@5: {hitrate:.4f}")
+    for name, value in ranking.items():
+        print(f"Test {name}: {value:.4f}")
 
     model.save_model("models/model.cbm", format="cbm")
 
     with open("models/metrics.json", 'w') as f:
-        json.dump({"AUC": auc, "HitRate@5": hitrate}, f, indent=4)
+        json.dump({"AUC": auc, **ranking}, f, indent=4)
 
     print("Model and metrics saved.")
@@ -1,9 +1,10 @@
 import pandas as pd
 
+from app.core.feature_schema import CATEGORICAL_FEATURES
 from recommender.features.build_train_dataset import load_train_dataset
 from recommender.training.model import train_and_save_model
 
 if __name__ == "__main__":
     df = load_train_dataset()
-    cat_features = ['topic', 'country', 'exp_group', 'age_group']
+    cat_features = list(CATEGORICAL_FEATURES)
     train_and_save_model(df, cat_features)
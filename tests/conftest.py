@@ -0,0 +1,99 @@
+"""
+Shared fixtures for the unit tests.
+
+The app modules build their DB engines at import time; the tests never connect, so
+the connection settings only need placeholder values.
+
+Fixtures:
+
+- frames: small user and post feature tables (user_id / post_id + numeric features).
+- model: CatBoost classifier trained on them, with user, post and time features
+  interleaved in its feature order.
+- serving: fills `app.core.state` like the startup event (the model saved to a file and
+  assigned to the 'control' and 'test' aliases, likes, most liked posts, post content,
+  the default experiments), restored after the test.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from catboost import CatBoostClassifier
+
+for _name, _value in (('POSTGRES_USER', 'test'), ('POSTGRES_PASSWORD', 'test'), ('POSTGRES_HOST', 'localhost'),
+                      ('POSTGRES_PORT', '5432'), ('POSTGRES_DATABASE', 'test')):
+    os.environ.setdefault(_name, _value)
+
+FEATURES = ['post_x', 'user_a', 'hour', 'post_y', 'weekday', 'user_b']
+
+
+@pytest.fixture(scope='session')
+def frames():
+    rng = np.random.default_rng(0)
+    users = pd.DataFrame({
+        'user_id': np.arange(1, 41),
+        'user_a': rng.standard_normal(40).astype(np.float32),
+        'user_b': rng.integers(0, 5, 40).astype(np.float32),
+    })
+    posts = pd.DataFrame({
+        'post_id': np.arange(100, 160),
+        'post_x': rng.standard_normal(60).astype(np.float32),
+        'post_y': rng.uniform(0, 3, 60).astype(np.float32),
+    })
+    return users, posts
+
+
+@pytest.fixture(scope='session')
+def model(frames):
+    users, posts = frames
+    rng = np.random.default_rng(1)
+    n = 2000
+    train = pd.DataFrame({
+        'post_x': rng.choice(posts['post_x'], n),
+        'user_a': rng.choice(users['user_a'], n),
+        'hour': rng.integers(0, 24, n),
+        'post_y': rng.choice(posts['post_y'], n),
+        'weekday': rng.integers(0, 7, n),
+        'user_b': rng.choice(users['user_b'], n),
+    })[FEATURES]
+    logit = train['post_x'] * train['user_a'] + 0.3 * train['post_y'] - 0.1 * train['user_b'] + 0.05 * train['hour']
+    target = (logit + rng.logistic(size=n) > 0).astype(int)
+    model = CatBoostClassifier(iterations=40, depth=4, random_seed=0, verbose=False, allow_writing_files=False)
+    return model.fit(train, target)
+
+
+@pytest.fixture
+def serving(monkeypatch, tmp_path, frames, model):
+    from app.core import state
+    from app.core.experiments import DEFAULT_CONFIG, ExperimentRouter
+    from app.core.likes_index import LikesIndex
+    from app.core.model_registry import ModelRegistry
+    from app.core.post_cache import PostCache
+    from app.core.user_store import UserFeatureStore
+    from app.main import build_engine
+    from benchmarks.fixtures import SamplePopularity, post_content
+
+    users, posts = frames
+    rng = np.random.default_rng(2)
+    likes = pd.DataFrame({
+        'user_id': rng.choice(users['user_id'], 300),
+        'post_id': rng.choice(posts['post_id'], 300),
+        'timestamp': pd.Timestamp('2021-12-01') + pd.to_timedelta(rng.integers(0, 30 * 24, 300), unit='h'),
+    }).drop_duplicates(['user_id', 'post_id'])
+
+    monkeypatch.setattr(state, 'user_store', UserFeatureStore.from_frame(users))
+    monkeypatch.setattr(state, 'posts_data', posts)
+    monkeypatch.setattr(state, 'likes_index', LikesIndex(likes))
+    monkeypatch.setattr(state, 'popularity', SamplePopularity(likes))
+    monkeypatch.setattr(state, 'post_cache', PostCache(post_content(posts)))
+    monkeypatch.setattr(state, 'rec_cache', None)
+    monkeypatch.setattr(state, 'retriever', None)
+    monkeypatch.setattr(state, 'impressions', None)
+    monkeypatch.setattr(state, 'experiments', ExperimentRouter.from_config(DEFAULT_CONFIG))
+    monkeypatch.setattr(state, 'models', ModelRegistry(build_engine))
+    model_path = tmp_path / 'model.cbm'
+    model.save_model(str(model_path))
+    for alias in ('control', 'test'):
+        state.models.assign(alias, str(model_path))
+    return state
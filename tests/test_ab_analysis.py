@@ -0,0 +1,81 @@
+"""
+A/B analysis tests: windowed hit detection and per-user aggregates must equal a
+brute-force merge of impressions and likes, for the impression log and legacy CSV.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from ab_test.analysis import HOUR, aggregate, analyze, window_hits
+
+START = 1_638_316_800  # 2021-12-01
+
+
+def events(seed=0, n_views=400, n_likes=1500):
+    rng = np.random.default_rng(seed)
+    views = pd.DataFrame({
+        'user_id': rng.integers(1, 60, n_views),
+        'timestamp': START + rng.integers(0, 3 * 24 * HOUR, n_views),
+        'post_ids': [rng.choice(40, 5, replace=False).tolist() for _ in range(n_views)],
+    })
+    views['exp_group'] = np.where(views['user_id'] % 2, 'test', 'control')
+    likes = pd.DataFrame({
+        'user_id': rng.integers(1, 45, n_likes),
+        'post_id': rng.integers(0, 40, n_likes),
+        'timestamp': START + rng.integers(0, 3 * 24 * HOUR + 2 * HOUR, n_likes),
+    })
+    # likes exactly at the view time and exactly at the end of the interval
+    first = views.iloc[0]
+    edge = pd.DataFrame({'user_id': [first['user_id']] * 2, 'post_id': first['post_ids'][:2],
+                         'timestamp': [first['timestamp'], first['timestamp'] + HOUR]})
+    return views, pd.concat([likes, edge], ignore_index=True)
+
+
+def brute_force_hits(views, likes, hit_seconds=HOUR):
+    flat = views.reset_index().rename(columns={'index': 'impression', 'timestamp': 'view_time'})
+    flat = flat.explode('post_ids').rename(columns={'post_ids': 'post_id'}).astype({'post_id': np.int64})
+    merged = flat.merge(likes, on=['user_id', 'post_id'])
+    merged = merged[(merged['timestamp'] >= merged['view_time'])
+                    & (merged['timestamp'] < merged['view_time'] + hit_seconds)]
+    hits = np.zeros(len(views), dtype=bool)
+    hits[merged['impression'].unique()] = True
+    return hits
+
+
+def test_window_hits_match_brute_force():
+    views, likes = events()
+    views_table = pa.Table.from_pandas(views, preserve_index=False)
+    likes_table = pa.Table.from_pandas(likes, preserve_index=False)
+    expected = brute_force_hits(views, likes)
+    assert expected.any() and not expected.all()
+    np.testing.assert_array_equal(window_hits(views_table, likes_table), expected)
+    assert window_hits(views_table, likes_table.slice(0, 0)).sum() == 0
+
+
+@pytest.mark.parametrize('legacy_csv', [False, True])
+def test_aggregate_matches_brute_force(tmp_path, legacy_csv):
+    views, likes = events(seed=1)
+    if legacy_csv:
+        views_path = tmp_path / 'views.csv'
+        views.assign(recommendations=['[' + ' '.join(map(str, ids)) + ']' for ids in views['post_ids']]) \
+            .drop(columns='post_ids').to_csv(views_path, index=False)
+    else:
+        views_path = tmp_path / 'impressions.parquet'
+        pq.write_table(pa.Table.from_pandas(views.assign(timestamp=pd.to_datetime(views['timestamp'], unit='s')),
+                                            preserve_index=False), views_path)
+    likes_path = tmp_path / 'likes.parquet'
+    pq.write_table(pa.Table.from_pandas(likes, preserve_index=False), likes_path)
+
+    totals, like_counts = aggregate(str(views_path), str(likes_path), window_seconds=5 * HOUR)
+    expected = views.assign(impressions=1, hits=brute_force_hits(views, likes).astype(np.int64)) \
+        .groupby(['user_id', 'exp_group'])[['impressions', 'hits']].sum()
+    pd.testing.assert_frame_equal(totals.sort_index(), expected, check_dtype=False, check_names=False)
+    assert like_counts.sort_index().to_dict() == likes['user_id'].value_counts().sort_index().to_dict()
+
+    report = analyze(str(views_path), str(likes_path), n_buckets=10)
+    assert all(0 <= report[key] <= 1 for key in ('p_srm', 'p_share', 'p_mw', 'p_hitrate'))
+    hitrate = expected.groupby(level='exp_group')['hits'].sum() / expected.groupby(level='exp_group')['impressions'].sum()
+    assert report['hitrate_test'] == pytest.approx(hitrate['test'], abs=0.1)
@@ -0,0 +1,60 @@
+"""
+Async request path tests: the endpoint scores in the scoring executor and loads post
+content through the async session, returning the ranked posts in order.
+"""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.recommend import router
+from app.core.executor import ScoringExecutor
+from app.core.recommender import get_recommend_ids
+from app.db.async_database import get_async_db
+from benchmarks.fixtures import SampleSession, post_content
+
+TIME = datetime(2021, 12, 20, 9)
+
+
+@pytest.fixture
+def client(serving):
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_async_db] = lambda: SampleSession(post_content(serving.posts_data))
+    return TestClient(app)
+
+
+def test_recommendations_in_ranked_order(serving, client):
+    response = client.get('/post/recommendations/', params={'user_id': 12, 'time': TIME.isoformat(), 'limit': 5})
+    assert response.status_code == 200
+    body = response.json()
+    engine = serving.models.engine(serving.experiments.assign(12).model)
+    expected = get_recommend_ids(12, TIME, engine, 5)
+    assert [post['id'] for post in body['recommendations']] == expected
+    assert body['recommendations'][0]['text'] == f"sample post {expected[0]}"
+    assert body['exp_group'] == serving.experiments.assign(12).arm
+
+
+def test_unknown_user_gets_most_liked(serving, client):
+    response = client.get('/post/recommendations/', params={'user_id': 10_000, 'time': TIME.isoformat()})
+    assert [post['id'] for post in response.json()['recommendations']] == serving.popularity.top(5)
+
+
+def test_executor_counts_runs_and_failures():
+    executor = ScoringExecutor(2)
+
+    async def main():
+        results = await asyncio.gather(*(executor.run(pow, i, 2) for i in range(5)))
+        with pytest.raises(ZeroDivisionError):
+            await executor.run(divmod, 1, 0)
+        return results
+
+    try:
+        assert asyncio.run(main()) == [0, 1, 4, 9, 16]
+    finally:
+        executor.shutdown()
+    stats = executor.stats()
+    assert (stats['submitted'], stats['completed'], stats['failed'], stats['in_flight']) == (6, 6, 1, 0)
@@ -0,0 +1,51 @@
+"""
+Batch recommendation tests: one stacked model call per group must return what the
+single-user path returns for each (user_id, time) pair.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.recommend import router
+from app.core.recommender import get_recommend_ids, get_recommend_ids_batch
+
+PAIRS = [(user_id, datetime(2021, 12, 1) + timedelta(days=user_id % 20, hours=user_id))
+         for user_id in (1, 2, 3, 10, 25, 40, 999)]
+
+
+def test_batch_matches_single_requests(serving):
+    engine = serving.models.engine('test')
+    expected = [get_recommend_ids(user_id, time, engine, 5) for user_id, time in PAIRS]
+    assert get_recommend_ids_batch(PAIRS, engine, 5) == expected
+    assert expected[-1] == []
+
+
+def test_stacked_chunks_match_top_k(serving):
+    engine = serving.models.engine('test')
+    items = []
+    for user_id, time in PAIRS[:-1]:
+        vector = serving.user_store.get(user_id, engine.user_columns)
+        items.append((vector, time, engine.candidate_rows(serving.likes_index.liked_before(user_id, time))))
+    expected = [engine.top_k(vector, time, 7, rows) for vector, time, rows in items]
+    # max_rows below two users' candidates: one predict call per user
+    assert engine.top_k_many(items, 7, max_rows=engine.n_posts + 1) == expected
+    assert engine.top_k_many(items, 7) == expected
+
+
+def test_batch_endpoint(serving):
+    app = FastAPI()
+    app.include_router(router)
+    body = {'requests': [{'user_id': user_id, 'time': time.isoformat()} for user_id, time in PAIRS], 'limit': 3}
+    response = TestClient(app).post('/post/recommendations/batch', json=body)
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert [r['user_id'] for r in results] == [user_id for user_id, _ in PAIRS]
+    for result, (user_id, time) in zip(results, PAIRS):
+        engine = serving.models.engine(serving.experiments.assign(user_id).model)
+        expected = get_recommend_ids(user_id, time, engine, 3) or serving.popularity.top(3)
+        assert result['post_ids'] == expected
+        assert result['exp_group'] in ('control', 'test')
+    assert not np.isin(results[0]['post_ids'], serving.likes_index.liked_before(*PAIRS[0])).any()
@@ -0,0 +1,88 @@
+"""
+Training feed dedup tests: streaming the feed chunk by chunk must keep exactly the rows
+the whole-window pandas dedup keeps, i.e. the first like of a liked pair, else the
+first view of the pair.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('lightfm')
+pytest.importorskip('sklearn')
+
+from recommender.features.build_train_dataset import _dedup_chunk, _isin_sorted, _pair_keys
+
+
+@pytest.fixture(scope='module')
+def feed():
+    rng = np.random.default_rng(0)
+    n = 5000
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp('2021-10-01') + pd.to_timedelta(np.sort(rng.integers(0, 86400 * 30, n)), unit='s'),
+        'post_id': rng.integers(1, 30, n),
+        'user_id': rng.integers(1, 60, n),
+        'target': (rng.random(n) < 0.15).astype(np.int64),
+    })
+
+
+def reference_dedup(feed: pd.DataFrame) -> pd.DataFrame:
+    liked = feed.groupby(['user_id', 'post_id'])['target'].transform('max') == 1
+    kept = feed[~liked | (feed['target'] == 1)]
+    return kept.drop_duplicates(['user_id', 'post_id'], keep='first')
+
+
+def test_isin_sorted():
+    sorted_keys = np.array([2, 5, 9], dtype=np.int64)
+    keys = np.array([0, 2, 3, 5, 9, 10], dtype=np.int64)
+    assert _isin_sorted(keys, sorted_keys).tolist() == np.isin(keys, sorted_keys).tolist()
+    assert not _isin_sorted(keys, np.empty(0, dtype=np.int64)).any()
+    assert _pair_keys([1], [7])[0] == (1 << 32) + 7
+
+
+@pytest.mark.parametrize('chunk_size', [len, 333, 1])
+def test_chunked_dedup_equals_whole_window(feed, chunk_size):
+    size = chunk_size(feed) if callable(chunk_size) else chunk_size
+    positives = np.unique(_pair_keys(*feed.loc[feed['target'] == 1, ['user_id', 'post_id']].to_numpy().T))
+    seen = np.empty(0, dtype=np.int64)
+    parts = []
+    for start in range(0, len(feed), size):
+        part, seen = _dedup_chunk(feed.iloc[start:start + size].reset_index(drop=True), positives, seen)
+        parts.append(part)
+    result = pd.concat(parts, ignore_index=True)
+
+    pd.testing.assert_frame_equal(result, reference_dedup(feed).reset_index(drop=True))
+    assert len(seen) == len(result)
+
+
+def test_iter_feed_data_reads_the_window_once(monkeypatch, feed):
+    from contextlib import contextmanager
+
+    from recommender.features import build_train_dataset
+
+    queries = []
+
+    class FakeEngine:
+        @contextmanager
+        def _connection(self):
+            yield None
+
+        def connect(self):
+            return self
+
+        def execution_options(self, **options):
+            return self._connection()
+
+    def read_sql(query, conn, params=None, chunksize=None):
+        queries.append(query)
+        window = feed[feed['post_id'].isin(params['post_ids'])].head(params['limit'])
+        return (window.iloc[start:start + chunksize] for start in range(0, len(window), chunksize))
+
+    monkeypatch.setattr(build_train_dataset, 'engine', FakeEngine())
+    monkeypatch.setattr(build_train_dataset.pd, 'read_sql', read_sql)
+    result = build_train_dataset.load_feed_data(list(range(1, 20)), limit=4000, chunk_size=700)
+
+    assert queries == [build_train_dataset.FEED_WINDOW_QUERY]
+    assert 'ORDER BY timestamp, user_id, post_id' in queries[0]
+    window = feed[feed['post_id'] < 20].head(4000)
+    pd.testing.assert_frame_equal(result, reference_dedup(window).reset_index(drop=True))
@@ -0,0 +1,79 @@
+"""
+Categorical scoring tests: a model with categorical user and post features scored
+from the pre-encoded FeaturesData blocks must match `predict_proba` on a DataFrame.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from catboost import CatBoostClassifier
+
+from app.core.feature_schema import apply_schema
+from app.core.scoring import ScoringEngine, encode_categories
+from app.core.user_store import UserFeatureStore
+
+FEATURES = ['topic', 'user_a', 'hour', 'country', 'post_x', 'weekday']
+TIME = datetime(2021, 12, 5, 21)
+
+
+@pytest.fixture(scope='module')
+def categorical():
+    rng = np.random.default_rng(4)
+    users = apply_schema(pd.DataFrame({
+        'user_id': np.arange(1, 21),
+        'user_a': rng.standard_normal(20),
+        'country': rng.choice(['Russia', 'Belarus', 'Ukraine'], 20),
+    }))
+    posts = apply_schema(pd.DataFrame({
+        'post_id': np.arange(1, 31),
+        'post_x': rng.standard_normal(30),
+        'topic': rng.choice(['covid', 'sport', 'tech', 'movie'], 30),
+    }))
+    n = 1500
+    train = pd.DataFrame({
+        'topic': rng.choice(posts['topic'].astype(str), n),
+        'user_a': rng.choice(users['user_a'], n),
+        'hour': rng.integers(0, 24, n),
+        'country': rng.choice(users['country'].astype(str), n),
+        'post_x': rng.choice(posts['post_x'], n),
+        'weekday': rng.integers(0, 7, n),
+    })
+    signal = (train['topic'] == 'sport') * 1.5 + (train['country'] == 'Russia') - train['post_x'] * train['user_a']
+    target = (signal + rng.logistic(size=n) > 0.5).astype(int)
+    model = CatBoostClassifier(iterations=30, depth=4, random_seed=0, verbose=False, allow_writing_files=False,
+                               cat_features=['topic', 'country'])
+    return users, posts, model.fit(train, target)
+
+
+def test_matches_dataframe_predict(categorical):
+    users, posts, model = categorical
+    store = UserFeatureStore.from_frame(users)
+    engine = ScoringEngine(model, posts, store.columns, user_categories=store.categories)
+    assert engine.cat_features == ['topic', 'country']
+
+    for user_id in (1, 8, 20):
+        user = users[users['user_id'] == user_id].iloc[0]
+        df = posts.assign(user_a=user['user_a'], country=str(user['country']), hour=TIME.hour,
+                          weekday=TIME.weekday())
+        df['topic'] = df['topic'].astype(str)
+        expected = model.predict_proba(df[FEATURES])[:, 1]
+        _, scores = engine.score(store.get(user_id, engine.user_columns), TIME)
+        np.testing.assert_array_equal(scores, expected)
+
+        rows = np.arange(0, len(posts), 2)
+        _, subset = engine.score(store.get(user_id, engine.user_columns), TIME, rows)
+        np.testing.assert_array_equal(subset, expected[rows])
+
+
+def test_missing_user_categories(categorical):
+    users, posts, model = categorical
+    store = UserFeatureStore.from_frame(users)
+    with pytest.raises(ValueError):
+        ScoringEngine(model, posts, store.columns)
+
+
+def test_encode_categories():
+    encoded = encode_categories(pd.Series(['b', None, 'a', 'b']))
+    assert encoded.tolist() == [b'b', b'', b'a', b'b']
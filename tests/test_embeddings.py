@@ -0,0 +1,71 @@
+"""
+LightFM artifact tests: one training serves both user and post embeddings, is reused
+from memory and from the disk cache, and is retrained only when the likes change.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('lightfm')
+
+from recommender.features import embeddings  # noqa: E402
+from recommender.features.embeddings import (  # noqa: E402
+    artifact_key, get_lightfm_artifact, latest_lightfm_artifact,
+)
+
+PARAMS = {'loss': 'warp', 'no_components': 4, 'epochs': 2, 'random_state': 42}
+
+
+class CountingLikes:
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        self.likes = pd.DataFrame({'user_id': rng.integers(1, 50, 500), 'post_id': rng.integers(100, 140, 500)})
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.likes
+
+
+@pytest.fixture(autouse=True)
+def fresh_artifacts(monkeypatch):
+    monkeypatch.setattr(embeddings, '_artifacts', {})
+    monkeypatch.setattr(embeddings, 'relation_version', lambda table: 'v1')
+
+
+def test_trained_once_for_users_and_posts(tmp_path):
+    loader = CountingLikes()
+    artifact = get_lightfm_artifact(tmp_path, PARAMS, 1, loader)
+    assert get_lightfm_artifact(tmp_path, PARAMS, 1, loader) is artifact
+    assert loader.calls == 1
+
+    users, posts = artifact.user_frame(), artifact.post_frame()
+    assert sorted(users['user_id']) == sorted(loader.likes['user_id'].unique())
+    assert sorted(posts['post_id']) == sorted(loader.likes['post_id'].unique())
+    user_map, _, post_map, _ = artifact.dataset.mapping()
+    _, user_vectors = artifact.model.get_user_representations()
+    row = users[users['user_id'] == 7].iloc[0]
+    np.testing.assert_array_equal(row[[f'user_emb_{i}' for i in range(4)]].to_numpy(dtype=np.float32),
+                                  user_vectors[user_map[7]])
+
+
+def test_disk_cache_and_retrain_on_new_likes(tmp_path, monkeypatch):
+    loader = CountingLikes()
+    trained = get_lightfm_artifact(tmp_path, PARAMS, 1, loader)
+    monkeypatch.setattr(embeddings, '_artifacts', {})
+    loaded = get_lightfm_artifact(tmp_path, PARAMS, 1, loader)
+    assert loader.calls == 1
+    np.testing.assert_array_equal(loaded.post_embeddings, trained.post_embeddings)
+    assert latest_lightfm_artifact(tmp_path).manifest['key'] == artifact_key('v1', PARAMS)
+
+    monkeypatch.setattr(embeddings, 'relation_version', lambda table: 'v2')
+    get_lightfm_artifact(tmp_path, PARAMS, 1, loader)
+    assert loader.calls == 2
+    assert [p.name for p in tmp_path.glob('lightfm-*')] == [f"lightfm-{artifact_key('v2', PARAMS)}"]
+
+
+def test_latest_without_cache(tmp_path):
+    assert latest_lightfm_artifact('') is None
+    assert latest_lightfm_artifact(tmp_path) is None
+    assert artifact_key('v1', PARAMS) != artifact_key('v1', {**PARAMS, 'epochs': 3})
@@ -0,0 +1,71 @@
+"""
+Ranking metric tests: the vectorized segment sums must equal a brute-force loop over
+users that sorts each user's rows by score (stable, so ties keep the input order).
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommender.training.evaluation import evaluate_model, ranking_metrics
+
+KS = (1, 3, 5, 10)
+
+
+def brute_force(user_ids, y_true, y_score, ks):
+    per_user = {f'{name}@{k}': [] for k in ks for name in ('HitRate', 'Precision', 'NDCG', 'MAP')}
+    for user in np.unique(user_ids):
+        rows = np.flatnonzero(user_ids == user)
+        ranked = y_true[rows[np.argsort(-y_score[rows], kind='stable')]] > 0
+        n_relevant = ranked.sum()
+        for k in ks:
+            top = ranked[:k]
+            dcg = sum(1 / np.log2(i + 2) for i, hit in enumerate(top) if hit)
+            idcg = sum(1 / np.log2(i + 2) for i in range(min(n_relevant, k)))
+            ap = sum(top[:i + 1].sum() / (i + 1) for i, hit in enumerate(top) if hit)
+            per_user[f'HitRate@{k}'].append(float(top.any()))
+            per_user[f'Precision@{k}'].append(top.sum() / k)
+            per_user[f'NDCG@{k}'].append(dcg / idcg if n_relevant else 0.0)
+            per_user[f'MAP@{k}'].append(ap / min(n_relevant, k) if n_relevant else 0.0)
+    return {name: float(np.mean(values)) for name, values in per_user.items()}
+
+
+def test_ranking_metrics_match_brute_force():
+    rng = np.random.default_rng(0)
+    n = 3000
+    user_ids = rng.integers(0, 200, n)
+    y_true = (rng.random(n) < 0.2).astype(np.int64)
+    # a coarse score grid gives plenty of ties
+    y_score = rng.integers(0, 8, n) / 8
+
+    result = ranking_metrics(user_ids, y_true, y_score, KS)
+    expected = brute_force(user_ids, y_true, y_score, KS)
+    assert result.keys() == expected.keys()
+    for name, value in expected.items():
+        assert result[name] == pytest.approx(value), name
+
+
+def test_ranking_metrics_small_cases():
+    assert ranking_metrics([1, 1, 2, 2], [0, 1, 0, 0], [0.9, 0.1, 0.5, 0.4], ks=(1, 2)) == {
+        'HitRate@1': 0.0, 'Precision@1': 0.0, 'NDCG@1': 0.0, 'MAP@1': 0.0,
+        'HitRate@2': 0.5, 'Precision@2': 0.25, 'NDCG@2': pytest.approx(0.5 / np.log2(3)), 'MAP@2': 0.25,
+    }
+    assert ranking_metrics([], [], [], ks=(5,))['HitRate@5'] == 0.0
+
+
+class FixedModel:
+    def __init__(self, scores):
+        self.scores = np.asarray(scores)
+
+    def predict_proba(self, X):
+        return np.column_stack([1 - self.scores, self.scores])
+
+
+def test_evaluate_model_reads_user_id_from_index_or_column():
+    scores = [0.2, 0.8, 0.6, 0.1]
+    y_test = pd.Series([1, 0, 1, 0])
+    X = pd.DataFrame({'user_id': [1, 1, 2, 2], 'x': 0.0})
+    expected = ranking_metrics([1, 1, 2, 2], y_test, scores, ks=(1,))
+    assert evaluate_model(FixedModel(scores), X, y_test, ks=(1,)) == expected
+    assert evaluate_model(FixedModel(scores), X.set_index('user_id'), y_test, ks=(1,)) == expected
+    assert expected['HitRate@1'] == 0.5
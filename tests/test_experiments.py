@@ -0,0 +1,77 @@
+"""
+Experiment router tests: SplitMix64 bucketing against a scalar reference, arm shares
+following the weights, layer and traffic rules, and the startup model check.
+"""
+
+import numpy as np
+import pytest
+
+from app.core.experiments import (
+    DEFAULT_CONFIG, N_BUCKETS, ExperimentRouter, _splitmix64, bucket, salt_key,
+)
+
+MASK = (1 << 64) - 1
+
+
+def splitmix64(x):
+    x = (x + 0x9E3779B97F4A7C15) & MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK
+    return x ^ (x >> 31)
+
+
+def test_splitmix64_reference():
+    # first output of the reference SplitMix64 generator seeded with 0
+    assert int(_splitmix64(np.array([0], dtype=np.uint64))[0]) == 0xE220A8397B1DCDAF
+    user_ids = [0, 1, 200, 163_205, 2**40 + 7]
+    key = int(salt_key('experiment_1'))
+    expected = [splitmix64(uid ^ key) % N_BUCKETS for uid in user_ids]
+    assert bucket(user_ids, 'experiment_1').tolist() == expected
+    assert bucket(user_ids, 'experiment_2').tolist() != expected
+
+
+def config(*experiments, default_model='control'):
+    return {'default_model': default_model, 'experiments': list(experiments)}
+
+
+def test_arm_shares_follow_weights():
+    router = ExperimentRouter.from_config(config({
+        'name': 'e', 'arms': [{'name': 'a', 'weight': 1, 'model': 'control'},
+                              {'name': 'b', 'weight': 3, 'model': 'test'}],
+    }))
+    arms = np.array([a.arm for a in router.assign_many(range(100_000))])
+    assert abs((arms == 'b').mean() - 0.75) < 0.01
+    assert [router.assign(uid) for uid in (5, 77, 12345)] == router.assign_many([5, 77, 12345])
+
+
+def test_traffic_and_layers():
+    router = ExperimentRouter.from_config(config(
+        {'name': 'first', 'layer': 'l1', 'traffic': 0.3,
+         'arms': [{'name': 'x', 'weight': 1, 'model': 'test'}]},
+        {'name': 'second', 'layer': 'l1', 'offset': 0.3, 'traffic': 0.2,
+         'arms': [{'name': 'y', 'weight': 1, 'model': 'canary'}]},
+    ))
+    assignments = router.assign_many(range(50_000))
+    shares = {name: np.mean([a.experiment == name for a in assignments]) for name in ('first', 'second', None)}
+    assert abs(shares['first'] - 0.3) < 0.01
+    assert abs(shares['second'] - 0.2) < 0.01
+    assert all(a.model == 'control' and a.arm == 'control' for a in assignments if a.experiment is None)
+
+    with pytest.raises(ValueError):
+        ExperimentRouter.from_config(config(
+            {'name': 'a', 'traffic': 0.6, 'arms': [{'name': 'x', 'weight': 1}]},
+            {'name': 'b', 'offset': 0.5, 'traffic': 0.5, 'arms': [{'name': 'y', 'weight': 1}]},
+        ))
+
+
+def test_check_models():
+    router = ExperimentRouter.from_config(DEFAULT_CONFIG)
+    router.check_models(['control', 'test'])
+    with pytest.raises(ValueError, match='test'):
+        router.check_models(['control'])
+    canary = ExperimentRouter.from_config(config(
+        {'name': 'e', 'arms': [{'name': 'c', 'weight': 1, 'model': 'canary', 'model_path': 'models/c.cbm'}]},
+    ))
+    assert canary.model_paths() == {'canary': 'models/c.cbm'}
+    with pytest.raises(ValueError, match='canary'):
+        canary.check_models(['control', 'test'])
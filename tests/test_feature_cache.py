@@ -0,0 +1,54 @@
+"""
+Parquet feature cache tests: the table is read from SQL once per change marker and
+schema version, and always when the marker cannot be read.
+"""
+
+import pandas as pd
+import pandas.testing as tm
+from sqlalchemy import create_engine
+
+from app.core import feature_cache
+from app.core.feature_schema import SCHEMA_VERSION
+
+POSTS = pd.DataFrame({'post_id': [1, 2, 3], 'topic': ['covid', 'sport', 'covid'], 'like_rank': [3.0, 1.0, 2.0]})
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, name):
+        self.calls += 1
+        return POSTS.copy()
+
+
+def test_cached_per_version(monkeypatch, tmp_path):
+    loader = CountingLoader()
+    monkeypatch.setattr(feature_cache, 'load_features', loader)
+    first = feature_cache.load_features_cached('posts', version='abc', cache_dir=tmp_path)
+    second = feature_cache.load_features_cached('posts', version='abc', cache_dir=tmp_path)
+    assert loader.calls == 1
+    tm.assert_frame_equal(first, second)
+    assert [p.name for p in tmp_path.glob('*.parquet')] == [f'posts-abc-s{SCHEMA_VERSION}.parquet']
+
+    feature_cache.load_features_cached('posts', version='def', cache_dir=tmp_path)
+    assert loader.calls == 2
+    assert [p.name for p in tmp_path.glob('*.parquet')] == [f'posts-def-s{SCHEMA_VERSION}.parquet']
+
+
+def test_unknown_marker_always_loads(monkeypatch, tmp_path):
+    loader = CountingLoader()
+    monkeypatch.setattr(feature_cache, 'load_features', loader)
+    monkeypatch.setattr(feature_cache, 'table_version', lambda name: None)
+    feature_cache.load_features_cached('posts', cache_dir=tmp_path)
+    feature_cache.load_features_cached('posts', cache_dir=tmp_path)
+    assert loader.calls == 2
+    assert not list(tmp_path.iterdir())
+
+
+def test_versions(monkeypatch):
+    assert feature_cache.typed_version('abc') == f'abc-s{SCHEMA_VERSION}'
+    assert feature_cache.typed_version(None) is None
+    # no pg_class / pg_stat_user_tables: the marker is unknown, not an error
+    monkeypatch.setattr(feature_cache, 'engine', create_engine('sqlite://'))
+    assert feature_cache.relation_version('public.feed_data') is None
@@ -0,0 +1,43 @@
+"""
+Feature schema tests: every column gets its compact dtype, values are kept, and the
+typed tables score exactly like the frames `pd.read_sql` returns.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.core.feature_schema import apply_schema, frame_nbytes
+from app.core.scoring import ScoringEngine
+
+RAW = pd.DataFrame({
+    'user_id': np.array([1, 2, 3], dtype=np.int64),
+    'exp_group': np.array([0, 4, 2], dtype=np.int64),
+    'country_Russia': np.array([1, 0, 1], dtype=np.int64),
+    'views': np.array([10, 70_000, 3], dtype=np.int64),
+    'active': [True, False, True],
+    'user_emb_0': [0.5, -1.25, 3.0],
+    'city': ['Moscow', 'Minsk', 'Moscow'],
+})
+
+
+def test_dtypes():
+    typed = apply_schema(RAW)
+    assert typed.dtypes.astype(str).to_dict() == {
+        'user_id': 'int32', 'exp_group': 'category', 'country_Russia': 'int8', 'views': 'int32',
+        'active': 'int8', 'user_emb_0': 'float32', 'city': 'category',
+    }
+    assert typed['views'].tolist() == [10, 70_000, 3]
+    assert typed['city'].tolist() == RAW['city'].tolist()
+    assert frame_nbytes(typed) < frame_nbytes(RAW)
+
+
+def test_typed_frames_score_the_same(model, frames):
+    users, posts = frames
+    raw = posts.astype({'post_x': np.float64, 'post_y': np.float64, 'post_id': np.int64})
+    vector = users.loc[0, ['user_a', 'user_b']].to_numpy(dtype=np.float32)
+    time = datetime(2021, 12, 1, 18)
+    _, expected = ScoringEngine(model, raw, ['user_a', 'user_b']).score(vector, time)
+    _, typed = ScoringEngine(model, apply_schema(raw), ['user_a', 'user_b']).score(vector, time)
+    np.testing.assert_array_equal(typed, expected)
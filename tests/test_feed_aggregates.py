@@ -0,0 +1,81 @@
+"""
+Single-pass feed aggregation tests: every accumulator, fed chunks in any order, must
+equal a pandas reference written like the SQL queries it replaces.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommender.features.feed_aggregates import TOPICS, FeedAggregates
+
+POST_TOPICS = pd.Series(['movie', 'covid', 'sport', 'tech', 'business', 'politics', 'entertainment'] * 6,
+                        index=np.arange(1, 43))
+
+
+@pytest.fixture(scope='module')
+def feed():
+    rng = np.random.default_rng(0)
+    n = 8000
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp('2021-10-01') + pd.to_timedelta(rng.integers(0, 20 * 86400, n), unit='s'),
+        'user_id': rng.integers(1, 150, n),
+        'post_id': rng.integers(1, 43, n),
+        'action': np.where(rng.random(n) < 0.8, 'view', 'like'),
+        'target': rng.integers(0, 2, n),
+    })
+
+
+@pytest.fixture(scope='module')
+def aggregates(feed):
+    aggregates = FeedAggregates(POST_TOPICS)
+    shuffled = feed.sample(frac=1, random_state=1)
+    for start in range(0, len(shuffled), 700):
+        aggregates.update(shuffled.iloc[start:start + 700])
+    return aggregates
+
+
+def views_of(feed):
+    return feed[feed['action'] == 'view']
+
+
+def test_user_activity(feed, aggregates):
+    views = views_of(feed)
+    per_user = views.groupby('user_id').agg(views=('target', 'count'), first=('timestamp', 'min'),
+                                            last=('timestamp', 'max'))
+    days = (per_user['last'].dt.normalize() - per_user['first'].dt.normalize()).dt.days
+    expected = (per_user['views'] // days.replace(0, np.nan)).rename('views_day')
+    result = aggregates.user_activity().set_index('user_id')['views_day']
+    pd.testing.assert_series_equal(result.sort_index(), expected.sort_index(), check_names=False, check_dtype=False)
+
+
+def test_user_topic_preferences(feed, aggregates):
+    views = views_of(feed).assign(topic=lambda df: df['post_id'].map(POST_TOPICS))
+    result = aggregates.user_topic_preferences().set_index('user_id').sort_index()
+    for user_id, user_views in views.groupby('user_id'):
+        for topic in TOPICS:
+            of_topic = user_views[user_views['topic'] == topic]
+            expected = of_topic['target'].sum() / len(of_topic) if len(of_topic) else np.nan
+            assert result.loc[user_id, f'{topic}_likes_rate'] == pytest.approx(expected, nan_ok=True)
+        movie_share = (user_views['topic'] == 'movie').sum() / len(user_views)
+        assert result.loc[user_id, 'movie_views_rate'] == pytest.approx(movie_share)
+
+
+def test_posts(feed, aggregates):
+    views = views_of(feed)
+    per_post = views.groupby('post_id').agg(views=('target', 'size'), likes=('target', 'sum'))
+    threshold = int(per_post['views'].median())
+    assert aggregates.popular_post_ids(threshold) == per_post.index[per_post['views'] > threshold].tolist()
+    rating = aggregates.post_rating().set_index('post_id')['likes_rating']
+    expected = per_post['likes'].rank(method='dense', ascending=False).astype(np.int64)
+    pd.testing.assert_series_equal(rating, expected, check_names=False)
+
+    daily = aggregates.post_daily_counts()
+    assert daily.groupby('post_id')[['views', 'likes']].sum().equals(per_post)
+    assert (daily['day'] == daily['day'].dt.normalize()).all()
+
+
+def test_likes(feed, aggregates):
+    likes = aggregates.likes()
+    expected = feed.loc[feed['target'] == 1, ['post_id', 'user_id']]
+    assert sorted(map(tuple, likes.to_numpy())) == sorted(map(tuple, expected.to_numpy()))
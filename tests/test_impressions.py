@@ -0,0 +1,62 @@
+"""
+Impression log tests: queued events are written as typed Parquet files that read back
+as one dataset, a full queue drops events instead of blocking, and the endpoint logs
+what it served.
+"""
+
+from datetime import datetime
+
+import pandas as pd
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.recommend import router
+from app.core.impressions import ImpressionLogger, read_impressions
+from app.db.async_database import get_async_db
+from benchmarks.fixtures import SampleSession, post_content
+
+TIME = datetime(2021, 12, 15, 8, 30)
+
+
+def test_flush_round_trip(tmp_path):
+    logger = ImpressionLogger(tmp_path)
+    logger.log(1, 'experiment_1', 'test', 'abc', [5, 6, 7], TIME, 3.5)
+    logger.log(2, None, 'control', 'def', [], TIME, 1.25)
+    assert logger.flush() == 2
+    logger.log(3, 'experiment_1', 'control', 'def', [9], TIME, 2.0)
+    assert logger.flush() == 1
+    assert logger.flush() == 0
+
+    files = sorted(tmp_path.glob('date=*/impressions-*.parquet'))
+    assert len(files) == 2
+    df = read_impressions(tmp_path).sort_values('user_id').reset_index(drop=True)
+    assert df['user_id'].tolist() == [1, 2, 3]
+    assert [list(ids) for ids in df['post_ids']] == [[5, 6, 7], [], [9]]
+    assert df['experiment'][0] == 'experiment_1' and pd.isna(df['experiment'][1])
+    assert (df['timestamp'] == pd.Timestamp(TIME)).all()
+    assert str(df['latency_ms'].dtype) == 'float32'
+    assert logger.stats() == {'queued': 0, 'logged': 3, 'dropped': 0, 'written': 3, 'files': 2}
+
+
+def test_full_queue_drops(tmp_path):
+    logger = ImpressionLogger(tmp_path, max_queue=2)
+    for user_id in range(5):
+        logger.log(user_id, None, 'control', 'abc', [1], TIME, 1.0)
+    assert logger.stats()['dropped'] == 3
+    assert logger.flush() == 2
+
+
+def test_endpoint_logs_served_posts(serving, monkeypatch, tmp_path):
+    logger = ImpressionLogger(tmp_path / 'impressions')
+    monkeypatch.setattr(serving, 'impressions', logger)
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_async_db] = lambda: SampleSession(post_content(serving.posts_data))
+    body = TestClient(app).get('/post/recommendations/', params={'user_id': 6, 'time': TIME.isoformat()}).json()
+    logger.flush()
+
+    row = read_impressions(tmp_path / 'impressions').iloc[0]
+    assignment = serving.experiments.assign(6)
+    assert list(row['post_ids']) == [post['id'] for post in body['recommendations']]
+    assert (row['user_id'], row['experiment'], row['exp_group']) == (6, assignment.experiment, assignment.arm)
+    assert row['model_version'] == serving.models.engine(assignment.model).version
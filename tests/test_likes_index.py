@@ -0,0 +1,97 @@
+"""
+LikesIndex tests: "liked before" lookups against a brute-force filter of the likes
+table, across the CSR base block, the delta block and their compaction, with the
+overlapping refresh window picking up late likes exactly once.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core import likes_index as likes_module
+from app.core.likes_index import LikesIndex
+from app.core.refresh_window import RefreshWindow
+
+START = datetime(2021, 12, 1)
+
+
+def random_likes(n, seed, start=START):
+    rng = np.random.default_rng(seed)
+    likes = pd.DataFrame({
+        'user_id': rng.integers(1, 30, n),
+        'post_id': rng.integers(1, 500, n),
+        'timestamp': [start + timedelta(minutes=int(m)) for m in rng.integers(0, 60 * 24, n)],
+    })
+    return likes.drop_duplicates(['user_id', 'post_id']).reset_index(drop=True)
+
+
+def brute_force(likes, user_id, time):
+    liked = likes[(likes['user_id'] == user_id) & (likes['timestamp'] < time)]
+    return sorted(liked['post_id'].tolist())
+
+
+def assert_matches(index, likes):
+    for user_id in (1, 5, 17, 29, 99):
+        for time in (START, START + timedelta(hours=6), START + timedelta(days=3)):
+            assert sorted(index.liked_before(user_id, time).tolist()) == brute_force(likes, user_id, time)
+
+
+class FakeFeed:
+    """Answers `load_likes(since)` from a growing likes table."""
+
+    def __init__(self, likes):
+        self.likes = likes
+        self.reads = []
+
+    def __call__(self, since):
+        self.reads.append(since)
+        return self.likes[self.likes['timestamp'] >= since].reset_index(drop=True)
+
+
+def test_lookup_matches_brute_force():
+    likes = random_likes(2000, seed=0)
+    assert_matches(LikesIndex(likes), likes)
+
+
+@pytest.mark.parametrize('compact_rows', [10_000, 50])
+def test_refresh_merges_delta_and_late_likes(monkeypatch, compact_rows):
+    likes = random_likes(1000, seed=1)
+    index = LikesIndex(likes, compact_rows=compact_rows)
+    changed = []
+    index.subscribe(lambda user_ids: changed.append(set(user_ids.tolist())))
+
+    newest = likes['timestamp'].max()
+    new = random_likes(300, seed=2, start=newest + timedelta(minutes=1))
+    feed = FakeFeed(pd.concat([likes, new]).drop_duplicates(['user_id', 'post_id']))
+    monkeypatch.setattr(likes_module, 'load_likes', feed)
+
+    assert index.refresh() == len(feed.likes) - len(likes)
+    assert feed.reads[-1] == newest - index.window.overlap
+    # past compact_rows the delta is merged into the base block
+    assert len(index._blocks[1]) == (0 if compact_rows == 50 else len(feed.likes) - len(likes))
+
+    # committed late: timestamped just below the newest like already loaded
+    newest = feed.likes['timestamp'].max()
+    late = pd.DataFrame({'user_id': [1000], 'post_id': [7], 'timestamp': [newest - timedelta(minutes=1)]})
+    feed.likes = pd.concat([feed.likes, late], ignore_index=True)
+    assert index.refresh() == 1
+    assert index.refresh() == 0
+    assert len(index) == len(feed.likes)
+    assert_matches(index, feed.likes)
+    assert changed[-1] == {1000}
+
+
+def test_refresh_window_overlap():
+    window = RefreshWindow(('user_id', 'post_id'), overlap_seconds=600)
+    first = pd.DataFrame({'user_id': [1, 2], 'post_id': [1, 2],
+                          'timestamp': [START, START + timedelta(minutes=30)]})
+    assert len(window.advance(first)) == 2
+    assert window.since == START + timedelta(minutes=20)
+
+    reread = pd.DataFrame({'user_id': [2, 3], 'post_id': [2, 3],
+                           'timestamp': [START + timedelta(minutes=30), START + timedelta(minutes=25)]})
+    assert window.advance(reread)[['user_id', 'post_id']].values.tolist() == [[3, 3]]
+    # the window never moves back
+    assert window.since == START + timedelta(minutes=20)
@@ -0,0 +1,157 @@
+"""
+Incremental materialization tests.
+
+The incremental post refresh recomputes the daily counters from the watermark's day
+on and ranks posts from the stored totals: that must equal ranking the whole feed.
+The refresh paths themselves run against recorded stand-ins for the database: an
+incremental run re-reads the overlap below its watermark, and must never scan the feed
+or retrain LightFM.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from recommender.features.feed_aggregates import FeedAggregates, PostCounters
+
+START = datetime(2021, 12, 1)
+
+
+def feed(n=6000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'timestamp': [START + timedelta(minutes=int(m)) for m in rng.integers(0, 6 * 24 * 60, n)],
+        'user_id': rng.integers(1, 80, n),
+        'post_id': rng.integers(1, 40, n),
+        'action': np.where(rng.random(n) < 0.85, 'view', 'like'),
+        'target': rng.integers(0, 2, n),
+    })
+
+
+def aggregate(rows):
+    aggregates = FeedAggregates(pd.Series('covid', index=np.arange(1, 40)))
+    for start in range(0, len(rows), 1000):
+        aggregates.update(rows.iloc[start:start + 1000])
+    return aggregates
+
+
+def test_counters_recomputed_from_watermark_day_match_full_ranking():
+    rows = feed()
+    watermark = START + timedelta(days=3, hours=7)
+    full_run = aggregate(rows[rows['timestamp'] <= watermark]).post_daily_counts()
+
+    # incremental run: days before the watermark's day are kept, the rest recomputed
+    day = pd.Timestamp(watermark).normalize()
+    kept = full_run[full_run['day'] < day]
+    recomputed = aggregate(rows[rows['timestamp'] >= day]).post_daily_counts()
+    stored = pd.concat([kept, recomputed])
+    counters = PostCounters(stored.groupby('post_id')[['views', 'likes']].sum().reset_index())
+
+    expected = aggregate(rows)
+    assert counters.popular_post_ids(100) == expected.popular_post_ids(100)
+    pd.testing.assert_frame_equal(counters.post_rating(), expected.post_rating(), check_dtype=False)
+
+
+def test_late_rows_within_overlap_are_counted():
+    from app.core.refresh_window import REFRESH_OVERLAP_SECONDS
+
+    rows = feed()
+    # the watermark sits just after midnight; a like of the previous evening commits late
+    watermark = START + timedelta(days=3, seconds=REFRESH_OVERLAP_SECONDS / 2)
+    late = pd.DataFrame({'timestamp': [watermark - timedelta(seconds=REFRESH_OVERLAP_SECONDS * 0.9)],
+                         'user_id': [1], 'post_id': [1], 'action': ['view'], 'target': [1]})
+    stored = aggregate(rows[rows['timestamp'] <= watermark]).post_daily_counts()
+
+    rows = pd.concat([rows, late], ignore_index=True)
+    day = (pd.Timestamp(watermark) - pd.Timedelta(seconds=REFRESH_OVERLAP_SECONDS)).normalize()
+    # the late row falls before the watermark's day, but inside the recomputed days
+    assert day <= late['timestamp'][0].normalize() < pd.Timestamp(watermark).normalize()
+    stored = pd.concat([stored[stored['day'] < day], aggregate(rows[rows['timestamp'] >= day]).post_daily_counts()])
+    counters = PostCounters(stored.groupby('post_id')[['views', 'likes']].sum().reset_index())
+    pd.testing.assert_frame_equal(counters.post_rating(), aggregate(rows).post_rating(), check_dtype=False)
+
+
+@pytest.fixture
+def materialize(monkeypatch):
+    pytest.importorskip('lightfm')
+    pytest.importorskip('sklearn')
+    from recommender.features import materialize
+
+    calls = []
+
+    class Conn:
+        def execute(self, *args, **kwargs):
+            calls.append(('execute', str(args[0])))
+
+    @contextmanager
+    def transaction():
+        yield Conn()
+
+    class Engine:
+        connect = begin = staticmethod(transaction)
+
+    watermarks = {materialize.POST_TABLE: START, materialize.USER_TABLE: START}
+    monkeypatch.setattr(materialize, 'engine', Engine())
+    monkeypatch.setattr(materialize, 'get_watermark', lambda conn, name: watermarks[name])
+    monkeypatch.setattr(materialize, 'feed_watermark', lambda conn: START + timedelta(hours=1))
+    monkeypatch.setattr(materialize, 'table_columns', lambda conn, table: ['post_id'])
+    monkeypatch.setattr(materialize, 'set_watermark', lambda conn, name, value: calls.append(('watermark', name)))
+    monkeypatch.setattr(materialize, 'publish_full',
+                        lambda conn, df, table, id_column: calls.append(('publish', table, id_column)))
+    monkeypatch.setattr(materialize, 'make_post_features',
+                        lambda artifact, aggregates: pd.DataFrame({'post_id': [1], 'artifact': [artifact]}))
+    monkeypatch.setattr(materialize, 'get_lightfm_artifact', lambda **kwargs: calls.append(('retrain',)))
+    monkeypatch.setattr(materialize, 'refresh_post_counters',
+                        lambda conn, since, until: calls.append(('counters', since, until)))
+    monkeypatch.setattr(materialize, 'changed_user_ids',
+                        lambda since, until: calls.append(('changed', since, until)) or [1, 2])
+    monkeypatch.setattr(materialize, 'make_user_features',
+                        lambda user_ids, artifact: pd.DataFrame({'post_id': user_ids}))
+    monkeypatch.setattr(materialize, 'publish_delta',
+                        lambda conn, df, table, id_column: calls.append(('delta', table, len(df))))
+    materialize.calls = calls
+    return materialize
+
+
+def no_feed_scan():
+    raise AssertionError("incremental run scanned feed_data")
+
+
+def test_incremental_posts_use_counters(materialize, monkeypatch):
+    monkeypatch.setattr(materialize, 'latest_lightfm_artifact', lambda: 'saved')
+    assert materialize.refresh_post_features(feed=no_feed_scan) == 1
+    kinds = [call[0] for call in materialize.calls if call[0] != 'execute']
+    assert kinds == ['counters', 'publish', 'watermark']
+    assert ('retrain',) not in materialize.calls
+
+
+def test_incremental_runs_rescan_the_overlap(materialize, monkeypatch):
+    monkeypatch.setattr(materialize, 'latest_lightfm_artifact', lambda: 'saved')
+    overlap_start = START - timedelta(seconds=materialize.REFRESH_OVERLAP_SECONDS)
+    until = START + timedelta(hours=1)
+    assert materialize.refresh_user_features(feed=no_feed_scan) == 2
+    assert materialize.refresh_post_features(feed=no_feed_scan) == 1
+    assert ('changed', overlap_start, until) in materialize.calls
+    assert ('counters', overlap_start, until) in materialize.calls
+    assert ('delta', materialize.USER_TABLE, 2) in materialize.calls
+
+
+def test_incremental_without_artifact_fails(materialize, monkeypatch):
+    monkeypatch.setattr(materialize, 'latest_lightfm_artifact', lambda: None)
+    with pytest.raises(RuntimeError, match='--full'):
+        materialize.refresh_post_features(feed=no_feed_scan)
+    with pytest.raises(RuntimeError, match='--full'):
+        materialize.refresh_user_features(feed=no_feed_scan)
+    assert ('retrain',) not in materialize.calls
+
+
+def test_full_run_writes_counters(materialize, monkeypatch):
+    aggregates = aggregate(feed(n=2000))
+    monkeypatch.setattr(materialize, 'get_lightfm_artifact', lambda likes_loader: 'trained')
+    assert materialize.refresh_post_features(full=True, feed=lambda: aggregates) == 1
+    published = [call for call in materialize.calls if call[0] == 'publish']
+    assert published == [('publish', materialize.COUNTERS_TABLE, ['post_id', 'day']),
+                         ('publish', materialize.POST_TABLE, 'post_id')]
@@ -0,0 +1,108 @@
+"""
+ModelRegistry tests: a model file is loaded once per content, a reload swaps the alias
+without touching engines already handed out, and the admin reload endpoint only
+accepts an admin token and paths inside MODEL_DIR.
+"""
+
+import os
+import shutil
+
+import pytest
+from catboost import CatBoostClassifier
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import admin
+from app.core.model_registry import ModelRegistry
+from app.core.scoring import ScoringEngine
+
+
+@pytest.fixture
+def model_files(tmp_path, model, frames):
+    users, posts = frames
+    first = tmp_path / 'first.cbm'
+    model.save_model(str(first))
+    copy = tmp_path / 'copy.cbm'
+    shutil.copy(first, copy)
+    other = CatBoostClassifier(iterations=5, depth=2, random_seed=1, verbose=False, allow_writing_files=False)
+    train = posts.assign(user_a=0.5, user_b=1.0, hour=10, weekday=2)[model.feature_names_]
+    other.fit(train, (posts['post_x'] > 0).astype(int))
+    second = tmp_path / 'second.cbm'
+    other.save_model(str(second))
+    return first, copy, second
+
+
+@pytest.fixture
+def registry(frames):
+    _, posts = frames
+    loads = []
+
+    def factory(model, version):
+        loads.append(version)
+        return ScoringEngine(model, posts, ['user_a', 'user_b'], version=version)
+
+    registry = ModelRegistry(factory)
+    registry.loads = loads
+    return registry
+
+
+def test_same_content_loaded_once(registry, model_files):
+    first, copy, _ = model_files
+    version = registry.assign('control', str(first))
+    assert registry.assign('test', str(copy)) == version
+    assert registry.loads == [version]
+    assert registry.engine('control') is registry.engine('test')
+    assert registry.engine('test').version == version
+    assert list(registry.stats()[version]['aliases']) == ['control', 'test']
+
+
+def test_swap_keeps_running_engines(registry, model_files):
+    first, _, second = model_files
+    registry.assign('control', str(first))
+    registry.assign('test', str(first))
+    running = registry.engine('test')
+    version = registry.assign('test', str(second))
+    assert registry.engine('test').version == version != running.version
+    assert running.n_posts == registry.engine('test').n_posts
+    assert registry.engine('control') is running
+    assert 'canary' not in registry
+    with pytest.raises(KeyError):
+        registry.engine('canary')
+
+
+def test_file_watch_reloads_changed_file(registry, model_files):
+    first, _, second = model_files
+    before = registry.assign('test', str(first))
+    shutil.copy(second, first)
+    os.utime(first, (1, 1))
+    registry.check_files()
+    assert registry.aliases()['test'] != before
+
+
+@pytest.fixture
+def admin_client(monkeypatch, serving, model_files):
+    monkeypatch.setattr(admin, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(admin, 'MODEL_DIR', str(model_files[0].parent))
+    app = FastAPI()
+    app.include_router(admin.router)
+    return TestClient(app)
+
+
+def test_admin_reload(admin_client, serving, model_files):
+    url = '/admin/models/test'
+    assert admin_client.post(url, json={'path': 'second.cbm'}).status_code == 403
+    assert admin_client.post(url, json={'path': 'second.cbm'}, headers={'X-Admin-Token': 'wrong'}).status_code == 403
+
+    headers = {'X-Admin-Token': 'secret'}
+    assert admin_client.post(url, json={'path': '../first.cbm'}, headers=headers).status_code == 400
+    assert admin_client.post(url, json={'path': '/etc/passwd'}, headers=headers).status_code == 400
+    assert admin_client.post(url, json={'path': 'missing.cbm'}, headers=headers).status_code == 404
+
+    response = admin_client.post(url, json={'path': 'second.cbm'}, headers=headers)
+    assert response.status_code == 200
+    assert serving.models.aliases()['test'] == response.json()['version']
+
+
+def test_admin_disabled_without_token(admin_client, monkeypatch):
+    monkeypatch.setattr(admin, 'ADMIN_TOKEN', '')
+    assert admin_client.get('/admin/models', headers={'X-Admin-Token': ''}).status_code == 403
@@ -0,0 +1,62 @@
+"""
+Connection pool tests on an in-memory SQLite engine: checkout waits and query times
+are recorded, and the statement timeout is set at the start of every transaction.
+"""
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import QueuePool
+
+from app.db.pool import PoolMetrics, apply_statement_timeout, instrument_engine, pool_options
+
+
+def sqlite_engine(metrics):
+    engine = create_engine('sqlite://', **pool_options(metrics, QueuePool))
+    instrument_engine(engine, metrics)
+    return engine
+
+
+def record_statements(engine):
+    """Statements sent to the driver; `SET LOCAL` (PostgreSQL only) is run as a no-op."""
+    statements = []
+
+    @event.listens_for(engine, 'before_cursor_execute', retval=True)
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+        if statement.startswith('SET LOCAL'):
+            return 'SELECT 1', ()
+        return statement, parameters
+
+    return statements
+
+
+def test_metrics_count_checkouts_and_queries():
+    metrics = PoolMetrics('test')
+    engine = sqlite_engine(metrics)
+    for _ in range(3):
+        with engine.connect() as conn:
+            assert conn.execute(text('SELECT 1')).scalar() == 1
+    stats = metrics.stats()
+    assert stats['checkout_wait']['count'] >= 1
+    assert stats['query']['count'] == 3
+    assert stats['query']['ms_max'] >= stats['query']['ms_mean'] > 0
+
+
+def test_statement_timeout_is_set_per_transaction():
+    engine = sqlite_engine(PoolMetrics('test'))
+    apply_statement_timeout(engine, 1500)
+    statements = record_statements(engine)
+    with engine.begin() as conn:
+        conn.execute(text('SELECT 1'))
+    with engine.begin() as conn:
+        conn.execute(text('SELECT 2'))
+    assert statements == ['SET LOCAL statement_timeout = 1500', 'SELECT 1',
+                          'SET LOCAL statement_timeout = 1500', 'SELECT 2']
+
+
+def test_statement_timeout_off():
+    engine = sqlite_engine(PoolMetrics('test'))
+    apply_statement_timeout(engine, 0)
+    statements = record_statements(engine)
+    with engine.begin() as conn:
+        conn.execute(text('SELECT 1'))
+    assert statements == ['SELECT 1']
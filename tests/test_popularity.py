@@ -0,0 +1,75 @@
+"""
+PopularityService tests: after each refresh the ranking must equal a full recount of
+the likes table (likes desc, post_id asc), including likes committed late.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.core import popularity as popularity_module
+from app.core.popularity import PopularityService
+
+START = datetime(2021, 12, 1)
+
+
+class FakeFeed:
+    """Answers the popularity loaders from a growing likes table."""
+
+    def __init__(self, likes):
+        self.likes = likes
+
+    def last_like_time(self):
+        return None if self.likes.empty else self.likes['timestamp'].max()
+
+    def load_post_like_counts(self, before=None):
+        likes = self.likes if before is None else self.likes[self.likes['timestamp'] < before]
+        return likes.groupby('post_id').size().reset_index(name='likes')
+
+    def load_post_likes(self, since):
+        return self.likes[self.likes['timestamp'] >= since].reset_index(drop=True)
+
+    def install(self, monkeypatch):
+        for name in ('last_like_time', 'load_post_like_counts', 'load_post_likes'):
+            monkeypatch.setattr(popularity_module, name, getattr(self, name))
+
+
+def random_likes(n, seed, start):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'user_id': rng.integers(1, 1000, n),
+        'post_id': rng.zipf(1.5, n) % 200,
+        'timestamp': [start + timedelta(seconds=int(s)) for s in rng.integers(0, 3600, n)],
+    })
+
+
+def full_recount(likes, top_n):
+    counts = likes.groupby('post_id').size().reset_index(name='likes')
+    ranked = counts.sort_values(['likes', 'post_id'], ascending=[False, True])
+    return ranked['post_id'].head(top_n).tolist()
+
+
+def test_refresh_matches_full_recount(monkeypatch):
+    feed = FakeFeed(random_likes(3000, seed=0, start=START))
+    feed.install(monkeypatch)
+    service = PopularityService(top_n=20)
+    assert service.top(20) == full_recount(feed.likes, 20)
+    assert service.top(3) == service.top(20)[:3]
+
+    newest = feed.likes['timestamp'].max()
+    # new likes, one committed late inside the overlap, and a re-read of the same window
+    late = pd.DataFrame({'user_id': range(2000, 2040), 'post_id': 150, 'timestamp': newest - timedelta(minutes=2)})
+    feed.likes = pd.concat([feed.likes, random_likes(500, seed=1, start=newest + timedelta(seconds=1)), late],
+                           ignore_index=True)
+    assert service.refresh() > 0
+    assert service.refresh() == 0
+    assert service.top(20) == full_recount(feed.likes, 20)
+    assert 150 in service.top(20)
+
+
+def test_empty_feed(monkeypatch):
+    FakeFeed(pd.DataFrame({'user_id': [], 'post_id': [], 'timestamp': []})).install(monkeypatch)
+    service = PopularityService()
+    assert service.top(5) == []
+    assert service.refresh() == 0
@@ -0,0 +1,45 @@
+"""
+PostCache tests: pinned posts are served without the database, misses are loaded once
+and kept in the bounded LRU, and responses follow the requested id order.
+"""
+
+import asyncio
+
+import pandas as pd
+
+from app.core.post_cache import PostCache
+from benchmarks.fixtures import SampleSession
+
+PINNED = pd.DataFrame({'id': [1, 2, 3], 'text': ['one', 'two', 'three'], 'topic': ['covid', None, 'sport']})
+STORED = pd.DataFrame({'id': [1, 2, 3, 10, 11, 12], 'text': ['one', 'two', 'three', 'ten', 'eleven', 'twelve'],
+                       'topic': ['covid', '', 'sport', 'tech', 'tech', 'movie']})
+
+
+def load(cache, ids, session):
+    return [(post.id, post.text, post.topic) for post in asyncio.run(cache.get_or_load(ids, session))]
+
+
+def test_pinned_posts_skip_the_database():
+    cache, session = PostCache(PINNED), SampleSession(STORED)
+    assert load(cache, [3, 1, 2], session) == [(3, 'three', 'sport'), (1, 'one', 'covid'), (2, 'two', '')]
+    assert session.queries == 0
+
+
+def test_misses_are_loaded_once_into_the_lru():
+    cache, session = PostCache(PINNED, lru_size=2), SampleSession(STORED)
+    assert load(cache, [10, 1, 404], session) == [(10, 'ten', 'tech'), (1, 'one', 'covid')]
+    assert load(cache, [10], session) == [(10, 'ten', 'tech')]
+    assert session.queries == 1
+
+    load(cache, [11, 12], session)
+    assert cache.get_many([10])[1] == [10]
+    assert len(cache) == 3 + 2
+
+
+def test_invalidate():
+    cache, session = PostCache(PINNED), SampleSession(STORED)
+    cache.invalidate([2])
+    assert cache.get_many([1, 2])[1] == [2]
+    cache.invalidate()
+    assert len(cache) == 0
+    assert load(cache, [1], session) == [(1, 'one', 'covid')]
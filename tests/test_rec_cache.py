@@ -0,0 +1,85 @@
+"""
+RecommendationCache tests: cached results equal freshly scored ones, the key tells
+apart model, hour, weekday and likes, and entries expire, get evicted or are dropped
+when the user's likes change.
+"""
+
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.recommend import router
+from app.core import likes_index as likes_module
+from app.core import rec_cache as rec_cache_module
+from app.core.recommender import cache_key, get_recommend_ids
+from app.core.rec_cache import RecommendationCache
+
+TIME = datetime(2021, 12, 20, 9, 15)
+
+
+def test_cached_results_match_scoring(serving, monkeypatch):
+    engine = serving.models.engine('test')
+    expected = {limit: get_recommend_ids(4, TIME, engine, limit) for limit in (3, 10)}
+    cache = RecommendationCache(top_k=10)
+    monkeypatch.setattr(serving, 'rec_cache', cache)
+
+    assert get_recommend_ids(4, TIME, engine, 10) == expected[10]
+    assert get_recommend_ids(4, TIME.replace(minute=50), engine, 3) == expected[3]
+    assert cache.stats()['hits'] == 1
+    # limits above top_k bypass the cache
+    get_recommend_ids(4, TIME, engine, 11)
+    assert cache.stats()['hits'] + cache.stats()['misses'] == 2
+
+
+def test_key_parts(serving):
+    engine = serving.models.engine('test')
+    liked = serving.likes_index.liked_before(4, TIME)
+    key = cache_key(engine, 4, TIME, liked)
+    assert key == (engine.version, 4, 9, TIME.weekday(), len(liked))
+    assert cache_key(engine, 4, TIME.replace(hour=10), liked) != key
+    assert cache_key(engine, 4, TIME.replace(day=21), liked) != key
+    assert cache_key(engine, 4, TIME, liked[:-1]) != key
+
+
+def test_likes_refresh_invalidates_user(serving, monkeypatch):
+    cache = RecommendationCache()
+    serving.likes_index.subscribe(cache.invalidate_users)
+    cache.put(('v', 4, 9, 0, 3), [1, 2])
+    cache.put(('v', 5, 9, 0, 3), [3])
+    newest = serving.likes_index.window.since + serving.likes_index.window.overlap
+    monkeypatch.setattr(likes_module, 'load_likes', lambda since: pd.DataFrame(
+        {'user_id': [4], 'post_id': [9999], 'timestamp': [newest + pd.Timedelta(hours=1)]}))
+    assert serving.likes_index.refresh() == 1
+    assert cache.get(('v', 4, 9, 0, 3)) is None
+    assert cache.get(('v', 5, 9, 0, 3)) == [3]
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_ttl_and_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rec_cache_module.time, 'monotonic', lambda: now[0])
+    cache = RecommendationCache(max_entries=2, ttl=60)
+    cache.put(('v', 1, 0, 0, 0), [1])
+    cache.put(('v', 2, 0, 0, 0), [2])
+    assert cache.get(('v', 1, 0, 0, 0)) == [1]
+    cache.put(('v', 3, 0, 0, 0), [3])
+    assert cache.get(('v', 2, 0, 0, 0)) is None
+    assert cache.stats()['evictions'] == 1
+
+    now[0] += 61
+    assert cache.get(('v', 1, 0, 0, 0)) is None
+    assert len(cache) == 1
+
+
+@pytest.mark.parametrize('limit', [-3, 0, 101])
+def test_limit_is_validated(serving, limit):
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+    response = client.get('/post/recommendations/', params={'user_id': 4, 'time': TIME.isoformat(), 'limit': limit})
+    assert response.status_code == 422
+    body = {'requests': [{'user_id': 4, 'time': TIME.isoformat()}], 'limit': limit}
+    assert client.post('/post/recommendations/batch', json=body).status_code == 422
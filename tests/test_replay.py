@@ -0,0 +1,58 @@
+"""
+Replay benchmark tests: request files load in both formats, a replay over the test
+state times every stage of every request, and reports compare stage by stage.
+"""
+
+import json
+from datetime import datetime
+
+import pandas as pd
+
+from benchmarks.replay import STAGES, compare, load_requests, run_benchmark
+
+
+def test_load_requests_jsonl(tmp_path):
+    path = tmp_path / 'requests.jsonl'
+    path.write_text('\n'.join([
+        json.dumps({'user_id': 3, 'time': '2021-12-10T12:00:00', 'limit': 7}),
+        '',
+        json.dumps({'params': {'user_id': '4', 'time': '2021-12-11T08:30:00'}}),
+    ]) + '\n')
+    assert load_requests(path) == [
+        (3, datetime(2021, 12, 10, 12), 7),
+        (4, datetime(2021, 12, 11, 8, 30), 5),
+    ]
+
+
+def test_load_requests_impression_log(tmp_path):
+    path = tmp_path / 'impressions.parquet'
+    pd.DataFrame({
+        'user_id': [5, 6],
+        'timestamp': pd.to_datetime(['2021-12-01 10:00', '2021-12-02 11:00']),
+        'post_ids': [[100, 101, 102], [103]],
+        'experiment': ['control', 'test'],
+    }).to_parquet(path)
+    assert load_requests(path) == [(5, datetime(2021, 12, 1, 10), 3), (6, datetime(2021, 12, 2, 11), 1)]
+
+
+def test_run_benchmark(serving):
+    requests = [(user_id, datetime(2021, 12, 10, hour), 5) for hour, user_id in enumerate(range(1, 16))]
+    report = run_benchmark(requests, warmup=3)
+    assert report['requests'] == 15
+    assert report['empty_responses'] == 0
+    for stage in STAGES:
+        assert report['stages'][stage]['count'] == 15, stage
+    total = report['stages']['total']
+    assert total['p50_ms'] <= total['p95_ms'] <= total['p99_ms'] <= total['max_ms']
+
+
+def test_compare():
+    def report(p50, throughput):
+        stages = {'predict': {'p50_ms': p50, 'p95_ms': 2 * p50, 'p99_ms': 0.0}}
+        return {'stages': stages, 'throughput_rps': throughput}
+
+    lines = compare(report(2.0, 100), report(1.0, 180)).splitlines()
+    assert lines[1].split() == ['predict', 'p50_ms', '2.000', '1.000', '-50.0%']
+    assert lines[2].split()[-1] == '-50.0%'
+    assert lines[3].split() == ['predict', 'p99_ms', '0.000', '0.000', 'n/a']
+    assert lines[4].split() == ['throughput', '100', '180']
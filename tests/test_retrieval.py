@@ -0,0 +1,61 @@
+"""
+EmbeddingRetriever tests: the shortlist holds exactly the posts with the highest dot
+product (brute force over the catalog), and ranking a full-size shortlist recovers
+the top-K of full scoring.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.retrieval import EmbeddingRetriever, embedding_columns, evaluate_recall
+from app.core.scoring import ScoringEngine
+from app.core.user_store import UserFeatureStore
+
+DIMS = 8
+
+
+@pytest.fixture
+def embedded(frames):
+    users, posts = frames
+    rng = np.random.default_rng(3)
+    users = users.assign(**{f'user_emb_{i}': rng.standard_normal(len(users)).astype(np.float32) for i in range(DIMS)})
+    posts = posts.assign(**{f'item_emb_{i}': rng.standard_normal(len(posts)).astype(np.float32) for i in range(DIMS)})
+    return users, posts
+
+
+def test_embedding_columns():
+    user_columns = ['age', 'user_emb_1', 'user_emb_0', 'user_emb_2']
+    assert embedding_columns(user_columns, ['item_emb_0', 'item_emb_1', 'post_emb_2']) == (
+        ['user_emb_0', 'user_emb_1'], ['item_emb_0', 'item_emb_1'])
+    assert embedding_columns(user_columns, ['post_emb_2']) == (['user_emb_2'], ['post_emb_2'])
+    assert embedding_columns(['age'], ['item_emb_0']) == ([], [])
+
+
+def test_shortlist_matches_brute_force(embedded):
+    users, posts = embedded
+    retriever = EmbeddingRetriever(posts, users.columns, n_candidates=10)
+    user_embedding = users.loc[0, retriever.user_columns].to_numpy(dtype=np.float32)
+    scores = posts[retriever.post_columns].to_numpy(dtype=np.float32) @ user_embedding
+
+    assert retriever.shortlist(user_embedding).tolist() == sorted(np.argsort(-scores)[:10].tolist())
+    rows = np.arange(0, len(posts), 3)
+    assert retriever.shortlist(user_embedding, rows, n=5).tolist() == sorted(rows[np.argsort(-scores[rows])[:5]])
+
+    with pytest.raises(ValueError):
+        EmbeddingRetriever(posts, ['age'])
+
+
+def test_recall_of_full_shortlist_is_one(model, embedded):
+    users, posts = embedded
+    store = UserFeatureStore.from_frame(users)
+    engine = ScoringEngine(model, posts, store.columns)
+    retriever = EmbeddingRetriever(posts, store.columns)
+    report = evaluate_recall(engine, retriever, store, users['user_id'][:10], datetime(2021, 12, 10, 12),
+                             shortlist_sizes=[5, len(posts)], k=5)
+    assert isinstance(report, pd.DataFrame)
+    assert report['recall@5'].iloc[1] == 1.0
+    assert 0 <= report['recall@5'].iloc[0] <= 1
+    assert report['share_of_catalog'].iloc[1] == 1.0
@@ -0,0 +1,65 @@
+"""
+ScoringEngine tests.
+
+The engine must score exactly like `predict_proba` on the DataFrame the endpoint used
+to build per request, whatever rows the reused per-thread buffer held before.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.core.scoring import ScoringEngine, top_k_indices
+
+TIME = datetime(2021, 12, 10, 14, 30)
+
+
+def reference_scores(model, users, posts, user_id, time, rows=None):
+    candidates = posts if rows is None else posts.iloc[rows]
+    user = users[users['user_id'] == user_id].drop(columns='user_id')
+    df = candidates.assign(**{c: user[c].iloc[0] for c in user.columns}, hour=time.hour, weekday=time.weekday())
+    return model.predict_proba(df[model.feature_names_])[:, 1]
+
+
+def user_vector(users, user_id, columns):
+    return users.loc[users['user_id'] == user_id, columns].to_numpy(dtype=np.float32)[0]
+
+
+def test_score_matches_dataframe_predict(model, frames):
+    users, posts = frames
+    engine = ScoringEngine(model, posts, ['user_a', 'user_b'])
+    for user_id in (1, 7, 40):
+        post_ids, scores = engine.score(user_vector(users, user_id, engine.user_columns), TIME)
+        np.testing.assert_array_equal(post_ids, posts['post_id'].to_numpy())
+        np.testing.assert_array_equal(scores, reference_scores(model, users, posts, user_id, TIME))
+
+
+def test_buffer_reuse_across_candidate_subsets(model, frames):
+    users, posts = frames
+    engine = ScoringEngine(model, posts, ['user_a', 'user_b'])
+    vector = user_vector(users, 3, engine.user_columns)
+    rows = engine.candidate_rows([100, 101, 150])
+    assert len(rows) == len(posts) - 3
+
+    _, subset = engine.score(vector, TIME, rows)
+    np.testing.assert_array_equal(subset, reference_scores(model, users, posts, 3, TIME, rows))
+    # the buffer now holds the subset: a full-catalog call must restore the post block
+    _, full = engine.score(vector, TIME)
+    np.testing.assert_array_equal(full, reference_scores(model, users, posts, 3, TIME))
+    assert engine.candidate_rows([]) is None
+
+
+def test_top_k_indices():
+    scores = np.array([0.2, 0.9, 0.1, 0.9, 0.5])
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 4]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 4, 0, 2]
+    assert top_k_indices(scores, 0).tolist() == []
+
+
+def test_top_k_is_best_first(model, frames):
+    users, posts = frames
+    engine = ScoringEngine(model, posts, ['user_a', 'user_b'])
+    expected = reference_scores(model, users, posts, 5, TIME)
+    order = pd.Series(expected, index=posts['post_id']).sort_values(ascending=False, kind='stable')
+    assert engine.top_k(user_vector(users, 5, engine.user_columns), TIME, 5) == order.index[:5].tolist()
@@ -0,0 +1,56 @@
+"""
+Feature snapshot tests: a snapshot round-trips the feature table through memory-mapped
+arrays, backs a UserFeatureStore, and is rebuilt unless its version is known to match.
+"""
+
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from app.core.snapshot import FeatureSnapshot, ensure_snapshot, write_snapshot
+from app.core.user_store import UserFeatureStore
+
+USERS = pd.DataFrame({
+    'user_id': np.array([3, 1, 2], dtype=np.int32),
+    'age': np.array([20, 35, 51], dtype=np.int16),
+    'views_per_day': np.array([1.5, 0.25, 9.0], dtype=np.float32),
+    'os': pd.Categorical(['iOS', 'Android', None]),
+})
+
+
+class CountingLoader:
+    def __init__(self, df):
+        self.df, self.calls = df, 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.df
+
+
+def test_round_trip(tmp_path):
+    write_snapshot(USERS, tmp_path / 'users', 'user_id', version='v1')
+    snapshot = FeatureSnapshot(tmp_path / 'users')
+    assert isinstance(snapshot.matrix, np.memmap)
+    frame = snapshot.to_frame()
+    assert list(frame.columns) == list(USERS.columns)
+    assert frame['user_id'].dtype == np.int32
+    tm.assert_series_equal(frame['os'], USERS['os'])
+    np.testing.assert_array_equal(frame['views_per_day'].to_numpy(), USERS['views_per_day'].to_numpy())
+
+    store = UserFeatureStore.from_snapshot(snapshot)
+    assert store.shared
+    np.testing.assert_array_equal(store.get(1, ['age', 'views_per_day']), [35, 0.25])
+    assert store.get(2, ['os'])[0] == -1
+
+
+def test_rebuilt_only_for_a_known_matching_version(tmp_path):
+    loader = CountingLoader(USERS)
+    ensure_snapshot('users', loader, 'user_id', root=tmp_path, version='v1')
+    ensure_snapshot('users', loader, 'user_id', root=tmp_path, version='v1')
+    assert loader.calls == 1
+    ensure_snapshot('users', loader, 'user_id', root=tmp_path, version='v2')
+    assert loader.calls == 2
+    # unknown provenance: an existing snapshot is never trusted
+    ensure_snapshot('users', loader, 'user_id', root=tmp_path, version=None)
+    ensure_snapshot('users', loader, 'user_id', root=tmp_path, version=None)
+    assert loader.calls == 4
@@ -0,0 +1,77 @@
+"""
+Tree ranker tests: the split-tree scores must equal CatBoost's raw scores, and the
+ranked posts must be exactly the ones exact scoring returns, on a small model and on
+the shipped serving model.
+"""
+
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.core import tree_ranker
+from app.core.scoring import ScoringEngine
+from app.core.tree_ranker import ObliviousTreeRanker, enable_tree_ranker
+
+SERVING_MODEL = Path(__file__).resolve().parent.parent / 'models' / 'best_catboost_model_16_7.cbm'
+TIMES = [datetime(2021, 12, 10, 12), datetime(2021, 12, 11, 3)]
+
+
+def vectors(users, user_ids):
+    return [users.loc[users['user_id'] == uid, ['user_a', 'user_b']].to_numpy(dtype=np.float32)[0] for uid in user_ids]
+
+
+@pytest.mark.parametrize('chunk_trees', [32, 3])
+def test_raw_scores_match_catboost(monkeypatch, model, frames, chunk_trees):
+    monkeypatch.setattr(tree_ranker, 'TREE_RANKER_CHUNK_TREES', chunk_trees)
+    users, posts = frames
+    engine = ScoringEngine(model, posts, ['user_a', 'user_b'])
+    ranker = ObliviousTreeRanker(engine)
+    assert ranker.n_trees == model.tree_count_
+    for time in TIMES:
+        for vector in vectors(users, [1, 9, 33]):
+            block, _ = engine.build(vector, time)
+            expected = model.predict(block, prediction_type='RawFormulaVal')
+            np.testing.assert_allclose(ranker.raw_scores(vector, time), expected, atol=1e-5)
+
+
+def test_top_k_matches_exact_scoring(model, frames):
+    users, posts = frames
+    engine = ScoringEngine(model, posts, ['user_a', 'user_b'])
+    ranker = ObliviousTreeRanker(engine)
+    rows = engine.candidate_rows(posts['post_id'][::4])
+    for time in TIMES:
+        for vector in vectors(users, range(1, 41, 3)):
+            assert ranker.top_k(vector, time, 5) == engine.top_k(vector, time, 5)
+            assert ranker.top_k(vector, time, 5, rows) == engine.top_k(vector, time, 5, rows)
+    assert ranker.validate(vectors(users, [2, 3]), TIMES[0]) < 1e-5
+
+
+def test_enable_attaches_ranker(monkeypatch, model, frames):
+    users, posts = frames
+    engine = ScoringEngine(model, posts, ['user_a', 'user_b'])
+    monkeypatch.setattr(ObliviousTreeRanker, 'timings', lambda self, *args, **kwargs: (1.0, 2.0))
+    assert enable_tree_ranker(engine, vectors(users, [1, 2]), TIMES[0])
+    assert engine.ranker is not None
+    # not faster than exact scoring: stays off
+    other = ScoringEngine(model, posts, ['user_a', 'user_b'])
+    monkeypatch.setattr(ObliviousTreeRanker, 'timings', lambda self, *args, **kwargs: (2.0, 1.0))
+    assert not enable_tree_ranker(other, vectors(users, [1, 2]), TIMES[0])
+    assert other.ranker is None
+
+
+@pytest.mark.skipif(not SERVING_MODEL.exists(), reason="serving model not available")
+def test_serving_model_top_k_matches_catboost():
+    from app.core.model_loader import load_model
+    from app.core.user_store import UserFeatureStore
+    from benchmarks.fixtures import load_fixtures
+
+    model = load_model(str(SERVING_MODEL))
+    fixtures = load_fixtures(model, n_posts=300)
+    store = UserFeatureStore.from_frame(fixtures.users)
+    engine = ScoringEngine(model, fixtures.posts, store.columns, user_categories=store.categories)
+    ranker = ObliviousTreeRanker(engine)
+    for user_id in fixtures.users['user_id'][:20]:
+        vector = store.get(int(user_id), engine.user_columns)
+        assert ranker.top_k(vector, TIMES[0], 5) == engine.top_k(vector, TIMES[0], 5)
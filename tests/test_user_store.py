@@ -0,0 +1,53 @@
+"""
+UserFeatureStore tests: lookups must return the row a boolean scan over the user
+table would, for dense and sparse user ids, with categorical columns as codes.
+"""
+
+import numpy as np
+import pandas as pd
+
+from app.core.user_store import UserFeatureStore
+
+
+def users_frame(user_ids):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'user_id': user_ids,
+        'age': rng.integers(14, 80, len(user_ids)),
+        'views_per_day': rng.uniform(0, 50, len(user_ids)).astype(np.float32),
+        'os': rng.choice(['iOS', 'Android'], len(user_ids)),
+    })
+
+
+def scan(users, user_id, columns):
+    return users.loc[users['user_id'] == user_id, columns].to_numpy(dtype=np.float32)[0]
+
+
+def test_dense_lookup_matches_scan():
+    users = users_frame(np.arange(200, 0, -1))
+    store = UserFeatureStore.from_frame(users)
+    assert store._dense_index is not None
+    for user_id in (1, 57, 200):
+        np.testing.assert_array_equal(store.get(user_id, ['views_per_day', 'age']),
+                                      scan(users, user_id, ['views_per_day', 'age']))
+    assert store.get(0) is None
+    assert store.get(201) is None
+    assert store.get(-5) is None
+
+
+def test_sparse_ids_use_dict_index():
+    users = users_frame(np.array([5, 10_000_000, 3_000_000_000]))
+    store = UserFeatureStore.from_frame(users)
+    assert store._dict_index is not None
+    np.testing.assert_array_equal(store.get(3_000_000_000, ['age']), scan(users, 3_000_000_000, ['age']))
+    assert store.get(6) is None
+
+
+def test_categorical_columns_are_codes():
+    users = users_frame(np.arange(1, 11))
+    store = UserFeatureStore.from_frame(users)
+    assert store.categories == {'os': ['Android', 'iOS']}
+    assert store.columns[-1] == 'os'
+    for user_id, os_name in zip(users['user_id'], users['os']):
+        code = int(store.get(user_id, ['os'])[0])
+        assert store.categories['os'][code] == os_name